@@ -0,0 +1,12 @@
+import sys
+import os
+
+# Add backend directory to Python path
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from asgi_app import app
+
+# ASGI entry point (e.g. `uvicorn api.asgi:app`)
+# /api/earnings is served by the asyncio scraper; other routes fall through to the Flask app
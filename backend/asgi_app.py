@@ -0,0 +1,105 @@
+"""
+ASGIアプリケーション
+
+/api/earnings/<stock_code> はイベントループ上で非同期版のスクレイパーを実行し、
+それ以外のエンドポイントは既存のFlaskアプリ（WSGI）に委譲する。決算資料の取得は
+ほとんどがI/O待ちなので、1ワーカーで多数のリクエストを同時に処理できる
+
+起動例（プロジェクトルートで実行）:
+    uvicorn api.asgi:app --port 5001
+"""
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import async_http_client
+from app import (
+    INVALID_STOCK_CODE_RESPONSE,
+    app as flask_app,
+    earnings_cache,
+    earnings_response,
+    is_valid_stock_code,
+    parse_earnings_query,
+)
+from async_scraper import fetch_earnings_materials_async, sample_materials_async
+from material_sources import MaterialQuery
+
+EARNINGS_PATH = re.compile(r'^/api/earnings/([^/]+)/?$')
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def send_json(send, body: dict, status: int = 200):
+    """JSONレスポンスを送る（Flaskの jsonify と同じ形式、CORSヘッダー付き）"""
+    payload = json.dumps(body).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode('ascii')),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def get_earnings(send, stock_code: str, query_string: bytes = b''):
+    """証券コードから決算説明会資料を取得するエンドポイント（非同期版、クエリパラメーターは同期版と同じ）"""
+    try:
+        if not is_valid_stock_code(stock_code):
+            await send_json(send, INVALID_STOCK_CODE_RESPONSE, 400)
+            return
+
+        args = {name: values[0] for name, values in parse_qs(query_string.decode('utf-8', errors='replace')).items()}
+        query, error = parse_earnings_query(args)
+        if error:
+            await send_json(send, error, 400)
+            return
+
+        if query is None:
+            materials = await earnings_cache.get_async(stock_code)
+        else:
+            cached = earnings_cache.peek(stock_code)
+            if cached is not None:
+                materials = query.filter(cached)
+            else:
+                materials = await fetch_earnings_materials_async(stock_code, query=query)
+
+        # 資料が見つからない場合はサンプルデータ（キャッシュには入れない）
+        if not materials:
+            materials = await sample_materials_async(stock_code, query or MaterialQuery.for_years(5))
+
+        body, status = earnings_response(stock_code, materials)
+        await send_json(send, body, status)
+
+    except Exception as e:
+        await send_json(send, {"error": f"エラーが発生しました: {str(e)}"}, 500)
+
+
+async def lifespan(receive, send):
+    """サーバーの起動・終了イベントを処理（終了時にHTTPクライアントを閉じる）"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_http_client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        match = EARNINGS_PATH.match(scope['path'])
+        if match:
+            await get_earnings(send, match.group(1), scope.get('query_string', b''))
+            return
+
+    await wsgi_app(scope, receive, send)
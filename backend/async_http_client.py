@@ -0,0 +1,192 @@
+"""
+スクレイパー用の非同期HTTPクライアント
+
+イベントループごとに1つの httpx.AsyncClient を使い回す。リトライ・バックオフ、
+共通ヘッダーの設定は http_client と揃え、ホストごとのリクエストレート（トークンバケット）は
+同期版と共有するため、スレッドとコルーチンのどちらから呼んでも各サイトへの負荷は同じ上限に収まる
+
+同時接続数の上限はイベントループ内のセマフォで管理するので、待っている間もスレッドは消費しない
+
+stream() / aiter_body() は http_client.stream() / iter_body() の非同期版
+"""
+import asyncio
+import os
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from urllib.parse import urlparse
+
+import httpx
+
+from http_client import (
+    ACCEPT_ENCODING,
+    BACKOFF_FACTOR,
+    DEFAULT_TIMEOUT,
+    HOST_CONCURRENCY,
+    MAX_BODY_BYTES,
+    MAX_RETRIES,
+    RETRY_STATUSES,
+    STREAM_CHUNK_SIZE,
+    USER_AGENT,
+    get_host_budget,
+)
+
+# イベントループごとのクライアントが保持する最大接続数（全ホスト合計）とkeep-alive接続数
+ASYNC_MAX_CONNECTIONS = int(os.getenv('SCRAPER_ASYNC_MAX_CONNECTIONS', 100))
+ASYNC_MAX_KEEPALIVE = int(os.getenv('SCRAPER_ASYNC_MAX_KEEPALIVE', 20))
+
+
+class _LoopState:
+    """イベントループごとのクライアントとホストごとのセマフォ"""
+
+    def __init__(self):
+        self.client = create_client()
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def get_host_slots(self, host: str) -> asyncio.Semaphore:
+        slots = self.host_slots.get(host)
+        if slots is None:
+            slots = self.host_slots[host] = asyncio.Semaphore(max(HOST_CONCURRENCY, 1))
+        return slots
+
+
+_states: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]' = weakref.WeakKeyDictionary()
+
+
+def create_client() -> httpx.AsyncClient:
+    """コネクションプール・共通ヘッダーを設定した非同期クライアントを作成"""
+    return httpx.AsyncClient(
+        headers={
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING,
+        },
+        limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=ASYNC_MAX_KEEPALIVE),
+        timeout=DEFAULT_TIMEOUT,
+        follow_redirects=True,
+    )
+
+
+def _get_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _LoopState()
+    return state
+
+
+async def _wait_for_token(host: str):
+    """ホストのトークンが貯まるまで（イベントループを止めずに）待つ"""
+    budget = get_host_budget(host)
+    while True:
+        wait = budget.try_acquire_token()
+        if wait <= 0:
+            return
+        await asyncio.sleep(wait)
+
+
+async def get(url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> httpx.Response:
+    """
+    現在のイベントループのクライアントでGETリクエストを送る
+
+    接続エラーと 429/5xx は http_client と同じ回数・バックオフでリトライする
+
+    Args:
+        url (str): リクエスト先のURL
+        timeout (float): タイムアウト（秒）
+        **kwargs: httpx.AsyncClient.get に渡す追加の引数
+
+    Returns:
+        httpx.Response: レスポンス
+    """
+    state = _get_state()
+    host = urlparse(url).netloc
+
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(BACKOFF_FACTOR * (2 ** (attempt - 1)))
+
+        async with state.get_host_slots(host):
+            await _wait_for_token(host)
+            try:
+                response = await state.client.get(url, timeout=timeout, **kwargs)
+            except httpx.TransportError:
+                if attempt >= MAX_RETRIES:
+                    raise
+                continue
+
+        if response.status_code not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+            return response
+
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            await asyncio.sleep(float(retry_after))
+
+    return response
+
+
+@asynccontextmanager
+async def stream(url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> AsyncIterator[httpx.Response]:
+    """
+    本文を読まずにレスポンスを返すGETリクエスト（async with を抜けると接続を閉じる）
+
+    本文を読み始める前の接続エラーと 429/5xx は get() と同じようにリトライする。
+    本文を読み終えるまでホストの同時接続数の枠を使う
+
+    Args:
+        url (str): リクエスト先のURL
+        timeout (float): タイムアウト（秒）
+        **kwargs: httpx.AsyncClient.build_request に渡す追加の引数
+
+    Yields:
+        httpx.Response: レスポンス（本文は aiter_body() で読む）
+    """
+    state = _get_state()
+    host = urlparse(url).netloc
+
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(BACKOFF_FACTOR * (2 ** (attempt - 1)))
+
+        retry_after = ''
+        async with state.get_host_slots(host):
+            await _wait_for_token(host)
+            try:
+                request = state.client.build_request('GET', url, timeout=timeout, **kwargs)
+                response = await state.client.send(request, stream=True)
+            except httpx.TransportError:
+                if attempt >= MAX_RETRIES:
+                    raise
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                try:
+                    yield response
+                finally:
+                    await response.aclose()
+                return
+
+            retry_after = response.headers.get('Retry-After', '')
+            await response.aclose()
+
+        if retry_after.isdigit():
+            await asyncio.sleep(float(retry_after))
+
+
+async def aiter_body(response: httpx.Response, max_bytes: int = MAX_BODY_BYTES) -> AsyncIterator[bytes]:
+    """stream() のレスポンス本文を少しずつ返す（max_bytes を超えた分は返さない）"""
+    remaining = max_bytes
+    async for chunk in response.aiter_bytes(chunk_size=STREAM_CHUNK_SIZE):
+        if len(chunk) > remaining:
+            yield chunk[:remaining]
+            print(f"⚠️  本文が {max_bytes} バイトを超えたため打ち切りました: {response.url}")
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+
+async def aclose():
+    """現在のイベントループのクライアントを閉じる（ASGIサーバーの終了時に呼ぶ）"""
+    loop = asyncio.get_running_loop()
+    state = _states.pop(loop, None)
+    if state is not None:
+        await state.client.aclose()
@@ -0,0 +1,336 @@
+"""
+決算資料スクレイパーの非同期版
+
+earnings_scraper と同じURL・同じパース関数を使い、HTTPリクエストだけを async_http_client で
+行う。待ち時間のほとんどはI/Oなので、1つのイベントループで多数の取得を同時に進められる
+
+get_earnings_materials_async / fetch_earnings_materials_async は earnings_scraper の
+get_earnings_materials / fetch_earnings_materials と同じ結果を返す
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import async_http_client
+import irbank_pdf_map
+import materials_store
+import page_cache
+from company_ir_urls import get_company_ir_url
+from earnings_scraper import (
+    IRBANK_DETAIL_WORKERS,
+    IRBANK_LISTING_LIMIT,
+    IRBANK_MAX_MATERIALS,
+    build_irbank_material,
+    buffettcode_ir_url,
+    buffettcode_parser,
+    direct_link_materials,
+    fetch_from_tdnet,
+    irbank_company_url,
+    irbank_detail_parser,
+    irbank_ir_url,
+    irbank_listing_parser,
+    irbank_listing_parser_name,
+    ir_page_parser,
+    lookup_company_name,
+    parse_irbank_company_name,
+    parse_yahoo_company_name,
+    sample_materials,
+    yahoo_quote_url,
+)
+from material_sources import MaterialQuery, fetch_all_sources_async, register_async_fetcher
+
+
+async def get_earnings_materials_async(stock_code: str, years: int = 5, query: Optional[MaterialQuery] = None,
+                                       use_store: bool = True) -> List[Dict]:
+    """
+    指定された証券コードの決算説明会資料を非同期に取得する（見つからない場合はサンプルデータ）
+
+    Args:
+        stock_code (str): 4桁の証券コード
+        years (int): 取得する年数（デフォルト: 5年）
+        query (MaterialQuery): 期間・資料の種類の条件（省略時は years 年分のすべての資料）
+        use_store (bool): False の場合はストアを読まずにスクレイピングする（結果は書き戻す）
+
+    Returns:
+        List[Dict]: 決算資料のリスト
+    """
+    materials = await fetch_earnings_materials_async(stock_code, years, query, use_store)
+    return materials or await sample_materials_async(stock_code, query or MaterialQuery.for_years(years))
+
+
+async def fetch_earnings_materials_async(stock_code: str, years: int = 5, query: Optional[MaterialQuery] = None,
+                                         use_store: bool = True) -> List[Dict]:
+    """
+    指定された証券コードの決算説明会資料をストア・各ソースから非同期に取得する（サンプルデータは返さない）
+
+    Args:
+        stock_code (str): 4桁の証券コード
+        years (int): 取得する年数（デフォルト: 5年）
+        query (MaterialQuery): 期間・資料の種類の条件（省略時は years 年分のすべての資料）
+        use_store (bool): False の場合はストアを読まずにスクレイピングする（キャッシュの取り直し用。結果は書き戻す）
+
+    Returns:
+        List[Dict]: 決算資料のリスト（見つからない・エラーの場合は空。一部のソースがタイムアウト・
+            失敗した場合は complete が False の SourceResults）
+    """
+    materials = []
+    # 一部のソースが欠けた取得結果（欠けがなければ None）
+    results = None
+
+    # 現在の日付から指定年数前までの範囲を設定
+    narrowed = query is not None
+    if query is None:
+        query = MaterialQuery.for_years(years)
+
+    try:
+        # まず企業名を取得
+        company_name = await get_company_name_async(stock_code)
+
+        # ストアに鮮度内の結果があればそれを使い、なければすべてのソースから並行に取得して書き戻す
+        # （ストアは共有キャッシュへのネットワーク呼び出しを含むため、イベントループの外で実行する）
+        materials = await asyncio.to_thread(materials_store.load_materials, stock_code) if use_store else None
+        if materials is None:
+            print(f"Fetching materials for {stock_code} - {company_name}")
+            materials = await fetch_all_sources_async(stock_code, company_name, query)
+            if not materials.complete:
+                # タイムアウト・失敗したソースがある結果はストアに保存しない（キャッシュも短い TTL にする）
+                results = materials
+                print(f"⚠️  Incomplete materials for {stock_code} (timed out: {results.timed_out}, failed: {results.failed})")
+            elif not narrowed:
+                await asyncio.to_thread(materials_store.save_materials, stock_code, materials)
+        materials = query.filter(materials)
+
+        # 日付でソート（新しい順）
+        materials.sort(key=lambda x: x.get('announcement_date', ''), reverse=True)
+        if results is not None:
+            materials = results.with_materials(materials)
+
+        print(f"Found {len(materials)} materials for {stock_code}")
+
+    except Exception as e:
+        print(f"Error fetching materials for {stock_code}: {str(e)}")
+        # エラーの場合でも空のリストを返す
+        materials = []
+
+    return materials
+
+
+async def sample_materials_async(stock_code: str, query: MaterialQuery) -> List[Dict]:
+    """資料が見つからない場合のサンプルデータ（ストア・キャッシュには入れない）"""
+    return sample_materials(stock_code, await get_company_name_async(stock_code), query)
+
+
+async def get_company_name_async(stock_code: str) -> str:
+    """
+    証券コードから企業名を非同期に取得
+
+    保存済みの企業名の読み書き（SQLite）は書き込みロックを待つことがあるので、イベントループの外で実行する
+
+    Args:
+        stock_code (str): 証券コード
+
+    Returns:
+        str: 企業名
+    """
+    company_name = await asyncio.to_thread(lookup_company_name, stock_code)
+    if company_name:
+        return company_name
+
+    # IR BANKから企業名を取得
+    try:
+        response = await async_http_client.get(irbank_company_url(stock_code))
+        if response.status_code == 200:
+            company_name = parse_irbank_company_name(response.content)
+            if company_name:
+                await asyncio.to_thread(materials_store.save_company_name, stock_code, company_name)
+                return company_name
+    except Exception as e:
+        print(f"Error fetching company name from IR BANK: {e}")
+
+    # Yahoo Financeから企業名を取得（フォールバック）
+    try:
+        response = await async_http_client.get(yahoo_quote_url(stock_code))
+        if response.status_code == 200:
+            company_name = parse_yahoo_company_name(response.content)
+            if company_name:
+                await asyncio.to_thread(materials_store.save_company_name, stock_code, company_name)
+                return company_name
+    except Exception as e:
+        print(f"Error fetching company name from Yahoo Finance: {e}")
+
+    return f"企業コード{stock_code}"
+
+
+async def fetch_from_company_ir_page_async(stock_code: str, company_name: str,
+                                           query: Optional[MaterialQuery] = None) -> List[Dict]:
+    """企業のIRページから決算資料を非同期に取得（fetch_from_company_ir_page の非同期版。失敗は例外で返す）"""
+    ir_info = get_company_ir_url(stock_code)
+    materials = direct_link_materials(ir_info, stock_code, company_name)
+
+    if ir_info.get('ir_url'):
+        materials.extend(await scrape_ir_page_async(ir_info['ir_url'], stock_code, company_name))
+
+    return query.filter(materials) if query is not None else materials
+
+
+async def fetch_parsed_async(url: str, parser: str, make_parser: Callable[[], Any],
+                             conditional: bool = True) -> Optional[Any]:
+    """
+    page_cache.fetch_parsed の非同期版（条件付きGETで取得し、変更がなければ保存済みのパース結果を返す）
+
+    本文は少しずつ読んでパーサーに渡し、パーサーが完了したら残りはダウンロードしない。
+    ページキャッシュ（SQLite）の読み書きは書き込みロックを待つことがあるので、イベントループの外で実行する
+    """
+    headers = await asyncio.to_thread(page_cache.conditional_headers, url) if conditional else {}
+    async with async_http_client.stream(url, headers=headers) as response:
+        if response.status_code == 304:
+            parsed = await asyncio.to_thread(page_cache.cached_result, url, parser, make_parser)
+            if parsed is not None:
+                return parsed
+        elif response.status_code != 200:
+            return None
+        else:
+            parsed, body = await parse_chunks_async(make_parser, async_http_client.aiter_body(response))
+
+    if response.status_code == 304:
+        # 保存済みの本文からこのパーサーの結果を作れない場合は、本文を取り直す
+        return await fetch_parsed_async(url, parser, make_parser, conditional=False)
+
+    await asyncio.to_thread(page_cache.store_result, url, response.headers, body, parser, parsed)
+    return parsed
+
+
+async def parse_chunks_async(make_parser: Callable[[], Any], chunks: AsyncIterator[bytes]) -> Tuple[Any, bytes]:
+    """page_cache.parse_chunks の非同期版（パーサーが完了を返したら残りは読まない）"""
+    parser = make_parser()
+    read = []
+    async for chunk in chunks:
+        read.append(chunk)
+        if parser.feed(chunk):
+            break
+    return parser.close(), b''.join(read)
+
+
+async def scrape_ir_page_async(ir_url: str, stock_code: str, company_name: str) -> List[Dict]:
+    """企業のIRページをスクレイピングしてPDF資料を非同期に取得（scrape_ir_page の非同期版）"""
+    parsed = await fetch_parsed_async(
+        ir_url,
+        f"ir_page:{stock_code}:{company_name}",
+        lambda: ir_page_parser(ir_url, stock_code, company_name),
+    )
+    return parsed if parsed is not None else []
+
+
+async def fetch_from_irbank_async(stock_code: str, company_name: str,
+                                  query: Optional[MaterialQuery] = None) -> List[Dict]:
+    """
+    IR BANKから決算資料を非同期に取得（fetch_from_irbank の非同期版）
+
+    詳細ページのPDFは永続マップから引き、初めて見るものだけを並行に取得する。結果は一覧の順序を保つ。
+    一覧の取得の失敗は例外で返す（詳細ページ1件ごとの失敗はその資料を除くだけ）
+    """
+    materials = []
+    query = query or MaterialQuery.for_years(3)
+
+    candidates = await fetch_parsed_async(
+        irbank_ir_url(stock_code),
+        irbank_listing_parser_name(IRBANK_LISTING_LIMIT, query),
+        lambda: irbank_listing_parser(IRBANK_LISTING_LIMIT, query),
+    )
+    if candidates is not None:
+        # 採用件数が上限に達するまで、足りない件数分ずつ詳細ページを並行に解決する
+        offset = 0
+        while offset < len(candidates) and len(materials) < IRBANK_MAX_MATERIALS:
+            batch = candidates[offset:offset + IRBANK_MAX_MATERIALS - len(materials)]
+            offset += len(batch)
+
+            pdf_urls = await resolve_irbank_pdf_urls_async([detail_url for _, detail_url in batch])
+
+            for (text, detail_url), full_pdf_url in zip(batch, pdf_urls):
+                material = build_irbank_material(text, full_pdf_url, stock_code, company_name, query)
+                if material:
+                    materials.append(material)
+
+    return materials
+
+
+async def resolve_irbank_pdf_urls_async(detail_urls: List[str]) -> List[Optional[str]]:
+    """
+    resolve_irbank_pdf_urls の非同期版（初めて見る詳細ページだけを最大 IRBANK_DETAIL_WORKERS 件ずつ取得）
+
+    永続マップの読み書きはSQLiteの書き込みロックを待つことがあるので、イベントループの外で実行する
+    """
+    known = await asyncio.to_thread(irbank_pdf_map.lookup_pdf_urls, detail_urls)
+    unknown = [detail_url for detail_url in detail_urls if detail_url not in known]
+    slots = asyncio.Semaphore(max(IRBANK_DETAIL_WORKERS, 1))
+
+    async def resolve(detail_url: str) -> Optional[str]:
+        async with slots:
+            return await _resolve_irbank_pdf_url_async(detail_url)
+
+    resolved = dict(zip(unknown, await asyncio.gather(*(resolve(detail_url) for detail_url in unknown))))
+    await asyncio.to_thread(irbank_pdf_map.store_pdf_urls, {url: pdf_url for url, pdf_url in resolved.items() if pdf_url})
+
+    return [known.get(detail_url) or resolved.get(detail_url) for detail_url in detail_urls]
+
+
+async def _resolve_irbank_pdf_url_async(detail_url: str) -> Optional[str]:
+    """IR BANKの詳細ページから最初のPDFリンクを非同期に取得"""
+    try:
+        async with async_http_client.stream(detail_url) as response:
+            if response.status_code == 200:
+                pdf_urls, _ = await parse_chunks_async(
+                    lambda: irbank_detail_parser(detail_url), async_http_client.aiter_body(response)
+                )
+                return pdf_urls[0] if pdf_urls else None
+    except Exception as e:
+        print(f"Error fetching detail page {detail_url}: {e}")
+    return None
+
+
+async def fetch_from_tdnet_async(stock_code: str, start_date: datetime, end_date: datetime,
+                                 company_name: Optional[str] = None,
+                                 doc_types: Optional[FrozenSet[str]] = None) -> List[Dict]:
+    """
+    TDnetから決算資料を非同期に取得
+
+    日次一覧の取り込みはポーラー（tdnet_poller）が全企業で共有するインデックス（tdnet_index）に対して行い、
+    企業ごとの処理はインデックスを読むだけなので、同期版をスレッドで実行する
+    """
+    if company_name is None:
+        company_name = await get_company_name_async(stock_code)
+    return await asyncio.to_thread(fetch_from_tdnet, stock_code, start_date, end_date, company_name, doc_types)
+
+
+async def fetch_from_buffettcode_async(stock_code: str, company_name: str,
+                                       query: Optional[MaterialQuery] = None) -> List[Dict]:
+    """BuffettCodeから決算資料を非同期に取得（fetch_from_buffettcode の非同期版。失敗は例外で返す）"""
+    base_url = buffettcode_ir_url(stock_code)
+    parsed = await fetch_parsed_async(
+        base_url,
+        f"buffettcode:{stock_code}:{company_name}",
+        lambda: buffettcode_parser(base_url, stock_code, company_name),
+    )
+    materials = parsed if parsed is not None else []
+    return query.filter(materials) if query is not None else materials
+
+
+# earnings_scraper で登録したソースに非同期版の取得関数を追加
+register_async_fetcher(
+    'company_ir',
+    lambda stock_code, company_name, query: fetch_from_company_ir_page_async(stock_code, company_name, query),
+)
+register_async_fetcher(
+    'irbank',
+    lambda stock_code, company_name, query: fetch_from_irbank_async(stock_code, company_name, query),
+)
+register_async_fetcher(
+    'tdnet',
+    lambda stock_code, company_name, query: fetch_from_tdnet_async(
+        stock_code, query.start_date, query.end_date, company_name, query.doc_types
+    ),
+)
+register_async_fetcher(
+    'buffettcode',
+    lambda stock_code, company_name, query: fetch_from_buffettcode_async(stock_code, company_name, query),
+)
@@ -0,0 +1,250 @@
+"""
+決算資料のメモリキャッシュ（TTL + stale-while-revalidate）
+
+証券コードごとに取得結果を保持し、
+- 取得から TTL 以内: キャッシュをそのまま返す
+- TTL を過ぎて stale 期間内: キャッシュを返し、バックグラウンドで取り直す
+- stale 期間を過ぎた・キャッシュがない: その場で取得する
+の順で応答する。件数は LRU で上限を設け、同じ証券コードの同時取得は1回にまとめる。
+一部のソースがタイムアウト・失敗した結果（complete が False）は INCOMPLETE_TTL を過ぎると
+stale として扱い、取り直す
+
+キャッシュがない場合の取得は呼び出し元のスレッドで行い、ワーカーのスレッドプールは
+バックグラウンドの取り直し専用にする（遅い取り直しが待ち行列にあっても、ほかの銘柄の
+リクエストが待たされない）。取り直しは refresh を使うので、ストアの古い結果を読まずに
+スクレイピングし直せる
+
+同期版（get）と非同期版（get_async）で同じエントリを共有する
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# 取得結果をそのまま返す秒数（デフォルト: 6時間）
+EARNINGS_CACHE_TTL = float(os.getenv('EARNINGS_CACHE_TTL', 6 * 60 * 60))
+
+# TTL を過ぎてからキャッシュを返しつつ取り直す秒数（デフォルト: 7日）
+EARNINGS_CACHE_STALE = float(os.getenv('EARNINGS_CACHE_STALE', 7 * 24 * 60 * 60))
+
+# 一部のソースがタイムアウト・失敗した結果をそのまま返す秒数（デフォルト: 5分）
+EARNINGS_CACHE_INCOMPLETE_TTL = float(os.getenv('EARNINGS_CACHE_INCOMPLETE_TTL', 5 * 60))
+
+# キャッシュする証券コードの最大数
+EARNINGS_CACHE_MAX_ENTRIES = int(os.getenv('EARNINGS_CACHE_MAX_ENTRIES', 1000))
+
+# バックグラウンドで取り直すワーカー数
+EARNINGS_CACHE_REFRESH_WORKERS = int(os.getenv('EARNINGS_CACHE_REFRESH_WORKERS', 4))
+
+Fetcher = Callable[[str], List[Dict]]
+AsyncFetcher = Callable[[str], Awaitable[List[Dict]]]
+
+
+class EarningsCache:
+    """
+    証券コード→決算資料リストのキャッシュ
+
+    Args:
+        fetch (Fetcher): 決算資料を取得する関数（fetch_earnings_materials）
+        fetch_async (AsyncFetcher): 非同期版の取得関数（get_async を使う場合）
+        refresh (Fetcher): バックグラウンドで取り直す関数（省略時は fetch）
+        refresh_async (AsyncFetcher): 非同期版の取り直す関数（省略時は fetch_async）
+        ttl (float): 取得結果をそのまま返す秒数
+        incomplete_ttl (float): 一部のソースが欠けた取得結果をそのまま返す秒数
+        stale (float): TTL を過ぎてからバックグラウンドで取り直しつつ返す秒数
+        max_entries (int): キャッシュする証券コードの最大数
+    """
+
+    def __init__(self, fetch: Fetcher, fetch_async: Optional[AsyncFetcher] = None,
+                 ttl: float = EARNINGS_CACHE_TTL, stale: float = EARNINGS_CACHE_STALE,
+                 max_entries: int = EARNINGS_CACHE_MAX_ENTRIES,
+                 refresh: Optional[Fetcher] = None, refresh_async: Optional[AsyncFetcher] = None,
+                 incomplete_ttl: float = EARNINGS_CACHE_INCOMPLETE_TTL):
+        self.fetch = fetch
+        self.fetch_async = fetch_async
+        self.refresh = refresh or fetch
+        self.refresh_async = refresh_async or fetch_async
+        self.ttl = ttl
+        self.incomplete_ttl = min(incomplete_ttl, ttl)
+        self.stale = stale
+        self.max_entries = max(max_entries, 1)
+
+        # 証券コード→(取得時刻, 決算資料リスト)。末尾ほど最近使われたもの
+        self._entries: 'OrderedDict[str, Tuple[float, List[Dict]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        # 取得中の証券コード（呼び出し元のスレッドでの取得と、バックグラウンドの取り直しは別に管理する）
+        self._inflight: Dict[str, Future] = {}
+        self._refreshing: Dict[str, Future] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self._refreshing_async: Dict[str, asyncio.Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(EARNINGS_CACHE_REFRESH_WORKERS, 1),
+            thread_name_prefix='earnings-cache-refresh',
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, stock_code: str) -> Tuple[Optional[List[Dict]], float]:
+        """キャッシュを引く（戻り値は (決算資料リスト, 取得からの経過秒数)、なければ (None, inf)）"""
+        with self._lock:
+            entry = self._entries.get(stock_code)
+            if entry is None:
+                return None, float('inf')
+            self._entries.move_to_end(stock_code)
+            fetched_at, materials = entry
+        return materials, time.monotonic() - fetched_at
+
+    def _store(self, stock_code: str, materials: List[Dict]):
+        # 空の結果（取得エラー）はキャッシュしない
+        if not materials:
+            return
+        fetched_at = time.monotonic()
+        if not getattr(materials, 'complete', True):
+            # 欠けのある結果は incomplete_ttl で stale になるよう、取得時刻を前にずらす
+            fetched_at -= self.ttl - self.incomplete_ttl
+        with self._lock:
+            self._entries[stock_code] = (fetched_at, materials)
+            self._entries.move_to_end(stock_code)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, stock_code: str) -> Optional[List[Dict]]:
+        """
+        キャッシュ済みの決算資料を取得（stale 期間内なら返す。取得・再取得は行わない）
+
+        条件付きの問い合わせで全件のキャッシュを絞り込むのに使う（返したリストは変更しないこと）
+        """
+        materials, age = self._lookup(stock_code)
+        if materials is not None and age < self.ttl + self.stale:
+            return materials
+        return None
+
+    def invalidate(self, stock_code: str):
+        """証券コードのキャッシュを破棄（次の取得はその場で取り直す）"""
+        with self._lock:
+            self._entries.pop(stock_code, None)
+
+    def clear(self):
+        """すべてのキャッシュを破棄"""
+        with self._lock:
+            self._entries.clear()
+
+    def _fetch(self, stock_code: str) -> List[Dict]:
+        """
+        呼び出し元のスレッドで取得する（同じ証券コードを取得中のスレッドがあればその結果を待つ）
+        """
+        with self._lock:
+            future = self._inflight.get(stock_code)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[stock_code] = future
+        if not owner:
+            return future.result()
+
+        try:
+            materials = self.fetch(stock_code)
+            self._store(stock_code, materials)
+            future.set_result(materials)
+            return materials
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(stock_code) is future:
+                    del self._inflight[stock_code]
+
+    def _refresh_and_store(self, stock_code: str) -> List[Dict]:
+        materials = self.refresh(stock_code)
+        self._store(stock_code, materials)
+        return materials
+
+    def _start_refresh(self, stock_code: str) -> Future:
+        """証券コードのバックグラウンドの取り直しを開始（すでに取り直し中ならその Future を返す）"""
+        with self._lock:
+            future = self._refreshing.get(stock_code)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._refresh_and_store, stock_code)
+            self._refreshing[stock_code] = future
+        future.add_done_callback(lambda _: self._finish_refresh(stock_code, future))
+        return future
+
+    def _finish_refresh(self, stock_code: str, future: Future):
+        with self._lock:
+            if self._refreshing.get(stock_code) is future:
+                del self._refreshing[stock_code]
+        if future.exception() is not None:
+            print(f"❌ 決算資料の再取得エラー ({stock_code}): {future.exception()}")
+
+    def get(self, stock_code: str) -> List[Dict]:
+        """
+        証券コードの決算資料を取得（キャッシュの鮮度に応じて即答・バックグラウンド更新・同期取得）
+
+        Args:
+            stock_code (str): 証券コード
+
+        Returns:
+            List[Dict]: 決算資料リスト
+        """
+        materials, age = self._lookup(stock_code)
+        if materials is not None and age < self.ttl:
+            return materials
+
+        if materials is not None and age < self.ttl + self.stale:
+            self._start_refresh(stock_code)
+            return materials
+
+        return self._fetch(stock_code)
+
+    async def get_async(self, stock_code: str) -> List[Dict]:
+        """
+        get の非同期版（取得には fetch_async を使う）
+
+        Args:
+            stock_code (str): 証券コード
+
+        Returns:
+            List[Dict]: 決算資料リスト
+        """
+        materials, age = self._lookup(stock_code)
+        if materials is not None and age < self.ttl:
+            return materials
+
+        if materials is not None and age < self.ttl + self.stale:
+            self._start_fetch_async(stock_code, refresh=True)
+            return materials
+
+        future = self._start_fetch_async(stock_code)
+        return await asyncio.shield(future)
+
+    def _start_fetch_async(self, stock_code: str, refresh: bool = False) -> asyncio.Future:
+        """
+        証券コードの非同期取得を開始（すでに取得中ならその Future を返す）
+
+        Args:
+            refresh (bool): バックグラウンドの取り直し（refresh_async を使う）
+        """
+        inflight = self._refreshing_async if refresh else self._inflight_async
+        fetch = self.refresh_async if refresh else self.fetch_async
+        future = inflight.get(stock_code)
+        if future is not None and not future.done():
+            return future
+
+        async def fetch_and_store() -> List[Dict]:
+            try:
+                materials = await fetch(stock_code)
+                self._store(stock_code, materials)
+                return materials
+            finally:
+                if inflight.get(stock_code) is future:
+                    del inflight[stock_code]
+
+        future = asyncio.ensure_future(fetch_and_store())
+        inflight[stock_code] = future
+        return future
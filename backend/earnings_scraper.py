@@ -1,56 +1,116 @@
-import requests
+import http_client
+import irbank_pdf_map
+import materials_store
+import html_links
+import page_cache
+import tdnet_index
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import time
+from typing import Any, Callable, FrozenSet, List, Dict, Optional, Tuple
+import os
 import re
 from urllib.parse import urljoin, urlparse
 from company_ir_urls import get_company_ir_url
-
-def get_earnings_materials(stock_code: str, years: int = 5) -> List[Dict]:
+from material_metadata import DOCUMENT_TYPES, extract_metadata, extract_metadata_batch
+from material_sources import MaterialQuery, MaterialSource, fetch_all_sources, register_source
+
+# IR BANKの詳細ページを並列に取得するワーカー数（ホストごとの同時接続数は http_client 側で制限）
+IRBANK_DETAIL_WORKERS = int(os.getenv('IRBANK_DETAIL_WORKERS', 4))
+
+# 主要企業の企業名（ネットワークに問い合わせずに返す）
+MAJOR_COMPANY_NAMES = {
+    "7203": "トヨタ自動車",
+    "9984": "ソフトバンクグループ",
+    "6758": "ソニーグループ",
+    "8306": "三菱UFJフィナンシャル・グループ",
+    "9437": "NTTドコモ",
+    "6861": "キーエンス",
+    "6954": "ファナック",
+    "4063": "信越化学工業",
+    "9433": "KDDI",
+    "4502": "武田薬品工業"
+}
+
+# 企業名の解決に使う株式マスターのインデックスを返す関数（set_stock_index_provider() で登録）
+_stock_index_provider: Optional[Callable[[], Any]] = None
+
+# IR BANKから取得する決算資料の最大件数（3年分の四半期決算）
+IRBANK_MAX_MATERIALS = 15
+
+# IR BANKの一覧ページから集める候補リンクの最大件数（PDFが見つからない詳細ページの分の余裕を持たせる）
+IRBANK_LISTING_LIMIT = int(os.getenv('IRBANK_LISTING_LIMIT', IRBANK_MAX_MATERIALS * 2))
+
+# ページキャッシュでIR BANKの一覧のパース結果を区別する名前（irbank_listing_parser_name で条件を付ける）
+IRBANK_LISTING_PARSER = 'irbank_listing'
+
+def get_earnings_materials(stock_code: str, years: int = 5, query: Optional[MaterialQuery] = None,
+                           use_store: bool = True) -> List[Dict]:
     """
-    指定された証券コードの決算説明会資料を取得する
+    指定された証券コードの決算説明会資料を取得する（見つからない場合はサンプルデータ）
 
     Args:
         stock_code (str): 4桁の証券コード
         years (int): 取得する年数（デフォルト: 5年）
+        query (MaterialQuery): 期間・資料の種類の条件（省略時は years 年分のすべての資料）
+        use_store (bool): False の場合はストアを読まずにスクレイピングする（結果は書き戻す）
 
     Returns:
         List[Dict]: 決算資料のリスト
     """
+    materials = fetch_earnings_materials(stock_code, years, query, use_store)
+    return materials or sample_materials(stock_code, get_company_name(stock_code), query or MaterialQuery.for_years(years))
+
+
+def fetch_earnings_materials(stock_code: str, years: int = 5, query: Optional[MaterialQuery] = None,
+                             use_store: bool = True) -> List[Dict]:
+    """
+    指定された証券コードの決算説明会資料をストア・各ソースから取得する（サンプルデータは返さない）
+
+    query を指定した場合は、ストアに全件の結果があればそれを絞り込み、なければ条件を
+    各ソースに渡して必要な分だけ取得する（絞り込んだ結果はストアに書き戻さない）。
+    キャッシュ（EarningsCache）にはこちらの結果を入れ、サンプルデータは応答の直前に補う
+
+    Args:
+        stock_code (str): 4桁の証券コード
+        years (int): 取得する年数（デフォルト: 5年）
+        query (MaterialQuery): 期間・資料の種類の条件（省略時は years 年分のすべての資料）
+        use_store (bool): False の場合はストアを読まずにスクレイピングする（キャッシュの取り直し用。結果は書き戻す）
+
+    Returns:
+        List[Dict]: 決算資料のリスト（見つからない・エラーの場合は空。一部のソースがタイムアウト・
+            失敗した場合は complete が False の SourceResults）
+    """
     materials = []
+    # 一部のソースが欠けた取得結果（欠けがなければ None）
+    results = None
 
     # 現在の日付から指定年数前までの範囲を設定
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=years * 365)
+    narrowed = query is not None
+    if query is None:
+        query = MaterialQuery.for_years(years)
 
     try:
         # まず企業名を取得
         company_name = get_company_name(stock_code)
 
-        # 複数のソースから資料を取得
-        # 1. 企業のIRページから取得を試みる
-        print(f"Fetching materials for {stock_code} - {company_name}")
-        ir_materials = fetch_from_company_ir_page(stock_code, company_name)
-        materials.extend(ir_materials)
-
-        # 2. 資料が見つからない場合はサンプルデータを生成（フォールバック）
-        if not materials:
-            print(f"No materials found, generating sample data for {stock_code} - {company_name}")
-            # サンプルデータも3年以内に制限
-            materials = generate_realistic_sample_data(stock_code, company_name, 3)
-
-        # 重複を削除（URLベース）
-        unique_materials = {}
-        for material in materials:
-            url = material.get('pdf_url', '')
-            if url and url not in unique_materials:
-                unique_materials[url] = material
-
-        materials = list(unique_materials.values())
+        # ストアに鮮度内の結果があればそれを使い、なければ登録されているすべてのソースから
+        # 並列に取得してストアに書き戻す（PDFのURLで重複を除いてマージ）
+        materials = materials_store.load_materials(stock_code) if use_store else None
+        if materials is None:
+            print(f"Fetching materials for {stock_code} - {company_name}")
+            materials = fetch_all_sources(stock_code, company_name, query)
+            if not materials.complete:
+                # タイムアウト・失敗したソースがある結果はストアに保存しない（キャッシュも短い TTL にする）
+                results = materials
+                print(f"⚠️  Incomplete materials for {stock_code} (timed out: {results.timed_out}, failed: {results.failed})")
+            elif not narrowed:
+                materials_store.save_materials(stock_code, materials)
+        materials = query.filter(materials)
 
         # 日付でソート（新しい順）
         materials.sort(key=lambda x: x.get('announcement_date', ''), reverse=True)
+        if results is not None:
+            materials = results.with_materials(materials)
 
         print(f"Found {len(materials)} materials for {stock_code}")
 
@@ -62,210 +122,244 @@ def get_earnings_materials(stock_code: str, years: int = 5) -> List[Dict]:
     return materials
 
 
+def sample_materials(stock_code: str, company_name: str, query: MaterialQuery) -> List[Dict]:
+    """
+    資料が見つからない場合のサンプルデータ（フォールバック）
+
+    ストア・キャッシュには入れず、レスポンスを返す直前に使う
+    """
+    print(f"No materials found, generating sample data for {stock_code} - {company_name}")
+    # サンプルデータも3年以内に制限
+    materials = query.filter(generate_realistic_sample_data(stock_code, company_name, 3))
+    materials.sort(key=lambda x: x.get('announcement_date', ''), reverse=True)
+    return materials
+
+
+def set_stock_index_provider(provider: Callable[[], Any]):
+    """
+    企業名の解決に使う株式マスターのインデックスを登録
+
+    Args:
+        provider: get(stock_code) でレコード（'name' を含む辞書）を返すインデックスを返す関数
+            （app.get_stock_index）
+    """
+    global _stock_index_provider
+    _stock_index_provider = provider
+
+
+def lookup_company_name(stock_code: str) -> Optional[str]:
+    """
+    ネットワークに問い合わせずに企業名を引く（株式マスター → 主要企業 → 以前に解決した企業名）
+
+    Returns:
+        Optional[str]: 企業名（どこにもない場合は None）
+    """
+    if _stock_index_provider is not None:
+        try:
+            record = _stock_index_provider().get(stock_code)
+            if record and record.get('name'):
+                return record['name']
+        except Exception as e:
+            print(f"Error looking up company name in stock master: {e}")
+
+    if stock_code in MAJOR_COMPANY_NAMES:
+        return MAJOR_COMPANY_NAMES[stock_code]
+
+    return materials_store.load_company_name(stock_code)
+
+
 def get_company_name(stock_code: str) -> str:
     """
     証券コードから企業名を取得
 
+    株式マスター・保存済みの企業名にない証券コードだけIR BANK・Yahoo Financeに問い合わせ、
+    解決できた企業名は保存する
+
     Args:
         stock_code (str): 証券コード
 
     Returns:
         str: 企業名
     """
-    # 主要企業のマッピング
-    company_names = {
-        "7203": "トヨタ自動車",
-        "9984": "ソフトバンクグループ",
-        "6758": "ソニーグループ",
-        "8306": "三菱UFJフィナンシャル・グループ",
-        "9437": "NTTドコモ",
-        "6861": "キーエンス",
-        "6954": "ファナック",
-        "4063": "信越化学工業",
-        "9433": "KDDI",
-        "4502": "武田薬品工業"
-    }
-
-    if stock_code in company_names:
-        return company_names[stock_code]
+    company_name = lookup_company_name(stock_code)
+    if company_name:
+        return company_name
 
     # IR BANKから企業名を取得
     try:
-        url = f"https://irbank.net/{stock_code}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_client.get(irbank_company_url(stock_code))
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            # IR BANKのページタイトルから企業名を抽出
-            h1_elem = soup.find('h1', class_='company-name')
-            if not h1_elem:
-                h1_elem = soup.find('h1')
-            if h1_elem:
-                company_name = h1_elem.get_text(strip=True)
-                # "証券コード 企業名" または "企業名 (証券コード)" の形式から企業名を抽出
-                # まず先頭の証券コードを削除
-                company_name = re.sub(r'^\d{4}\s+', '', company_name)
-                # 次に括弧内の証券コードを削除
-                match = re.match(r'(.+?)\s*[\(（]', company_name)
-                if match:
-                    return match.group(1).strip()
+            company_name = parse_irbank_company_name(response.content)
+            if company_name:
+                materials_store.save_company_name(stock_code, company_name)
                 return company_name
     except Exception as e:
         print(f"Error fetching company name from IR BANK: {e}")
 
     # Yahoo Financeから企業名を取得（フォールバック）
     try:
-        url = f"https://finance.yahoo.co.jp/quote/{stock_code}.T"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_client.get(yahoo_quote_url(stock_code))
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            title_elem = soup.find('h1')
-            if title_elem:
-                title = title_elem.get_text(strip=True)
-                # "企業名 (コード)" の形式から企業名を抽出
-                match = re.match(r'(.+?)\s*\(', title)
-                if match:
-                    return match.group(1).strip()
+            company_name = parse_yahoo_company_name(response.content)
+            if company_name:
+                materials_store.save_company_name(stock_code, company_name)
+                return company_name
     except Exception as e:
         print(f"Error fetching company name from Yahoo Finance: {e}")
 
     return f"企業コード{stock_code}"
 
 
-def fetch_from_tdnet(stock_code: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+def irbank_company_url(stock_code: str) -> str:
+    """IR BANKの企業ページのURL"""
+    return f"https://irbank.net/{stock_code}"
+
+
+def yahoo_quote_url(stock_code: str) -> str:
+    """Yahoo!ファイナンスの銘柄ページのURL"""
+    return f"https://finance.yahoo.co.jp/quote/{stock_code}.T"
+
+
+def parse_irbank_company_name(content: bytes) -> Optional[str]:
+    """IR BANKの企業ページから企業名を抽出"""
+    soup = BeautifulSoup(content, 'html.parser')
+    # IR BANKのページタイトルから企業名を抽出
+    h1_elem = soup.find('h1', class_='company-name')
+    if not h1_elem:
+        h1_elem = soup.find('h1')
+    if h1_elem:
+        company_name = h1_elem.get_text(strip=True)
+        # "証券コード 企業名" または "企業名 (証券コード)" の形式から企業名を抽出
+        # まず先頭の証券コードを削除
+        company_name = re.sub(r'^\d{4}\s+', '', company_name)
+        # 次に括弧内の証券コードを削除
+        match = re.match(r'(.+?)\s*[\(（]', company_name)
+        if match:
+            return match.group(1).strip()
+        return company_name
+    return None
+
+
+def parse_yahoo_company_name(content: bytes) -> Optional[str]:
+    """Yahoo!ファイナンスの銘柄ページから企業名を抽出"""
+    soup = BeautifulSoup(content, 'html.parser')
+    title_elem = soup.find('h1')
+    if title_elem:
+        title = title_elem.get_text(strip=True)
+        # "企業名 (コード)" の形式から企業名を抽出
+        match = re.match(r'(.+?)\s*\(', title)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def fetch_from_tdnet(stock_code: str, start_date: datetime, end_date: datetime,
+                     company_name: Optional[str] = None, doc_types: Optional[FrozenSet[str]] = None) -> List[Dict]:
     """
     TDnetから決算資料を取得
 
+    日次一覧の共有インデックス（tdnet_index）への取り込みはポーラー（tdnet_poller）がバックグラウンドで行い、
+    企業ごとの検索はインデックスを読むだけにする。まだ取り込まれていない直近の日と、インデックスが
+    使えない環境では、直近数日分の日次一覧の1ページ目だけを直接読む
+
     Args:
         stock_code (str): 証券コード
         start_date (datetime): 開始日
         end_date (datetime): 終了日
+        company_name (str): 企業名（省略時は get_company_name() で取得）
+        doc_types (FrozenSet[str]): 資料の種類（省略時はすべて）
 
     Returns:
-        List[Dict]: 決算資料リスト
+        List[Dict]: 決算資料リスト（取得に失敗した場合は例外を送出し、エンジンがソースの失敗として記録する）
     """
-    materials = []
-
-    try:
-        # TDnetの検索ページを使用
-        # 注: TDnetは動的コンテンツが多いため、完全なスクレイピングには制限があります
-        base_url = "https://www.release.tdnet.info"
-
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-
-        # 過去の日付範囲でループ（最新から過去へ）
-        current_date = end_date
-        search_days = (end_date - start_date).days
+    if company_name is None:
+        company_name = get_company_name(stock_code)
 
-        # 最大30日分のみ検索（負荷軽減のため）
-        for i in range(min(search_days, 30)):
-            date_str = current_date.strftime('%Y%m%d')
+    disclosures = tdnet_index.lookup_disclosures(tdnet_index.get_tdnet_index(), stock_code, start_date, end_date)
+    return build_tdnet_materials(disclosures, company_name, doc_types)
 
-            # TDnetの日次一覧ページ
-            url = f"{base_url}/inbs/I_list_001_{date_str}.html"
 
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-                if response.status_code == 200:
-                    response.encoding = 'utf-8'
-                    soup = BeautifulSoup(response.content, 'html.parser')
-
-                    # テーブルから該当企業の開示情報を探す
-                    rows = soup.find_all('tr')
-                    for row in rows:
-                        cells = row.find_all('td')
-                        if len(cells) >= 4:
-                            # 証券コードをチェック
-                            code_cell = cells[0].get_text(strip=True)
-                            if stock_code in code_cell:
-                                # タイトルと資料リンクを取得
-                                title_cell = cells[2]
-                                title = title_cell.get_text(strip=True)
-
-                                # 決算関連の資料のみフィルタ
-                                if any(keyword in title for keyword in ['決算', '業績', '説明会', '説明資料', '短信', '決定', 'IR']):
-                                    # PDFリンクを探す
-                                    link = title_cell.find('a')
-                                    if link and 'href' in link.attrs:
-                                        pdf_url = urljoin(base_url, link['href'])
-
-                                        materials.append({
-                                            'title': title,
-                                            'company_name': get_company_name(stock_code),
-                                            'stock_code': stock_code,
-                                            'fiscal_year': extract_fiscal_year(title),
-                                            'period': extract_period(title),
-                                            'announcement_date': current_date.strftime('%Y-%m-%d'),
-                                            'pdf_url': pdf_url,
-                                            'type': classify_document_type(title),
-                                            'source': 'TDnet'
-                                        })
-
-                time.sleep(0.5)  # レート制限のため待機
-            except requests.RequestException as e:
-                print(f"Error fetching TDnet data for {date_str}: {e}")
-                continue
+def build_tdnet_materials(disclosures: List[Dict], company_name: str,
+                          doc_types: Optional[FrozenSet[str]] = None) -> List[Dict]:
+    """
+    TDnetの開示から決算関連のものを決算資料に変換
 
-            current_date -= timedelta(days=1)
+    Args:
+        disclosures (List[Dict]): tdnet_index.parse_tdnet_day 形式の開示
+        company_name (str): 企業名
+        doc_types (FrozenSet[str]): 資料の種類（省略時はすべて）
 
-    except Exception as e:
-        print(f"Error in fetch_from_tdnet: {e}")
+    Returns:
+        List[Dict]: 決算資料リスト
+    """
+    # 決算関連の資料のみフィルタ
+    disclosures = [
+        disclosure for disclosure in disclosures
+        if any(keyword in disclosure['title'] for keyword in ['決算', '業績', '説明会', '説明資料', '短信', '決定', 'IR'])
+    ]
 
+    materials = []
+    for disclosure, metadata in zip(disclosures, extract_metadata_batch(disclosure['title'] for disclosure in disclosures)):
+        if doc_types is not None and metadata.doc_type not in doc_types:
+            continue
+        materials.append({
+            'title': disclosure['title'],
+            'company_name': company_name,
+            'stock_code': disclosure['stock_code'],
+            'fiscal_year': metadata.fiscal_year,
+            'period': metadata.period,
+            'announcement_date': disclosure['disclosure_date'],
+            'pdf_url': disclosure['pdf_url'],
+            'type': metadata.doc_type,
+            'source': 'TDnet'
+        })
     return materials
 
 
-def fetch_from_company_ir_page(stock_code: str, company_name: str) -> List[Dict]:
+def fetch_from_company_ir_page(stock_code: str, company_name: str,
+                               query: Optional[MaterialQuery] = None) -> List[Dict]:
     """
     企業のIRページから決算資料を取得
 
     Args:
         stock_code (str): 証券コード
         company_name (str): 企業名
+        query (MaterialQuery): 期間・資料の種類の条件（省略時は絞り込まない）
 
     Returns:
-        List[Dict]: 決算資料リスト
+        List[Dict]: 決算資料リスト（取得に失敗した場合は例外を送出し、エンジンがソースの失敗として記録する）
     """
-    materials = []
+    # company_ir_urls.pyから企業のIR情報を取得
+    ir_info = get_company_ir_url(stock_code)
 
-    try:
-        # company_ir_urls.pyから企業のIR情報を取得
-        ir_info = get_company_ir_url(stock_code)
-
-        # direct_linksがある場合はそれを使用
-        if ir_info.get('direct_links'):
-            for pdf_url in ir_info['direct_links']:
-                # URLからタイトルを推定
-                filename = pdf_url.split('/')[-1]
-                materials.append({
-                    'title': filename.replace('.pdf', '').replace('_', ' '),
-                    'company_name': company_name,
-                    'stock_code': stock_code,
-                    'fiscal_year': extract_fiscal_year(filename),
-                    'period': extract_period(filename),
-                    'announcement_date': datetime.now().strftime('%Y-%m-%d'),
-                    'pdf_url': pdf_url,
-                    'type': classify_document_type(filename),
-                    'source': '企業IRページ'
-                })
-
-        # IRページURLがある場合はスクレイピング
-        if ir_info.get('ir_url'):
-            scraped_materials = scrape_ir_page(ir_info['ir_url'], stock_code, company_name)
-            materials.extend(scraped_materials)
-
-        # IR BANKから決算資料を取得（多くの企業の決算資料が集約されている）
-        materials.extend(fetch_from_irbank(stock_code, company_name))
+    # direct_linksがある場合はそれを使用
+    materials = direct_link_materials(ir_info, stock_code, company_name)
 
-    except Exception as e:
-        print(f"Error in fetch_from_company_ir_page: {e}")
+    # IRページURLがある場合はスクレイピング
+    if ir_info.get('ir_url'):
+        materials.extend(scrape_ir_page(ir_info['ir_url'], stock_code, company_name))
 
+    return query.filter(materials) if query is not None else materials
+
+
+def direct_link_materials(ir_info: Dict, stock_code: str, company_name: str) -> List[Dict]:
+    """company_ir_urls.py に登録されたPDFの直接リンクを決算資料に変換"""
+    materials = []
+    for pdf_url in ir_info.get('direct_links') or []:
+        # URLからタイトルを推定
+        filename = pdf_url.split('/')[-1]
+        metadata = extract_metadata(filename)
+        materials.append({
+            'title': filename.replace('.pdf', '').replace('_', ' '),
+            'company_name': company_name,
+            'stock_code': stock_code,
+            'fiscal_year': metadata.fiscal_year,
+            'period': metadata.period,
+            'announcement_date': datetime.now().strftime('%Y-%m-%d'),
+            'pdf_url': pdf_url,
+            'type': metadata.doc_type,
+            'source': '企業IRページ'
+        })
     return materials
 
 
@@ -279,285 +373,355 @@ def scrape_ir_page(ir_url: str, stock_code: str, company_name: str) -> List[Dict
         company_name (str): 企業名
 
     Returns:
-        List[Dict]: 決算資料リスト
+        List[Dict]: 決算資料リスト（ページが200以外の場合は空。取得に失敗した場合は例外を送出する）
     """
-    materials = []
+    # 前回から変更がなければ（304）保存済みのパース結果を使う
+    parsed = page_cache.fetch_parsed(
+        ir_url,
+        f"ir_page:{stock_code}:{company_name}",
+        lambda: ir_page_parser(ir_url, stock_code, company_name),
+    )
+    return parsed if parsed is not None else []
 
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
 
-        response = requests.get(ir_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # すべてのリンクを探す
-            links = soup.find_all('a', href=True)
-            for link in links:
-                href = link['href']
-                text = link.get_text(strip=True)
-
-                # PDFリンクをフィルタ
-                if href.endswith('.pdf') or '.pdf' in href.lower():
-                    # 決算関連のキーワードでフィルタ
-                    if any(keyword in text for keyword in ['決算', '説明', '資料', 'プレゼン', '短信', 'presentation', 'earnings', 'financial']):
-                        # 絶対URLに変換
-                        full_url = href if href.startswith('http') else urljoin(ir_url, href)
-
-                        materials.append({
-                            'title': text if text else href.split('/')[-1],
-                            'company_name': company_name,
-                            'stock_code': stock_code,
-                            'fiscal_year': extract_fiscal_year(text or href),
-                            'period': extract_period(text or href),
-                            'announcement_date': extract_date_from_text(text or href) or datetime.now().strftime('%Y-%m-%d'),
-                            'pdf_url': full_url,
-                            'type': classify_document_type(text or href),
-                            'source': '企業IRページ'
-                        })
+def parse_ir_page(content: bytes, ir_url: str, stock_code: str, company_name: str) -> List[Dict]:
+    """
+    企業のIRページのHTMLから決算関連のPDF資料を抽出
 
-    except Exception as e:
-        print(f"Error scraping IR page {ir_url}: {e}")
+    Args:
+        content (bytes): ページのHTML
+        ir_url (str): IRページのURL（相対リンクの解決に使う）
+        stock_code (str): 証券コード
+        company_name (str): 企業名
 
-    return materials
+    Returns:
+        List[Dict]: 決算資料リスト
+    """
+    return ir_page_parser(ir_url, stock_code, company_name).parse(content)
+
+
+def ir_page_parser(ir_url: str, stock_code: str, company_name: str) -> html_links.LinkParser:
+    """企業のIRページのインクリメンタルパーサー（引数は parse_ir_page と同じ）"""
+
+    def select(href: str, text: str) -> Optional[Dict]:
+        # PDFリンクをフィルタ
+        if not (href.endswith('.pdf') or '.pdf' in href.lower()):
+            return None
+        # 決算関連のキーワードでフィルタ
+        if not any(keyword in text for keyword in ['決算', '説明', '資料', 'プレゼン', '短信', 'presentation', 'earnings', 'financial']):
+            return None
+
+        # 絶対URLに変換
+        full_url = href if href.startswith('http') else urljoin(ir_url, href)
+        metadata = extract_metadata(text or href)
+        return {
+            'title': text if text else href.split('/')[-1],
+            'company_name': company_name,
+            'stock_code': stock_code,
+            'fiscal_year': metadata.fiscal_year,
+            'period': metadata.period,
+            'announcement_date': metadata.announcement_date or datetime.now().strftime('%Y-%m-%d'),
+            'pdf_url': full_url,
+            'type': metadata.doc_type,
+            'source': '企業IRページ'
+        }
 
+    return html_links.LinkParser(select)
 
-def fetch_from_irbank(stock_code: str, company_name: str) -> List[Dict]:
+
+def fetch_from_irbank(stock_code: str, company_name: str, query: Optional[MaterialQuery] = None) -> List[Dict]:
     """
-    IR BANKから決算資料を取得（過去1年以内のもの）
+    IR BANKから決算資料を取得
+
+    一覧ページから候補リンクを集め、詳細ページからのPDFリンク解決はホストごとの
+    同時接続数・レート制限付きのワーカープールで並列に行う（結果は一覧の順序を保つ）。
+    解決済みの詳細ページは永続マップから引くので、リクエストは初めて見るリンクの分だけになる。
+    一覧は候補の上限・開始日に達したところで読むのをやめ、パース結果はその条件ごとの名前で保存する。
+    日付が変わって条件が変わっても、開始日は後ろにずれるだけなので、304 の場合は保存済みの
+    （途中までの）本文をパースし直すだけで済む
 
     Args:
         stock_code (str): 証券コード
         company_name (str): 企業名
+        query (MaterialQuery): 期間・資料の種類の条件（省略時は過去3年のすべての資料）
 
     Returns:
-        List[Dict]: 決算資料リスト
+        List[Dict]: 決算資料リスト（一覧の取得に失敗した場合は例外を送出し、エンジンがソースの失敗として記録する。
+            詳細ページ1件ごとの失敗はその資料を除くだけにする）
     """
     materials = []
+    query = query or MaterialQuery.for_years(3)
+
+    # IRページをチェック（決算説明会資料が多い）
+    # 一覧ページは条件付きGETで取得し、変更がなければ保存済みの候補リンクを使う
+    candidates = page_cache.fetch_parsed(
+        irbank_ir_url(stock_code),
+        irbank_listing_parser_name(IRBANK_LISTING_LIMIT, query),
+        lambda: irbank_listing_parser(IRBANK_LISTING_LIMIT, query),
+    )
+    if candidates is not None:
+        # 採用件数が上限に達するまで、足りない件数分ずつ詳細ページを並列に解決する
+        offset = 0
+        while offset < len(candidates) and len(materials) < IRBANK_MAX_MATERIALS:
+            batch = candidates[offset:offset + IRBANK_MAX_MATERIALS - len(materials)]
+            offset += len(batch)
+
+            pdf_urls = resolve_irbank_pdf_urls([detail_url for _, detail_url in batch])
+
+            for (text, detail_url), full_pdf_url in zip(batch, pdf_urls):
+                material = build_irbank_material(text, full_pdf_url, stock_code, company_name, query)
+                if material:
+                    materials.append(material)
 
-    try:
-        # IRページをチェック（決算説明会資料が多い）
-        ir_url = f"https://irbank.net/{stock_code}/ir"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
+    return materials
 
-        # 3年前の日付を計算
-        three_years_ago = datetime.now() - timedelta(days=365 * 3)
 
-        response = requests.get(ir_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # 決算資料のリンクを探す（最大15件に制限 - 3年分の四半期決算）
-            links = soup.find_all('a', href=True)
-            material_count = 0
-            max_materials = 15
-
-            for link in links:
-                if material_count >= max_materials:
-                    break
-
-                href = link['href']
-                text = link.get_text(strip=True)
-
-                # 決算説明会資料のみをフィルタ（決算短信は除外）
-                if any(keyword in text for keyword in ['決算説明', '説明資料', 'プレゼン', '説明会']) and '短信' not in text:
-                    # 相対URLを絶対URLに変換
-                    if href.startswith('/'):
-                        detail_url = urljoin('https://irbank.net', href)
-
-                        # 詳細ページからPDFリンクを取得
-                        try:
-                            detail_response = requests.get(detail_url, headers=headers, timeout=10)
-                            if detail_response.status_code == 200:
-                                detail_soup = BeautifulSoup(detail_response.content, 'html.parser')
-                                pdf_links = detail_soup.find_all('a', href=True)
-
-                                for pdf_link in pdf_links:
-                                    pdf_href = pdf_link['href']
-                                    if '.pdf' in pdf_href.lower():
-                                        full_pdf_url = urljoin(detail_url, pdf_href)
-
-                                        # 年度と期を推定
-                                        fiscal_year = extract_fiscal_year(text)
-                                        period = extract_period(text)
-
-                                        # 日付を推定（テキストまたはURLから）
-                                        announcement_date = extract_date_from_text(text) or extract_date_from_text(full_pdf_url) or datetime.now().strftime('%Y-%m-%d')
-
-                                        # 日付が3年以内かチェック
-                                        try:
-                                            material_date = datetime.strptime(announcement_date, '%Y-%m-%d')
-                                            if material_date >= three_years_ago:
-                                                materials.append({
-                                                    'title': text,
-                                                    'company_name': company_name,
-                                                    'stock_code': stock_code,
-                                                    'fiscal_year': fiscal_year,
-                                                    'period': period,
-                                                    'announcement_date': announcement_date,
-                                                    'pdf_url': full_pdf_url,
-                                                    'type': classify_document_type(text),
-                                                    'source': 'IR BANK'
-                                                })
-                                                material_count += 1
-                                        except:
-                                            # 日付のパースに失敗した場合は含める
-                                            materials.append({
-                                                'title': text,
-                                                'company_name': company_name,
-                                                'stock_code': stock_code,
-                                                'fiscal_year': fiscal_year,
-                                                'period': period,
-                                                'announcement_date': announcement_date,
-                                                'pdf_url': full_pdf_url,
-                                                'type': classify_document_type(text),
-                                                'source': 'IR BANK'
-                                            })
-                                            material_count += 1
-
-                                        break  # 1つのPDFリンクが見つかったら次の資料へ
-
-                            time.sleep(0.5)  # レート制限のため待機
-                        except Exception as e:
-                            print(f"Error fetching detail page {detail_url}: {e}")
-                            continue
+def irbank_ir_url(stock_code: str) -> str:
+    """IR BANKの企業別IR一覧ページのURL"""
+    return f"https://irbank.net/{stock_code}/ir"
 
-    except Exception as e:
-        print(f"Error fetching from IR BANK: {e}")
 
-    return materials
+def parse_irbank_listing(content: bytes, limit: Optional[int] = None,
+                         query: Optional[MaterialQuery] = None) -> List[Tuple[str, str]]:
+    """
+    IR BANKのIR一覧ページから決算説明会資料の詳細ページへのリンクを抽出（決算短信は除外）
 
+    Args:
+        content (bytes): ページのHTML
+        limit (int): 集める最大件数（query の条件に合うリンクだけを数える）
+        query (MaterialQuery): リンクテキストの日付・種類が条件に合うリンクだけを集め、
+            日付が開始日より古いリンクに達したらそこで打ち切る（一覧は新しい順）
 
-def fetch_from_buffettcode(stock_code: str, company_name: str) -> List[Dict]:
+    Returns:
+        List[Tuple[str, str]]: (リンクテキスト, 詳細ページの絶対URL) のリスト（ページ内の順序）
+    """
+    return irbank_listing_parser(limit, query).parse(content)
+
+
+def irbank_listing_parser(limit: Optional[int] = None,
+                          query: Optional[MaterialQuery] = None) -> html_links.LinkParser:
+    """IR BANKのIR一覧ページのインクリメンタルパーサー（引数は parse_irbank_listing と同じ）"""
+    def select(href: str, text: str) -> Optional[Tuple[str, str]]:
+        candidate = irbank_listing_candidate(href, text)
+        # 開始日より前のリンクは stop() で打ち切るために渡し、それ以外の条件に合わないリンクは数えずに飛ばす
+        if candidate is None or query is None or irbank_candidate_older(candidate, query):
+            return candidate
+        return candidate if irbank_candidate_accepted(candidate, query) else None
+
+    def stop(candidate: Tuple[str, str]) -> bool:
+        return irbank_candidate_older(candidate, query)
+
+    return html_links.LinkParser(select, limit=limit, stop=stop if query is not None else None)
+
+
+def irbank_listing_parser_name(limit: Optional[int], query: MaterialQuery) -> str:
+    """irbank_listing_parser(limit, query) のパース結果をページキャッシュで区別する名前（日付の単位で条件を含める）"""
+    doc_types = ','.join(sorted(query.doc_types)) if query.doc_types is not None else '*'
+    return (f"{IRBANK_LISTING_PARSER}:{limit}:{query.start_date.strftime('%Y-%m-%d')}:"
+            f"{query.end_date.strftime('%Y-%m-%d')}:{doc_types}")
+
+
+def irbank_listing_candidate(href: str, text: str) -> Optional[Tuple[str, str]]:
+    """IR BANKの一覧のリンクが決算説明会資料なら (リンクテキスト, 詳細ページの絶対URL)（決算短信は除外）"""
+    if not any(keyword in text for keyword in ['決算説明', '説明資料', 'プレゼン', '説明会']) or '短信' in text:
+        return None
+    # 相対URLだけを対象にする
+    if not href.startswith('/'):
+        return None
+    # 相対URLを絶対URLに変換
+    return text, urljoin('https://irbank.net', href)
+
+
+def irbank_candidate_older(candidate: Tuple[str, str], query: MaterialQuery) -> bool:
+    """候補リンクのテキストの日付が query の開始日より前か"""
+    announcement_date = extract_metadata(candidate[0]).announcement_date
+    return announcement_date is not None and announcement_date[:10] < query.start_date.strftime('%Y-%m-%d')
+
+
+def irbank_candidate_accepted(candidate: Tuple[str, str], query: MaterialQuery) -> bool:
+    """候補リンクのテキストの日付・種類が query の条件に合うか（分からない条件は満たすとみなす）"""
+    metadata = extract_metadata(candidate[0])
+    return query.accepts(metadata.announcement_date, metadata.doc_type)
+
+
+def parse_irbank_detail(content: bytes, detail_url: str) -> Optional[str]:
+    """IR BANKの詳細ページから最初のPDFリンクを絶対URLで返す（見つからない場合は None）"""
+    pdf_urls = irbank_detail_parser(detail_url).parse(content)
+    return pdf_urls[0] if pdf_urls else None
+
+
+def irbank_detail_parser(detail_url: str) -> html_links.LinkParser:
+    """IR BANKの詳細ページのインクリメンタルパーサー（最初のPDFリンクで完了）"""
+    return html_links.LinkParser(
+        lambda href, _: urljoin(detail_url, href) if '.pdf' in href.lower() else None,
+        limit=1,
+    )
+
+
+def build_irbank_material(text: str, pdf_url: Optional[str], stock_code: str, company_name: str,
+                          query: MaterialQuery) -> Optional[Dict]:
+    """
+    IR BANKの一覧のリンクテキストと解決したPDFのURLから決算資料を作る
+
+    Returns:
+        Optional[Dict]: 決算資料（PDFがない場合、日付・種類が query の条件に合わない場合は None）
+    """
+    if not pdf_url:
+        return None
+
+    # 日付を推定（テキストまたはURLから）
+    metadata = extract_metadata(text)
+    announcement_date = (
+        metadata.announcement_date
+        or extract_metadata(pdf_url).announcement_date
+        or datetime.now().strftime('%Y-%m-%d')
+    )
+
+    # PDFのURLの日付で補った場合も含めて、期間・種類が条件に合うかチェック
+    if not query.accepts(announcement_date, metadata.doc_type):
+        return None
+
+    return {
+        'title': text,
+        'company_name': company_name,
+        'stock_code': stock_code,
+        'fiscal_year': metadata.fiscal_year,
+        'period': metadata.period,
+        'announcement_date': announcement_date,
+        'pdf_url': pdf_url,
+        'type': metadata.doc_type,
+        'source': 'IR BANK'
+    }
+
+
+def resolve_irbank_pdf_urls(detail_urls: List[str]) -> List[Optional[str]]:
+    """
+    IR BANKの詳細ページのPDFのURLをまとめて解決する
+
+    解決済みのものは永続マップから引き、初めて見る詳細ページだけを並列に取得して
+    結果をマップに保存する
+
+    Args:
+        detail_urls (List[str]): 詳細ページのURL
+
+    Returns:
+        List[Optional[str]]: 入力と同じ順序のPDFのURL（見つからないものは None）
+    """
+    known = irbank_pdf_map.lookup_pdf_urls(detail_urls)
+    unknown = [detail_url for detail_url in detail_urls if detail_url not in known]
+
+    resolved = dict(zip(unknown, http_client.map_bounded(
+        _resolve_irbank_pdf_url,
+        unknown,
+        max_workers=IRBANK_DETAIL_WORKERS,
+    )))
+    irbank_pdf_map.store_pdf_urls({url: pdf_url for url, pdf_url in resolved.items() if pdf_url})
+
+    return [known.get(detail_url) or resolved.get(detail_url) for detail_url in detail_urls]
+
+
+def _resolve_irbank_pdf_url(detail_url: str) -> Optional[str]:
+    """
+    IR BANKの詳細ページから最初のPDFリンクを取得
+
+    Args:
+        detail_url (str): 詳細ページのURL
+
+    Returns:
+        Optional[str]: PDFの絶対URL（見つからない・取得できない場合は None）
+    """
+    try:
+        # 最初のPDFリンクが見つかったら詳細ページの残りは読まない
+        with http_client.stream(detail_url) as detail_response:
+            if detail_response.status_code == 200:
+                pdf_urls, _ = page_cache.parse_chunks(
+                    lambda: irbank_detail_parser(detail_url), http_client.iter_body(detail_response)
+                )
+                return pdf_urls[0] if pdf_urls else None
+    except Exception as e:
+        print(f"Error fetching detail page {detail_url}: {e}")
+    return None
+
+
+def fetch_from_buffettcode(stock_code: str, company_name: str,
+                           query: Optional[MaterialQuery] = None) -> List[Dict]:
     """
     BuffettCodeから決算資料を取得
 
     Args:
         stock_code (str): 証券コード
         company_name (str): 企業名
+        query (MaterialQuery): 期間・資料の種類の条件（省略時は絞り込まない）
 
     Returns:
-        List[Dict]: 決算資料リスト
+        List[Dict]: 決算資料リスト（取得に失敗した場合は例外を送出し、エンジンがソースの失敗として記録する）
     """
-    materials = []
+    # BuffettCodeのIRページ
+    base_url = buffettcode_ir_url(stock_code)
 
-    try:
-        # BuffettCodeのIRページ
-        base_url = f"https://www.buffett-code.com/company/{stock_code}/ir/"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
+    parsed = page_cache.fetch_parsed(
+        base_url,
+        f"buffettcode:{stock_code}:{company_name}",
+        lambda: buffettcode_parser(base_url, stock_code, company_name),
+    )
+    materials = parsed if parsed is not None else []
 
-        response = requests.get(base_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # PDF資料のリンクを探す
-            links = soup.find_all('a', href=True)
-            for link in links:
-                href = link['href']
-                text = link.get_text(strip=True)
-
-                if any(keyword in text for keyword in ['決算', '説明', '資料', 'IR']):
-                    if '.pdf' in href.lower():
-                        full_url = href if href.startswith('http') else urljoin(base_url, href)
-
-                        materials.append({
-                            'title': text,
-                            'company_name': company_name,
-                            'stock_code': stock_code,
-                            'fiscal_year': extract_fiscal_year(text),
-                            'period': extract_period(text),
-                            'announcement_date': extract_date_from_text(text) or datetime.now().strftime('%Y-%m-%d'),
-                            'pdf_url': full_url,
-                            'type': classify_document_type(text),
-                            'source': 'BuffettCode'
-                        })
+    return query.filter(materials) if query is not None else materials
 
-    except Exception as e:
-        print(f"Error fetching from BuffettCode: {e}")
 
-    return materials
+def buffettcode_ir_url(stock_code: str) -> str:
+    """BuffettCodeのIRページのURL"""
+    return f"https://www.buffett-code.com/company/{stock_code}/ir/"
 
 
-def extract_fiscal_year(text: str) -> str:
-    """テキストから年度を抽出"""
-    # "2024年3月期" のようなパターン
-    match = re.search(r'(\d{4})年\d{1,2}月期', text)
-    if match:
-        return f"{match.group(1)}年3月期"
+def parse_buffettcode_page(content: bytes, base_url: str, stock_code: str, company_name: str) -> List[Dict]:
+    """BuffettCodeのIRページから決算関連のPDF資料を抽出"""
+    return buffettcode_parser(base_url, stock_code, company_name).parse(content)
+
 
-    # "FY2024" のようなパターン
-    match = re.search(r'FY(\d{4})', text, re.IGNORECASE)
-    if match:
-        return f"{match.group(1)}年3月期"
+def buffettcode_parser(base_url: str, stock_code: str, company_name: str) -> html_links.LinkParser:
+    """BuffettCodeのIRページのインクリメンタルパーサー（引数は parse_buffettcode_page と同じ）"""
 
-    # "2024" だけの場合
-    match = re.search(r'20\d{2}', text)
-    if match:
-        return f"{match.group(0)}年3月期"
+    # PDF資料のリンクを探す
+    def select(href: str, text: str) -> Optional[Dict]:
+        if not any(keyword in text for keyword in ['決算', '説明', '資料', 'IR']) or '.pdf' not in href.lower():
+            return None
+
+        full_url = href if href.startswith('http') else urljoin(base_url, href)
+        metadata = extract_metadata(text)
+        return {
+            'title': text,
+            'company_name': company_name,
+            'stock_code': stock_code,
+            'fiscal_year': metadata.fiscal_year,
+            'period': metadata.period,
+            'announcement_date': metadata.announcement_date or datetime.now().strftime('%Y-%m-%d'),
+            'pdf_url': full_url,
+            'type': metadata.doc_type,
+            'source': 'BuffettCode'
+        }
 
-    return f"{datetime.now().year}年3月期"
+    return html_links.LinkParser(select)
+
+
+def extract_fiscal_year(text: str) -> str:
+    """テキストから年度を抽出"""
+    return extract_metadata(text).fiscal_year
 
 
 def extract_period(text: str) -> str:
     """テキストから期（四半期/通期）を抽出"""
-    if 'Q1' in text or '第1四半期' in text or '1Q' in text:
-        return '第1四半期'
-    elif 'Q2' in text or '第2四半期' in text or '2Q' in text or '上期' in text:
-        return '第2四半期'
-    elif 'Q3' in text or '第3四半期' in text or '3Q' in text:
-        return '第3四半期'
-    elif 'Q4' in text or '第4四半期' in text or '4Q' in text or '通期' in text or '本決算' in text:
-        return '通期'
-    return '通期'
+    return extract_metadata(text).period
 
 
 def extract_date_from_text(text: str) -> Optional[str]:
     """テキストから日付を抽出"""
-    # "2024年5月15日" のようなパターン
-    match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', text)
-    if match:
-        year, month, day = match.groups()
-        return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-
-    # "2024/05/15" のようなパターン
-    match = re.search(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})', text)
-    if match:
-        year, month, day = match.groups()
-        return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-
-    # "20241105" のような8桁の日付パターン（URLに含まれる）
-    match = re.search(r'(\d{4})(\d{2})(\d{2})', text)
-    if match:
-        year, month, day = match.groups()
-        # 妥当な日付かチェック
-        try:
-            datetime.strptime(f"{year}-{month}-{day}", '%Y-%m-%d')
-            return f"{year}-{month}-{day}"
-        except:
-            pass
-
-    return None
+    return extract_metadata(text).announcement_date
 
 
 def classify_document_type(title: str) -> str:
-    """タイトルから資料の種類を分類"""
-    title_lower = title.lower()
-
-    if '決算短信' in title or '短信' in title:
-        return '決算短信'
-    elif '説明会' in title or 'プレゼン' in title or '説明資料' in title or 'presentation' in title_lower:
-        return '決算説明会資料'
-    elif '有価証券報告書' in title or '報告書' in title:
-        return '有価証券報告書'
-    elif '決算' in title:
-        return '決算資料'
-    else:
-        return 'IR資料'
+    """タイトルから資料の種類を分類（DOCUMENT_TYPES のいずれか）"""
+    return extract_metadata(title).doc_type
 
 
 def generate_realistic_sample_data(stock_code: str, company_name: str, years: int) -> List[Dict]:
@@ -631,3 +795,34 @@ def generate_realistic_sample_data(stock_code: str, company_name: str, years: in
             })
 
     return materials
+
+
+# 決算資料ソースの登録（get_earnings_materials はすべての有効なソースを並列に実行する）
+# 優先度は同じPDFが複数のソースで見つかった場合にどちらを残すかに使う（小さいほど優先）
+register_source(MaterialSource(
+    name='company_ir',
+    fetcher=lambda stock_code, company_name, query: fetch_from_company_ir_page(stock_code, company_name, query),
+    timeout=15.0,
+    priority=0,
+))
+# IR BANKには多くの企業の決算資料が集約されている
+register_source(MaterialSource(
+    name='irbank',
+    fetcher=lambda stock_code, company_name, query: fetch_from_irbank(stock_code, company_name, query),
+    timeout=20.0,
+    priority=10,
+))
+register_source(MaterialSource(
+    name='tdnet',
+    fetcher=lambda stock_code, company_name, query: fetch_from_tdnet(
+        stock_code, query.start_date, query.end_date, company_name, query.doc_types
+    ),
+    timeout=15.0,
+    priority=20,
+))
+register_source(MaterialSource(
+    name='buffettcode',
+    fetcher=lambda stock_code, company_name, query: fetch_from_buffettcode(stock_code, company_name, query),
+    timeout=10.0,
+    priority=30,
+))
@@ -0,0 +1,211 @@
+"""
+lxmlによるリンク・表の行だけのHTMLパース
+
+スクレイピングで使うのは <a> と <tr> だけなので、BeautifulSoup（html.parser）で
+ページ全体の木を作らず、lxmlのプルパーサーで目的の要素の終了イベントだけを受け取る。
+処理し終えた要素はその場で中身を捨てるので、大きなIRライブラリのページでもメモリは増えにくい
+
+LinkParser はHTMLを受け取った分ずつパースし、必要な件数が集まった時点で完了を返すので、
+呼び出し側はレスポンス本文の残りを読まずに接続を閉じられる
+
+文字コードはバイト列の推測（UnicodeDammit）をせず、宣言された charset
+（<meta charset> / http-equiv、XML宣言）を使う。宣言がない場合は UTF-8 として読めるかで
+UTF-8 と CP932（Shift_JIS）を選ぶ
+"""
+import codecs
+import re
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+# 文字コードの宣言を探す先頭部分のバイト数
+ENCODING_SNIFF_BYTES = 4096
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+_XML_ENCODING = re.compile(rb'^<\?xml[^>]+encoding\s*=\s*["\']([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+
+# 宣言された名前 → Pythonのコーデック名（Shift_JISの宣言でも実際はWindowsの拡張文字を含むことが多い）
+_ENCODING_ALIASES = {
+    'shift_jis': 'cp932',
+    'shift-jis': 'cp932',
+    'sjis': 'cp932',
+    'x-sjis': 'cp932',
+    'windows-31j': 'cp932',
+}
+
+
+def declared_encoding(head: bytes) -> Optional[str]:
+    """
+    HTMLの先頭部分から宣言された文字コードを取得
+
+    Args:
+        head (bytes): HTMLの先頭部分（ENCODING_SNIFF_BYTES バイト程度）
+
+    Returns:
+        Optional[str]: コーデック名（宣言がない場合は None）
+    """
+    match = _XML_ENCODING.search(head) or _META_CHARSET.search(head)
+    if not match:
+        return None
+    name = match.group(1).decode('ascii').lower()
+    encoding = _ENCODING_ALIASES.get(name, name)
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return None
+    return encoding
+
+
+def guess_encoding(head: bytes) -> str:
+    """宣言された文字コード（宣言がない場合は UTF-8 / CP932 のどちらか）"""
+    encoding = declared_encoding(head)
+    if encoding:
+        return encoding
+    try:
+        head.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # 先頭部分の末尾で文字が切れただけなら UTF-8
+        return 'utf-8' if e.start >= len(head) - 3 else 'cp932'
+
+
+def element_text(element) -> str:
+    """要素内のテキストを各断片の前後の空白を除いて連結（BeautifulSoupの get_text(strip=True) と同じ）"""
+    return ''.join(text.strip() for text in element.itertext())
+
+
+class ElementStream:
+    """
+    指定したタグの要素を、HTMLを少しずつ渡しながら閉じた順に受け取るパーサー
+
+    Args:
+        tag (str): 受け取る要素のタグ名（'a' / 'tr' など）
+        encoding (str): 文字コード（省略時は最初に渡されたバイト列から判定）
+    """
+
+    def __init__(self, tag: str, encoding: Optional[str] = None):
+        self.tag = tag
+        self.encoding = encoding
+        self._parser = None
+
+    def _ensure_parser(self, head: bytes):
+        if self._parser is None:
+            if self.encoding is None:
+                self.encoding = guess_encoding(head[:ENCODING_SNIFF_BYTES])
+            self._parser = etree.HTMLPullParser(events=('end',), tag=self.tag, encoding=self.encoding)
+
+    def feed(self, data: bytes) -> Iterator:
+        """
+        HTMLの続きを渡し、閉じた要素を返す
+
+        返した要素は次の feed() / close() の前に読み終えること（中身は捨てられる）
+        """
+        self._ensure_parser(data)
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> Iterator:
+        """残りの要素を返してパースを終える"""
+        self._ensure_parser(b'')
+        try:
+            self._parser.close()
+        except etree.LxmlError:
+            # 空のページなど、要素が1つもない場合
+            pass
+        return self._drain()
+
+    def _drain(self) -> Iterator:
+        previous = None
+        for _, element in self._parser.read_events():
+            if previous is not None:
+                previous.clear(keep_tail=True)
+            previous = element
+            yield element
+        if previous is not None:
+            previous.clear(keep_tail=True)
+
+
+def iter_elements(content: bytes, tag: str) -> Iterator:
+    """HTML全体から指定したタグの要素を順に返す"""
+    stream = ElementStream(tag)
+    yield from stream.feed(content)
+    yield from stream.close()
+
+
+def iter_links(content: bytes) -> Iterator[Tuple[str, str]]:
+    """
+    HTMLの href 付きの <a> を順に返す
+
+    Returns:
+        Iterator[Tuple[str, str]]: (href, リンクテキスト) のイテレーター
+    """
+    for link in iter_elements(content, 'a'):
+        href = link.get('href')
+        if href is not None:
+            yield href, element_text(link)
+
+
+class LinkParser:
+    """
+    <a> を1つずつ select に渡して結果を集めるインクリメンタルパーサー
+
+    feed() が True を返したら必要な分は集まっているので、残りのHTMLは渡さなくてよい
+
+    Args:
+        select: (href, リンクテキスト) -> 結果に加える値（対象外のリンクは None）
+        limit (int): 結果がこの件数に達したら完了
+        stop: 結果に加える値 -> True ならその値は加えずに完了（新しい順の一覧で期間外に達した場合など）
+    """
+
+    def __init__(self, select: Callable[[str, str], Optional[Any]], limit: Optional[int] = None,
+                 stop: Optional[Callable[[Any], bool]] = None):
+        self.select = select
+        self.limit = limit
+        self.stop = stop
+        self.results: List = []
+        self.done = False
+        self._stream = ElementStream('a')
+
+    def _handle(self, links: Iterator):
+        for link in links:
+            href = link.get('href')
+            if href is None:
+                continue
+            item = self.select(href, element_text(link))
+            if item is None:
+                continue
+            if self.stop is not None and self.stop(item):
+                self.done = True
+                return
+            self.results.append(item)
+            if self.limit is not None and len(self.results) >= self.limit:
+                self.done = True
+                return
+
+    def feed(self, data: bytes) -> bool:
+        """HTMLの続きを渡す（完了した場合は True）"""
+        if not self.done:
+            self._handle(self._stream.feed(data))
+        return self.done
+
+    def close(self) -> List:
+        """パースを終えて結果を返す"""
+        if not self.done:
+            self._handle(self._stream.close())
+            self.done = True
+        return self.results
+
+    def parse(self, content: bytes) -> List:
+        """HTML全体をパースして結果を返す"""
+        self.feed(content)
+        return self.close()
+
+
+def row_cells(row) -> List:
+    """<tr> 直下の <td>"""
+    return [cell for cell in row if cell.tag == 'td']
+
+
+def cell_classes(cell) -> Iterable[str]:
+    """セルの class 属性のクラス名"""
+    return (cell.get('class') or '').split()
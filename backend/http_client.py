@@ -0,0 +1,254 @@
+"""
+スクレイパー用の共有HTTPセッション
+
+モジュール全体で1つの requests.Session を使い回し、ホストごとのコネクションプールで
+keep-aliveされた接続を再利用する。リトライとバックオフ、gzip/brotli の圧縮転送もここで設定する
+
+ホストごとに同時接続数とリクエストレート（トークンバケット）の上限を設け、
+並列にリクエストしても各サイトへの負荷が一定以内に収まるようにする
+
+stream() は本文を少しずつ読むためのリクエストで、iter_body() で MAX_BODY_BYTES を
+超えた分は読まない。パースに必要な分を読み終えた時点で接続を閉じれば、残りはダウンロードしない
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+# リクエストのタイムアウト（秒）
+DEFAULT_TIMEOUT = float(os.getenv('SCRAPER_TIMEOUT', 10))
+
+# 接続エラー・5xx・429 の場合のリトライ回数とバックオフ係数（待ち時間は 係数 × 2^(n-1) 秒）
+MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', 2))
+BACKOFF_FACTOR = float(os.getenv('SCRAPER_BACKOFF_FACTOR', 0.5))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# コネクションプールを保持するホスト数と、ホストごとの最大接続数
+POOL_CONNECTIONS = int(os.getenv('SCRAPER_POOL_CONNECTIONS', 10))
+POOL_MAXSIZE = int(os.getenv('SCRAPER_POOL_MAXSIZE', 10))
+
+# ホストごとの同時接続数
+HOST_CONCURRENCY = int(os.getenv('SCRAPER_HOST_CONCURRENCY', 4))
+
+# ホストごとのリクエストレート（1秒あたり、0以下で無制限）と、連続して送れる最大数
+HOST_RATE_LIMIT = float(os.getenv('SCRAPER_HOST_RATE_LIMIT', 5))
+HOST_BURST = int(os.getenv('SCRAPER_HOST_BURST', 5))
+
+# ストリーミングで読む本文の最大バイト数（超えた分は読まずに打ち切る）と、1回に読むバイト数
+MAX_BODY_BYTES = int(os.getenv('SCRAPER_MAX_BODY_BYTES', 5 * 1024 * 1024))
+STREAM_CHUNK_SIZE = int(os.getenv('SCRAPER_STREAM_CHUNK_SIZE', 64 * 1024))
+
+# 1 にすると urllib3 のHTTP/2サポート（実験的、h2 パッケージが必要）を有効にする
+ENABLE_HTTP2 = os.getenv('SCRAPER_HTTP2', '0') == '1'
+
+# brotli はデコーダーがインストールされている場合だけ受け付ける
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class HostBudget:
+    """
+    1ホスト分の同時接続数とリクエストレートの上限
+
+    Args:
+        concurrency (int): 同時接続数
+        rate (float): 1秒あたりのリクエスト数（0以下で無制限）
+        burst (int): 連続して送れる最大リクエスト数
+    """
+
+    def __init__(self, concurrency: int = HOST_CONCURRENCY, rate: float = HOST_RATE_LIMIT, burst: int = HOST_BURST):
+        self.slots = threading.BoundedSemaphore(max(concurrency, 1))
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire_token(self) -> float:
+        """
+        トークンを1つ取り出す（待たない）
+
+        Returns:
+            float: 取り出せた場合は 0、足りない場合はトークンが貯まるまでの秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def wait_for_token(self):
+        """リクエスト1回分のトークンが貯まるまで待つ"""
+        while True:
+            wait = self.try_acquire_token()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+_host_budgets: Dict[str, HostBudget] = {}
+_host_budgets_lock = threading.Lock()
+
+
+def get_host_budget(host: str) -> HostBudget:
+    """ホストごとの上限を取得（初回呼び出し時に作成）"""
+    budget = _host_budgets.get(host)
+    if budget is None:
+        with _host_budgets_lock:
+            budget = _host_budgets.setdefault(host, HostBudget())
+    return budget
+
+
+def _enable_http2() -> bool:
+    """urllib3 のHTTP/2サポートを有効にする（利用できない場合は False）"""
+    try:
+        import urllib3.http2
+        urllib3.http2.inject_into_urllib3()
+        return True
+    except (ImportError, AttributeError) as e:
+        print(f"⚠️  HTTP/2を有効にできませんでした（HTTP/1.1を使用します）: {e}")
+        return False
+
+
+def create_session() -> requests.Session:
+    """リトライ・コネクションプール・共通ヘッダーを設定したセッションを作成"""
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=('GET', 'HEAD'),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': ACCEPT_ENCODING,
+    })
+    return session
+
+
+def get_session() -> requests.Session:
+    """共有セッションを取得（初回呼び出し時に作成）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                if ENABLE_HTTP2:
+                    _enable_http2()
+                _session = create_session()
+    return _session
+
+
+def get(url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """
+    共有セッションでGETリクエストを送る
+
+    Args:
+        url (str): リクエスト先のURL
+        timeout (float): タイムアウト（秒）
+        **kwargs: requests.Session.get に渡す追加の引数
+
+    Returns:
+        requests.Response: レスポンス
+    """
+    budget = get_host_budget(urlparse(url).netloc)
+    with budget.slots:
+        budget.wait_for_token()
+        return get_session().get(url, timeout=timeout, **kwargs)
+
+
+@contextmanager
+def stream(url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> Iterator[requests.Response]:
+    """
+    本文を読まずにレスポンスを返すGETリクエスト（with を抜けると接続を閉じる）
+
+    本文を読み終えるまでホストの同時接続数の枠を使う
+
+    Args:
+        url (str): リクエスト先のURL
+        timeout (float): タイムアウト（秒）
+        **kwargs: requests.Session.get に渡す追加の引数
+
+    Yields:
+        requests.Response: レスポンス（本文は iter_body() で読む）
+    """
+    budget = get_host_budget(urlparse(url).netloc)
+    with budget.slots:
+        budget.wait_for_token()
+        response = get_session().get(url, timeout=timeout, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
+
+
+def iter_body(response: requests.Response, max_bytes: int = MAX_BODY_BYTES) -> Iterator[bytes]:
+    """
+    stream() のレスポンス本文を少しずつ返す（max_bytes を超えた分は返さない）
+
+    Args:
+        response (requests.Response): stream() のレスポンス
+        max_bytes (int): 読む最大バイト数（展開後）
+
+    Yields:
+        bytes: 本文の一部
+    """
+    remaining = max_bytes
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        if len(chunk) > remaining:
+            yield chunk[:remaining]
+            print(f"⚠️  本文が {max_bytes} バイトを超えたため打ち切りました: {response.url}")
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+
+def map_bounded(func: Callable[[T], R], items: Iterable[T], max_workers: int = HOST_CONCURRENCY) -> List[R]:
+    """
+    関数を最大 max_workers 並列で各要素に適用し、入力と同じ順序で結果を返す
+
+    Args:
+        func (Callable): 各要素に適用する関数（例外は呼び出し側で処理しておくこと）
+        items (Iterable): 入力
+        max_workers (int): 最大並列数
+
+    Returns:
+        List: 入力と同じ順序の結果
+    """
+    items = list(items)
+    if len(items) <= 1 or max_workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
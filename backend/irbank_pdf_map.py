@@ -0,0 +1,110 @@
+"""
+IR BANKの詳細ページURL → PDFのURL の永続マップ
+
+公開された詳細ページが指すPDFは後から変わらないため、一度解決した対応は期限なしで保存する。
+件数が上限を超えたら最近使われていないものから削除する（LRU）。一覧を取り直しても、
+詳細ページへのリクエストが発生するのは初めて見るリンクだけになる
+"""
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from materials_store import MATERIALS_DB_PATH, SQLiteStore
+
+# 保存する対応の最大数
+IRBANK_PDF_MAP_MAX_ENTRIES = int(os.getenv('IRBANK_PDF_MAP_MAX_ENTRIES', 100000))
+
+# SQLiteの1文で渡すパラメーター数の上限（古いSQLiteの既定値 999 に合わせる）
+_MAX_PARAMS = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS irbank_pdf_urls (
+    detail_url TEXT PRIMARY KEY,
+    pdf_url TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_irbank_pdf_urls_used_at ON irbank_pdf_urls (used_at);
+"""
+
+
+class IRBankPdfMap(SQLiteStore):
+    """
+    詳細ページURL → PDFのURL のSQLiteマップ
+
+    Args:
+        path (str): データベースファイルのパス
+        max_entries (int): 保存する対応の最大数
+    """
+
+    schema = SCHEMA
+    label = 'IR BANKのPDFマップ'
+
+    def __init__(self, path: str = MATERIALS_DB_PATH, max_entries: int = IRBANK_PDF_MAP_MAX_ENTRIES):
+        super().__init__(path)
+        self.max_entries = max_entries
+
+    def lookup_many(self, detail_urls: List[str]) -> Dict[str, str]:
+        """
+        解決済みの詳細ページのPDFのURLをまとめて取得（見つかったものは最終使用時刻を更新）
+
+        Returns:
+            Dict[str, str]: 詳細ページURL → PDFのURL（未解決のものは含まない）
+        """
+        conn = self._connect()
+        found = {}
+        for i in range(0, len(detail_urls), _MAX_PARAMS):
+            chunk = detail_urls[i:i + _MAX_PARAMS]
+            rows = conn.execute(
+                f"SELECT detail_url, pdf_url FROM irbank_pdf_urls WHERE detail_url IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ).fetchall()
+            found.update((row['detail_url'], row['pdf_url']) for row in rows)
+
+        if found:
+            now = time.time()
+            conn.executemany(
+                'UPDATE irbank_pdf_urls SET used_at = ? WHERE detail_url = ?',
+                [(now, detail_url) for detail_url in found]
+            )
+        return found
+
+    def store_many(self, pdf_urls: Dict[str, str]):
+        """解決した対応を保存し、上限を超えた分を最近使われていない順に削除"""
+        if not pdf_urls:
+            return
+        now = time.time()
+        conn = self._connect()
+        with self._transaction():
+            conn.executemany(
+                'INSERT OR REPLACE INTO irbank_pdf_urls (detail_url, pdf_url, used_at) VALUES (?, ?, ?)',
+                [(detail_url, pdf_url, now) for detail_url, pdf_url in pdf_urls.items()]
+            )
+            conn.execute(
+                'DELETE FROM irbank_pdf_urls WHERE detail_url IN '
+                '(SELECT detail_url FROM irbank_pdf_urls ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+
+def lookup_pdf_urls(detail_urls: List[str]) -> Dict[str, str]:
+    """共有マップから解決済みのPDFのURLを取得（マップが使えない・エラーの場合は空）"""
+    pdf_map: Optional[IRBankPdfMap] = IRBankPdfMap.get_shared()
+    if pdf_map is None or not detail_urls:
+        return {}
+    try:
+        return pdf_map.lookup_many(detail_urls)
+    except sqlite3.Error as e:
+        print(f"❌ IR BANKのPDFマップ読み込みエラー: {e}")
+        return {}
+
+
+def store_pdf_urls(pdf_urls: Dict[str, str]):
+    """解決したPDFのURLを共有マップに保存（マップが使えない場合は何もしない）"""
+    pdf_map: Optional[IRBankPdfMap] = IRBankPdfMap.get_shared()
+    if pdf_map is None:
+        return
+    try:
+        pdf_map.store_many(pdf_urls)
+    except sqlite3.Error as e:
+        print(f"❌ IR BANKのPDFマップ書き込みエラー: {e}")
@@ -0,0 +1,185 @@
+"""
+決算資料のタイトル・URLからのメタデータ抽出
+
+年度・期・日付・資料の種類を、事前にコンパイルした1つの正規表現で文字列を1回だけ走査して
+まとめて取り出す。正規表現は各位置で先読みだけを評価するので、項目ごとに re.search や
+in で探した場合と同じく、最初に現れたもの（期と種類は優先度の高いもの）が選ばれ、
+重なり合う表記（"2Q1" の Q1 など）も取りこぼさない
+
+1回の走査でも位置ごとに正規表現を評価するので、メモ化が効かない初回の抽出は項目ごとに探す場合より
+少し速い程度（先頭の文字クラスで枝を飛ばしても2割ほど）にとどまる。速くなるのは主にメモ化の分で、
+同じタイトルやファイル名は繰り返し現れる（IRページの再パース、TDnetの一覧の取り直しなど）ので、
+結果を LRU でメモ化する。年度が見つからない場合の既定値（今年）は日付で変わるため、
+メモ化せずに呼び出しごとに補う
+"""
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# メモ化するテキストの件数
+METADATA_CACHE_SIZE = int(os.getenv('METADATA_CACHE_SIZE', 8192))
+
+# 資料の種類（優先度順。どれにも当てはまらない場合は 'IR資料'）
+DOCUMENT_TYPES = ('決算短信', '決算説明会資料', '有価証券報告書', '決算資料', 'IR資料')
+
+# 期の表記 → (優先度, 期)。複数ある場合は優先度の小さいものを使う（どれもない場合は通期）
+_PERIOD_TOKENS = {
+    'Q1': (0, '第1四半期'), '第1四半期': (0, '第1四半期'), '1Q': (0, '第1四半期'),
+    'Q2': (1, '第2四半期'), '第2四半期': (1, '第2四半期'), '2Q': (1, '第2四半期'), '上期': (1, '第2四半期'),
+    'Q3': (2, '第3四半期'), '第3四半期': (2, '第3四半期'), '3Q': (2, '第3四半期'),
+    'Q4': (3, '通期'), '第4四半期': (3, '通期'), '4Q': (3, '通期'), '通期': (3, '通期'), '本決算': (3, '通期'),
+}
+
+# 種類のキーワード → 優先度（DOCUMENT_TYPES の添字）。'決算短信' は '短信'、'有価証券報告書' は '報告書' で拾う
+_TYPE_TOKENS = {
+    '短信': 0,
+    '説明会': 1, 'プレゼン': 1, '説明資料': 1,
+    '報告書': 2,
+    '決算': 3,
+}
+
+# 各位置で、その位置から始まる表記を先読みで拾う（幅0のマッチなので1文字ずつ進み、重なり合う表記も拾える）
+# 4桁の数字・FY・期・種類は先頭の文字が重ならないので、位置ごとに当てはまる枝は1つだけ。
+# 4桁の数字に続く "年N月期" / "年N月N日" / "/N/N" / 4桁 も互いに重ならない。
+# 先頭の文字クラスで、どの表記も始まりえない位置（タイトルの大半の文字）は枝を試さずに飛ばす
+_SCAN = re.compile(
+    r'(?=[\dFfQ第上通本短説プ報決Pp])(?:'
+    r'(?=(\d{4})(?:'
+    r'年(?:\d{1,2}月(期)|(\d{1,2})月(\d{1,2})日)'   # 年度 "2024年3月期" / 日付 "2024年5月15日"
+    r'|[/-](\d{1,2})[/-](\d{1,2})'                 # 日付 "2024/05/15"
+    r'|(\d{2})(\d{2})'                            # 日付 "20241105"（URLに含まれる）
+    r'|))'                                         # 年度 "2024"（20xx の場合）
+    r'|(?=[Ff][Yy](\d{4}))'                        # 年度 "FY2024"
+    r'|(?=(Q[1-4]|[1-4]Q|第[1-4]四半期|上期|通期|本決算))'  # 期
+    r'|(?=(短信|説明会|プレゼン|説明資料|報告書|決算|(?ai:presentation)))'  # 種類
+    r')'
+)
+
+
+class MaterialMetadata(NamedTuple):
+    """
+    テキストから抽出した決算資料のメタデータ
+
+    Args:
+        fiscal_year (str): 年度（"2024年3月期"）
+        period (str): 期（第1四半期〜第3四半期 / 通期）
+        announcement_date (str): 日付（YYYY-MM-DD。見つからない場合は None）
+        doc_type (str): 資料の種類（DOCUMENT_TYPES のいずれか）
+    """
+    fiscal_year: Optional[str]
+    period: str
+    announcement_date: Optional[str]
+    doc_type: str
+
+
+def _date(year: str, month: str, day: str) -> str:
+    return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+
+def _compact_date(year: str, month: str, day: str) -> Optional[str]:
+    # 8桁の数字は妥当な日付の場合だけ日付とみなす（ASCIIの数字は strptime より速い datetime() で確かめる）
+    try:
+        if (year + month + day).isascii():
+            datetime(int(year), int(month), int(day))
+        else:
+            datetime.strptime(f"{year}-{month}-{day}", '%Y-%m-%d')
+    except ValueError:
+        return None
+    return f"{year}-{month}-{day}"
+
+
+@lru_cache(maxsize=METADATA_CACHE_SIZE)
+def _scan(text: str) -> MaterialMetadata:
+    """テキストを1回走査してメタデータを抽出（年度が見つからない場合は None のまま）"""
+    fiscal_kanji = fiscal_fy = fiscal_year = None
+    announcement_date = date_separated = date_compact = None
+    period_rank, period = 3, '通期'
+    type_rank = len(DOCUMENT_TYPES) - 1
+
+    # findall は当てはまらなかったグループを '' で返す
+    for (digits, kanji_fiscal, kanji_month, kanji_day, separated_month, separated_day,
+         compact_month, compact_day, fy_year, period_token, type_token) in _SCAN.findall(text):
+        if digits:
+            if kanji_fiscal and fiscal_kanji is None:
+                fiscal_kanji = digits
+            if fiscal_year is None and digits.startswith('20'):
+                fiscal_year = digits
+            if kanji_month and announcement_date is None:
+                announcement_date = _date(digits, kanji_month, kanji_day)
+            elif separated_month and date_separated is None:
+                date_separated = _date(digits, separated_month, separated_day)
+            elif compact_month and date_compact is None:
+                date_compact = (digits, compact_month, compact_day)
+        elif fy_year:
+            fiscal_fy = fiscal_fy or fy_year
+        elif period_token:
+            rank, label = _PERIOD_TOKENS[period_token]
+            if rank < period_rank:
+                period_rank, period = rank, label
+        else:
+            # 'presentation' は大文字小文字を区別しないので辞書にない表記もある
+            type_rank = min(type_rank, _TYPE_TOKENS.get(type_token, 1))
+
+    year = fiscal_kanji or fiscal_fy or fiscal_year
+    if announcement_date is None:
+        # 年月日の表記がない場合は区切り文字の日付、8桁の数字の順に使う
+        announcement_date = date_separated or (_compact_date(*date_compact) if date_compact else None)
+
+    return MaterialMetadata(
+        fiscal_year=f"{year}年3月期" if year else None,
+        period=period,
+        announcement_date=announcement_date,
+        doc_type=DOCUMENT_TYPES[type_rank],
+    )
+
+
+def _default_fiscal_year() -> str:
+    return f"{datetime.now().year}年3月期"
+
+
+def extract_metadata(text: str) -> MaterialMetadata:
+    """
+    タイトル・ファイル名・URLから年度・期・日付・資料の種類をまとめて抽出
+
+    Args:
+        text (str): 抽出元のテキスト
+
+    Returns:
+        MaterialMetadata: メタデータ（年度が見つからない場合は今年の3月期）
+    """
+    metadata = _scan(text)
+    if metadata.fiscal_year is None:
+        return metadata._replace(fiscal_year=_default_fiscal_year())
+    return metadata
+
+
+def clear_metadata_cache():
+    """メモ化した抽出結果を破棄（メモ化なしの速さを計測する場合など）"""
+    _scan.cache_clear()
+
+
+def extract_metadata_batch(texts: Iterable[str]) -> List[MaterialMetadata]:
+    """
+    複数のテキストのメタデータをまとめて抽出（TDnetの一覧の取り込みなど大量の行向け）
+
+    同じテキストは1回だけ抽出し、年度の既定値も1回だけ求める
+
+    Returns:
+        List[MaterialMetadata]: texts と同じ順序のメタデータ
+    """
+    default_fiscal_year = None
+    extracted: Dict[str, MaterialMetadata] = {}
+    results = []
+    for text in texts:
+        metadata = extracted.get(text)
+        if metadata is None:
+            metadata = _scan(text)
+            if metadata.fiscal_year is None:
+                if default_fiscal_year is None:
+                    default_fiscal_year = _default_fiscal_year()
+                metadata = metadata._replace(fiscal_year=default_fiscal_year)
+            extracted[text] = metadata
+        results.append(metadata)
+    return results
@@ -0,0 +1,285 @@
+"""
+決算資料ソースのレジストリと並列取得エンジン
+
+各ソース（企業IRページ、IR BANK、TDnet、BuffettCode など）は独立した取得関数として登録し、
+有効なソースをすべて同時に実行する。結果は完了した順にマージし、同じPDFのURLが
+複数のソースから見つかった場合は優先度の高いソースのものを残す。タイムアウト・エラーになった
+ソースは結果（SourceResults）に記録し、呼び出し側は欠けのある結果を長く保存しないようにする
+
+非同期版（fetch_all_sources_async）は各ソースの非同期取得関数をイベントループ上で実行する。
+非同期取得関数が登録されていないソースは共有Executorで同期版を実行する
+
+取得条件（期間・資料の種類）は MaterialQuery で各ソースに渡す。ソースは一覧の段階で
+条件に合わないものを除き、詳細ページなどの追加のリクエストを減らす
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional
+
+
+# 決算資料の日付は日本時間（サーバーのタイムゾーンによらず、日本時間の今日までを取得する）
+JST = timezone(timedelta(hours=9), 'JST')
+
+
+@dataclass(frozen=True)
+class MaterialQuery:
+    """
+    決算資料の取得条件
+
+    Attributes:
+        start_date (datetime): 開始日
+        end_date (datetime): 終了日
+        doc_types (FrozenSet[str]): 資料の種類（classify_document_type の値、None の場合はすべて）
+    """
+    start_date: datetime
+    end_date: datetime
+    doc_types: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def for_years(cls, years: int, doc_types: Optional[FrozenSet[str]] = None) -> 'MaterialQuery':
+        """今日（日本時間）から指定年数前までの条件"""
+        end_date = datetime.now(JST).replace(tzinfo=None)
+        return cls(end_date - timedelta(days=years * 365), end_date, doc_types)
+
+    def accepts(self, announcement_date: Optional[str], doc_type: Optional[str] = None) -> bool:
+        """
+        日付（YYYY-MM-DD）と種類が条件に合うか（日付・種類が分からない場合はその条件を満たすとみなす）
+        """
+        if announcement_date and not (
+            self.start_date.strftime('%Y-%m-%d') <= announcement_date[:10] <= self.end_date.strftime('%Y-%m-%d')
+        ):
+            return False
+        return self.doc_types is None or doc_type is None or doc_type in self.doc_types
+
+    def matches(self, material: Dict) -> bool:
+        """決算資料が条件に合うか"""
+        return self.accepts(material.get('announcement_date'), material.get('type'))
+
+    def filter(self, materials: List[Dict]) -> List[Dict]:
+        """条件に合う決算資料だけの新しいリスト（元のリストは変更しない）"""
+        return [material for material in materials if self.matches(material)]
+
+
+class SourceResults(list):
+    """
+    各ソースの結果をマージした決算資料リスト
+
+    Attributes:
+        timed_out (List[str]): タイムアウトしたソース名
+        failed (List[str]): 例外で失敗したソース名
+    """
+
+    def __init__(self, materials: Iterable[Dict] = (), timed_out: Iterable[str] = (), failed: Iterable[str] = ()):
+        super().__init__(materials)
+        self.timed_out = list(timed_out)
+        self.failed = list(failed)
+
+    @property
+    def complete(self) -> bool:
+        """すべてのソースの結果がそろっているか"""
+        return not self.timed_out and not self.failed
+
+    def with_materials(self, materials: Iterable[Dict]) -> 'SourceResults':
+        """同じソースの状態で、決算資料だけを差し替えた結果（絞り込み・並べ替えの後に使う）"""
+        return SourceResults(materials, self.timed_out, self.failed)
+
+
+# ソース取得関数の型: (証券コード, 企業名, 取得条件) -> 決算資料リスト
+SourceFetcher = Callable[[str, str, MaterialQuery], List[Dict]]
+AsyncSourceFetcher = Callable[[str, str, MaterialQuery], Awaitable[List[Dict]]]
+
+# ソースを並列に実行するワーカー数（リクエスト間で共有）
+SOURCE_WORKERS = int(os.getenv('EARNINGS_SOURCE_WORKERS', 16))
+
+# 有効にするソース名（カンマ区切り、未設定の場合は登録時の enabled に従う）
+ENABLED_SOURCES = os.getenv('EARNINGS_SOURCES')
+
+
+@dataclass
+class MaterialSource:
+    """
+    決算資料ソースの定義
+
+    Attributes:
+        name (str): ソース名
+        fetcher (SourceFetcher): 取得関数
+        timeout (float): このソースを待つ最大秒数（超えた場合は結果を捨てる）
+        priority (int): 優先度（小さいほど優先。重複時にどちらの結果を残すかに使う）
+        enabled (bool): 有効かどうか
+        async_fetcher (AsyncSourceFetcher): 非同期版の取得関数（省略可）
+    """
+    name: str
+    fetcher: SourceFetcher
+    timeout: float = 15.0
+    priority: int = 100
+    enabled: bool = True
+    async_fetcher: Optional[AsyncSourceFetcher] = None
+
+
+_registry: Dict[str, MaterialSource] = {}
+
+# タイムアウトしたソースのスレッドを待たずに応答できるよう、Executorはモジュールで共有する
+_executor = ThreadPoolExecutor(max_workers=SOURCE_WORKERS, thread_name_prefix='material-source')
+
+
+def register_source(source: MaterialSource):
+    """ソースを登録（同名のソースは置き換える）"""
+    _registry[source.name] = source
+
+
+def register_async_fetcher(name: str, fetcher: AsyncSourceFetcher):
+    """登録済みのソースに非同期版の取得関数を追加"""
+    _registry[name].async_fetcher = fetcher
+
+
+def get_sources(names: Optional[List[str]] = None) -> List[MaterialSource]:
+    """
+    有効なソースを優先度順に取得
+
+    Args:
+        names (List[str]): 使用するソース名（省略時は EARNINGS_SOURCES または各ソースの enabled に従う）
+
+    Returns:
+        List[MaterialSource]: ソースのリスト
+    """
+    if names is None and ENABLED_SOURCES:
+        names = [name.strip() for name in ENABLED_SOURCES.split(',') if name.strip()]
+
+    if names is None:
+        sources = [source for source in _registry.values() if source.enabled]
+    else:
+        sources = [_registry[name] for name in names if name in _registry]
+    return sorted(sources, key=lambda source: source.priority)
+
+
+def fetch_all_sources(stock_code: str, company_name: str, query: MaterialQuery,
+                      sources: Optional[List[MaterialSource]] = None) -> SourceResults:
+    """
+    すべての有効なソースを並列に実行し、完了した順に結果をマージする
+
+    Args:
+        stock_code (str): 証券コード
+        company_name (str): 企業名
+        query (MaterialQuery): 取得条件
+        sources (List[MaterialSource]): 使用するソース（省略時は get_sources()）
+
+    Returns:
+        SourceResults: PDFのURLで重複を除いた決算資料リスト（タイムアウト・失敗したソース名付き）
+    """
+    if sources is None:
+        sources = get_sources()
+
+    started = time.monotonic()
+    futures = {
+        _executor.submit(source.fetcher, stock_code, company_name, query): source
+        for source in sources
+    }
+
+    merged = _MergedMaterials()
+    pending = set(futures)
+
+    while pending:
+        now = time.monotonic()
+
+        # 自分のタイムアウトを過ぎたソースは待たずに打ち切る
+        for future in [future for future in pending if now - started >= futures[future].timeout]:
+            pending.discard(future)
+            merged.timed_out.append(futures[future].name)
+            print(f"⚠️  {futures[future].name} timed out after {futures[future].timeout}s for {stock_code}")
+        if not pending:
+            break
+
+        next_deadline = min(started + futures[future].timeout for future in pending)
+        done, pending = wait(pending, timeout=max(next_deadline - now, 0), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            source = futures[future]
+            try:
+                materials = future.result()
+            except Exception as e:
+                merged.failed.append(source.name)
+                print(f"Error in source {source.name}: {e}")
+                continue
+
+            print(f"  {source.name}: {len(materials)} materials in {time.monotonic() - started:.2f}s")
+            merged.add(source, materials)
+
+    return merged.materials()
+
+
+async def fetch_all_sources_async(stock_code: str, company_name: str, query: MaterialQuery,
+                                  sources: Optional[List[MaterialSource]] = None) -> SourceResults:
+    """
+    fetch_all_sources の非同期版（すべての有効なソースを同じイベントループ上で並行に実行する）
+
+    Args:
+        stock_code (str): 証券コード
+        company_name (str): 企業名
+        query (MaterialQuery): 取得条件
+        sources (List[MaterialSource]): 使用するソース（省略時は get_sources()）
+
+    Returns:
+        SourceResults: PDFのURLで重複を除いた決算資料リスト（タイムアウト・失敗したソース名付き）
+    """
+    if sources is None:
+        sources = get_sources()
+
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+
+    def run(source: MaterialSource) -> Awaitable[List[Dict]]:
+        if source.async_fetcher is not None:
+            awaitable = source.async_fetcher(stock_code, company_name, query)
+        else:
+            awaitable = loop.run_in_executor(_executor, source.fetcher, stock_code, company_name, query)
+        return asyncio.wait_for(awaitable, source.timeout)
+
+    tasks = {asyncio.ensure_future(run(source)): source for source in sources}
+
+    merged = _MergedMaterials()
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            source = tasks[task]
+            try:
+                materials = task.result()
+            except asyncio.TimeoutError:
+                merged.timed_out.append(source.name)
+                print(f"⚠️  {source.name} timed out after {source.timeout}s for {stock_code}")
+                continue
+            except Exception as e:
+                merged.failed.append(source.name)
+                print(f"Error in source {source.name}: {e}")
+                continue
+
+            print(f"  {source.name}: {len(materials)} materials in {time.monotonic() - started:.2f}s")
+            merged.add(source, materials)
+
+    return merged.materials()
+
+
+class _MergedMaterials:
+    """ソースごとの結果をPDFのURLで重複を除いてまとめる（同じURLは優先度の高いソースのものを残す）"""
+
+    def __init__(self):
+        self._materials: Dict[str, Dict] = {}
+        self._priorities: Dict[str, int] = {}
+        self.timed_out: List[str] = []
+        self.failed: List[str] = []
+
+    def add(self, source: MaterialSource, materials: List[Dict]):
+        for material in materials:
+            url = material.get('pdf_url', '')
+            if not url:
+                continue
+            if url not in self._materials or source.priority < self._priorities[url]:
+                self._materials[url] = material
+                self._priorities[url] = source.priority
+
+    def materials(self) -> SourceResults:
+        return SourceResults(self._materials.values(), self.timed_out, self.failed)
@@ -0,0 +1,350 @@
+"""
+決算資料と企業名のSQLiteストア
+
+スクレイピングした決算資料と解決済みの企業名をディスク上のSQLite（WALモード）に保存する。
+同じマシンの複数ワーカーで1つのファイルを共有でき、再起動やデプロイ後もキャッシュが残る
+
+決算資料は (stock_code, announcement_date) のインデックスで新しい順に読み出す。
+証券コードごとの最終取得時刻は別テーブルに持つ。各ソースは取得エラーでも空のリストを返すので、
+資料が0件だった取得は記録せず、次回はスクレイピングし直す
+
+set_remote_store() でインスタンス間の共有キャッシュ（Supabase）を登録すると、
+ローカルにない場合はそちらを引き、書き戻しは両方に行う
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def default_db_path() -> str:
+    """
+    SQLiteファイルのデフォルトのパス
+
+    backend/ に書き込めない環境（Vercelなど読み取り専用のファイルシステム）では
+    一時ディレクトリに置く（インスタンスが生きている間だけ共有される）
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    if not os.access(directory, os.W_OK):
+        directory = tempfile.gettempdir()
+    return os.path.join(directory, 'earnings_materials.db')
+
+
+MATERIALS_DB_PATH = os.getenv('MATERIALS_DB_PATH') or default_db_path()
+
+# ストアの決算資料をスクレイピングせずに使う秒数（デフォルト: 24時間）
+MATERIALS_STORE_TTL = float(os.getenv('MATERIALS_STORE_TTL', 24 * 60 * 60))
+
+# 書き込みロックを待つ最大秒数
+BUSY_TIMEOUT = 5.0
+
+# 決算資料の列（materials テーブルの列と決算資料の辞書のキーが対応する）
+MATERIAL_COLUMNS = (
+    'pdf_url', 'title', 'company_name', 'stock_code', 'fiscal_year',
+    'period', 'announcement_date', 'type', 'source',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS materials (
+    stock_code TEXT NOT NULL,
+    pdf_url TEXT NOT NULL,
+    title TEXT,
+    company_name TEXT,
+    fiscal_year TEXT,
+    period TEXT,
+    announcement_date TEXT,
+    type TEXT,
+    source TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (stock_code, pdf_url)
+);
+CREATE INDEX IF NOT EXISTS idx_materials_stock_code_date ON materials (stock_code, announcement_date DESC);
+
+CREATE TABLE IF NOT EXISTS material_fetches (
+    stock_code TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    material_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS company_names (
+    stock_code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+# SQLiteファイルを開けなかったことを警告済みか（同じファイルを使うストアごとに繰り返さない）
+_unavailable_warned = False
+
+
+def _warn_unavailable(label: str, error: Exception):
+    """SQLiteファイルを開けなかったことをプロセスで1回だけ警告する（以降のストアでは繰り返さない）"""
+    global _unavailable_warned
+    if _unavailable_warned:
+        return
+    _unavailable_warned = True
+    logger.warning(
+        "%sのSQLiteファイル %s を開けませんでした。決算資料ストア・ページキャッシュ・IR BANKのPDF対応表・"
+        "TDnetインデックスなしで続行します: %s", label, MATERIALS_DB_PATH, error
+    )
+
+
+class SQLiteStore:
+    """
+    WALモードのSQLiteファイルを使うストアの基底クラス（スレッドごとに接続を持つ）
+
+    サブクラスは schema にテーブル定義（CREATE ... IF NOT EXISTS）を書く
+
+    Args:
+        path (str): データベースファイルのパス
+    """
+
+    schema = ''
+
+    # 表示用の名前（開けなかった場合のメッセージに使う）
+    label = 'SQLiteストア'
+
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = MATERIALS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        # 初回接続でスキーマを作成（失敗した場合はここで例外になる）
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.schema)
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self) -> '_Transaction':
+        """BEGIN IMMEDIATE 〜 COMMIT（例外時は ROLLBACK）のコンテキストマネージャー"""
+        return _Transaction(self._connect())
+
+    @classmethod
+    def get_shared(cls):
+        """
+        プロセスで共有するインスタンスを取得（初回呼び出し時に作成）
+
+        データベースを開けない環境（読み取り専用のファイルシステムなど）では None を返し、
+        呼び出し側はストアなしで続行する
+        """
+        if '_shared' not in cls.__dict__:
+            with SQLiteStore._shared_lock:
+                if '_shared' not in cls.__dict__:
+                    try:
+                        cls._shared = cls()
+                    except sqlite3.Error as e:
+                        _warn_unavailable(cls.label, e)
+                        cls._shared = None
+        return cls._shared
+
+
+class MaterialsStore(SQLiteStore):
+    """決算資料と企業名のSQLiteストア"""
+
+    schema = SCHEMA
+    label = '決算資料ストア'
+
+    def load_materials(self, stock_code: str, max_age: float = MATERIALS_STORE_TTL) -> Optional[List[Dict]]:
+        """
+        保存済みの決算資料を新しい順に取得
+
+        Args:
+            stock_code (str): 証券コード
+            max_age (float): 最終取得からの経過秒数の上限
+
+        Returns:
+            Optional[List[Dict]]: 決算資料リスト（未取得・max_age を過ぎている場合は None）
+        """
+        conn = self._connect()
+        fetch = conn.execute(
+            'SELECT fetched_at FROM material_fetches WHERE stock_code = ?', (stock_code,)
+        ).fetchone()
+        if fetch is None or time.time() - fetch['fetched_at'] > max_age:
+            return None
+
+        rows = conn.execute(
+            f"SELECT {', '.join(MATERIAL_COLUMNS)} FROM materials "
+            "WHERE stock_code = ? ORDER BY announcement_date DESC",
+            (stock_code,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_materials(self, stock_code: str, materials: List[Dict], fetched_at: Optional[float] = None):
+        """
+        証券コードの決算資料を取得結果で置き換える（0件の場合は取得エラーの可能性があるので何もしない）
+
+        Args:
+            stock_code (str): 証券コード
+            materials (List[Dict]): 決算資料リスト
+            fetched_at (float): 取得時刻のUNIX時刻（省略時は現在時刻。共有キャッシュから写す場合は元の取得時刻）
+        """
+        if not materials:
+            return
+        now = time.time() if fetched_at is None else fetched_at
+        conn = self._connect()
+        with self._transaction():
+            conn.execute('DELETE FROM materials WHERE stock_code = ?', (stock_code,))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO materials ({', '.join(MATERIAL_COLUMNS)}, fetched_at) "
+                f"VALUES ({', '.join('?' for _ in MATERIAL_COLUMNS)}, ?)",
+                [
+                    tuple(stock_code if column == 'stock_code' else material.get(column) for column in MATERIAL_COLUMNS)
+                    + (now,)
+                    for material in materials if material.get('pdf_url')
+                ]
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO material_fetches (stock_code, fetched_at, material_count) VALUES (?, ?, ?)',
+                (stock_code, now, len(materials))
+            )
+
+    def invalidate_materials(self, stock_code: str):
+        """証券コードの最終取得時刻を消して、次回は取り直すようにする"""
+        self._connect().execute('DELETE FROM material_fetches WHERE stock_code = ?', (stock_code,))
+
+    def load_company_name(self, stock_code: str) -> Optional[str]:
+        """保存済みの企業名を取得"""
+        row = self._connect().execute(
+            'SELECT name FROM company_names WHERE stock_code = ?', (stock_code,)
+        ).fetchone()
+        return row['name'] if row else None
+
+    def save_company_name(self, stock_code: str, name: str):
+        """解決した企業名を保存"""
+        self._connect().execute(
+            'INSERT OR REPLACE INTO company_names (stock_code, name, fetched_at) VALUES (?, ?, ?)',
+            (stock_code, name, time.time())
+        )
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE 〜 COMMIT（例外時は ROLLBACK）"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+# インスタンス間の共有キャッシュ（load_materials / save_materials を持つオブジェクト）
+_remote_store = None
+
+
+def set_remote_store(remote_store):
+    """
+    インスタンス間の共有キャッシュを登録
+
+    Args:
+        remote_store: load_materials(stock_code) -> Optional[(決算資料リスト, 取得時刻)]、
+            save_materials(stock_code, materials)、invalidate_materials(stock_code) を持つオブジェクト
+            （SupabaseMaterialsStore）
+    """
+    global _remote_store
+    _remote_store = remote_store
+
+
+def get_store() -> Optional[MaterialsStore]:
+    """共有ストアを取得（開けない環境では None を返し、呼び出し側はストアなしでスクレイピングする）"""
+    return MaterialsStore.get_shared()
+
+
+def load_materials(stock_code: str) -> Optional[List[Dict]]:
+    """
+    鮮度内の決算資料を ローカルストア → 共有キャッシュ の順に取得
+
+    共有キャッシュで見つかった場合は元の取得時刻のままローカルストアに写す
+
+    Returns:
+        Optional[List[Dict]]: 決算資料リスト（どちらにもない・使えない場合は None）
+    """
+    store = get_store()
+    if store is not None:
+        try:
+            materials = store.load_materials(stock_code)
+            if materials is not None:
+                return materials
+        except sqlite3.Error as e:
+            print(f"❌ 決算資料ストア読み込みエラー ({stock_code}): {e}")
+
+    if _remote_store is None:
+        return None
+    remote = _remote_store.load_materials(stock_code)
+    if remote is None:
+        return None
+
+    materials, fetched_at = remote
+    if store is not None:
+        try:
+            store.save_materials(stock_code, materials, fetched_at)
+        except sqlite3.Error as e:
+            print(f"❌ 決算資料ストア書き込みエラー ({stock_code}): {e}")
+    return materials
+
+
+def save_materials(stock_code: str, materials: List[Dict]):
+    """ローカルストアと共有キャッシュに決算資料を書き戻す（使えないものは飛ばす。0件の場合は何もしない）"""
+    if not materials:
+        return
+    store = get_store()
+    if store is not None:
+        try:
+            store.save_materials(stock_code, materials)
+        except sqlite3.Error as e:
+            print(f"❌ 決算資料ストア書き込みエラー ({stock_code}): {e}")
+
+    if _remote_store is not None:
+        _remote_store.save_materials(stock_code, materials)
+
+
+def invalidate_materials(stock_code: str):
+    """ローカルストアと共有キャッシュの決算資料を破棄し、次回はスクレイピングし直すようにする"""
+    store = get_store()
+    if store is not None:
+        try:
+            store.invalidate_materials(stock_code)
+        except sqlite3.Error as e:
+            print(f"❌ 決算資料ストア書き込みエラー ({stock_code}): {e}")
+
+    if _remote_store is not None:
+        _remote_store.invalidate_materials(stock_code)
+
+
+def load_company_name(stock_code: str) -> Optional[str]:
+    """共有ストアから企業名を取得（ストアが使えない・エラーの場合は None）"""
+    store = get_store()
+    if store is None:
+        return None
+    try:
+        return store.load_company_name(stock_code)
+    except sqlite3.Error as e:
+        print(f"❌ 企業名ストア読み込みエラー ({stock_code}): {e}")
+        return None
+
+
+def save_company_name(stock_code: str, name: str):
+    """共有ストアに企業名を書き戻す（ストアが使えない場合は何もしない）"""
+    store = get_store()
+    if store is None:
+        return
+    try:
+        store.save_company_name(stock_code, name)
+    except sqlite3.Error as e:
+        print(f"❌ 企業名ストア書き込みエラー ({stock_code}): {e}")
@@ -0,0 +1,222 @@
+"""
+条件付きGET（ETag / Last-Modified）に対応したページキャッシュ
+
+取得したページの本文を ETag・Last-Modified と一緒に保存し、次回は If-None-Match・
+If-Modified-Since を付けて問い合わせる。304 が返った場合は本文をダウンロードせず、
+保存しておいたパース結果をそのまま使うので、変更のないページの再取得はヘッダーのやり取りだけで済む
+
+本文はストリーミングで読み、インクリメンタルパーサー（html_links.LinkParser など）が
+必要な分を読み終えた時点で接続を閉じる
+
+パース結果は JSON で保存する（タプルはリストとして戻る）。パーサーごとに parser の名前を
+分けておけば、同じURLを別の方法でパースした結果と混ざることはない
+"""
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import http_client
+from materials_store import MATERIALS_DB_PATH, SQLiteStore
+
+# 保存するページの最大数（古く取得したものから削除）
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 5000))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    parser TEXT,
+    parsed TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_fetched_at ON pages (fetched_at);
+"""
+
+
+class PageCache(SQLiteStore):
+    """
+    ページ本文・検証子・パース結果のSQLiteキャッシュ
+
+    Args:
+        path (str): データベースファイルのパス
+        max_entries (int): 保存するページの最大数
+    """
+
+    schema = SCHEMA
+    label = 'ページキャッシュ'
+
+    def __init__(self, path: str = MATERIALS_DB_PATH, max_entries: int = PAGE_CACHE_MAX_ENTRIES):
+        super().__init__(path)
+        self.max_entries = max_entries
+
+    def lookup(self, url: str) -> Optional[sqlite3.Row]:
+        """保存済みのページを取得"""
+        return self._connect().execute(
+            'SELECT url, etag, last_modified, body, parser, parsed FROM pages WHERE url = ?', (url,)
+        ).fetchone()
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes,
+              parser: str, parsed: Any):
+        """ページの本文・検証子・パース結果を保存"""
+        conn = self._connect()
+        with self._transaction():
+            conn.execute(
+                'INSERT OR REPLACE INTO pages (url, etag, last_modified, body, parser, parsed, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, etag, last_modified, zlib.compress(body), parser, json.dumps(parsed, ensure_ascii=False), time.time())
+            )
+            conn.execute(
+                'DELETE FROM pages WHERE url IN (SELECT url FROM pages ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def store_parsed(self, url: str, parser: str, parsed: Any):
+        """保存済みのページのパース結果だけを差し替える（パース関数が変わった場合）"""
+        self._connect().execute(
+            'UPDATE pages SET parser = ?, parsed = ? WHERE url = ?',
+            (parser, json.dumps(parsed, ensure_ascii=False), url)
+        )
+
+    def touch(self, url: str):
+        """304 で検証できたページの取得時刻を更新"""
+        self._connect().execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (time.time(), url))
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """共有ページキャッシュを取得（開けない環境では None を返し、毎回ダウンロードする）"""
+    return PageCache.get_shared()
+
+
+def conditional_headers(url: str) -> Dict[str, str]:
+    """保存済みのページがあれば If-None-Match / If-Modified-Since ヘッダーを返す"""
+    cache = get_page_cache()
+    if cache is None:
+        return {}
+    try:
+        entry = cache.lookup(url)
+    except sqlite3.Error as e:
+        print(f"❌ ページキャッシュ読み込みエラー ({url}): {e}")
+        return {}
+
+    headers = {}
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def parse_chunks(make_parser: Callable[[], Any], chunks: Iterable[bytes]) -> Tuple[Any, bytes]:
+    """
+    本文を少しずつインクリメンタルパーサーに渡す（パーサーが完了を返したら残りは読まない）
+
+    Args:
+        make_parser: feed(data) -> 完了したか と close() -> パース結果 を持つパーサーを作る関数
+        chunks (Iterable[bytes]): 本文の一部を順に返すイテラブル
+
+    Returns:
+        Tuple[Any, bytes]: (パース結果, 読んだ部分の本文)
+    """
+    parser = make_parser()
+    read = []
+    for chunk in chunks:
+        read.append(chunk)
+        if parser.feed(chunk):
+            break
+    return parser.close(), b''.join(read)
+
+
+def cached_result(url: str, parser: str, make_parser: Callable[[], Any]) -> Optional[Any]:
+    """
+    304 が返ったページの保存済みのパース結果を取得（同期版・非同期版で共有）
+
+    別のパーサーの結果しかない場合は保存済みの本文をパースし直す。保存済みの本文は前のパーサーが
+    途中で読み終えた部分だけのことがあるので、パーサーが本文の中で完了しなかった場合は結果を使わない
+
+    Returns:
+        Optional[Any]: パース結果（保存済みのページがない・本文が足りない・エラーの場合は None）
+    """
+    cache = get_page_cache()
+    if cache is None:
+        return None
+    try:
+        entry = cache.lookup(url)
+        if entry is None:
+            return None
+        cache.touch(url)
+        if entry['parser'] == parser and entry['parsed'] is not None:
+            return json.loads(entry['parsed'])
+
+        reparser = make_parser()
+        if not reparser.feed(zlib.decompress(entry['body'])):
+            return None
+        parsed = reparser.close()
+        cache.store_parsed(url, parser, parsed)
+        return parsed
+    except sqlite3.Error as e:
+        print(f"❌ ページキャッシュ読み込みエラー ({url}): {e}")
+        return None
+
+
+def store_result(url: str, headers, body: bytes, parser: str, parsed: Any):
+    """
+    200 で取得したページを検証子・パース結果と一緒に保存（同期版・非同期版で共有）
+
+    検証子（ETag / Last-Modified）がないページは保存しない。パーサーが途中で読み終えた場合は
+    読んだ部分の本文だけを保存する
+
+    Args:
+        url (str): リクエストしたURL
+        headers: レスポンスヘッダー（大文字小文字を区別しないマッピング）
+        body (bytes): 読んだ本文
+        parser (str): パース結果を区別する名前
+        parsed (Any): パース結果（JSONにできる値）
+    """
+    cache = get_page_cache()
+    etag = headers.get('ETag')
+    last_modified = headers.get('Last-Modified')
+    if cache is not None and (etag or last_modified):
+        try:
+            cache.store(url, etag, last_modified, body, parser, parsed)
+        except sqlite3.Error as e:
+            print(f"❌ ページキャッシュ書き込みエラー ({url}): {e}")
+
+
+def fetch_parsed(url: str, parser: str, make_parser: Callable[[], Any], conditional: bool = True) -> Optional[Any]:
+    """
+    ページを条件付きGETで取得してパースする（変更がなければ保存済みのパース結果を返す）
+
+    本文は少しずつ読んでパーサーに渡し、パーサーが完了したら残りはダウンロードしない
+
+    Args:
+        url (str): 取得するURL
+        parser (str): パース結果を区別する名前（パーサーと引数ごとに変える）
+        make_parser: feed(data) -> 完了したか と close() -> パース結果（JSONにできる値）を持つ
+            パーサーを作る関数（html_links.LinkParser など）
+        conditional (bool): False の場合は保存済みのページがあっても条件なしで取得する
+
+    Returns:
+        Optional[Any]: パース結果（取得できなかった場合は None）
+    """
+    with http_client.stream(url, headers=conditional_headers(url) if conditional else {}) as response:
+        if response.status_code == 304:
+            parsed = cached_result(url, parser, make_parser)
+            if parsed is not None:
+                return parsed
+        elif response.status_code != 200:
+            return None
+        else:
+            parsed, body = parse_chunks(make_parser, http_client.iter_body(response))
+
+    if response.status_code == 304:
+        # 保存済みの本文からこのパーサーの結果を作れない場合は、本文を取り直す
+        return fetch_parsed(url, parser, make_parser, conditional=False)
+
+    store_result(url, response.headers, body, parser, parsed)
+    return parsed
@@ -0,0 +1,123 @@
+"""
+企業名のあいまい検索（入力ミス対策）
+
+SymSpell方式の削除インデックスを読み込み時に構築する。各検索キーの先頭 PREFIX_LENGTH 文字までの
+各長さの先頭部分から最大 MAX_DISTANCE 文字を削除した文字列をすべて登録しておき、検索時はクエリ側の
+削除文字列で候補を引いてから編集距離を確認するため、全銘柄との比較は不要になる。先頭部分ごとに
+登録するので、入力途中のクエリ（企業名より短い入力）に入力ミスがあっても候補から漏れない
+"""
+from itertools import combinations
+from typing import Dict, List, Optional, Set
+
+from stock_index import BaseStockIndex, normalize_search_key
+
+# 許容する最大編集距離
+MAX_DISTANCE = 2
+
+# 削除インデックスに登録する検索キーの先頭文字数
+PREFIX_LENGTH = 7
+
+# この文字数以下のクエリは編集距離1までに制限する（短い入力で候補が広がりすぎないように）
+SHORT_QUERY_LENGTH = 4
+
+
+def _deletes(text: str, max_distance: int) -> Set[str]:
+    """文字列から最大 max_distance 文字を削除した文字列をすべて生成（元の文字列を含む）"""
+    results = {text}
+    for distance in range(1, min(max_distance, len(text)) + 1):
+        for removed in combinations(range(len(text)), distance):
+            removed = set(removed)
+            results.add(''.join(ch for i, ch in enumerate(text) if i not in removed))
+    return results
+
+
+def _prefix_deletes(prefix: str, max_distance: int) -> Set[str]:
+    """2文字以上の各長さの先頭部分について _deletes() を求めた和集合"""
+    results = set()
+    for length in range(min(2, len(prefix)), len(prefix) + 1):
+        results |= _deletes(prefix[:length], max_distance)
+    return results
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    隣接文字の入れ替えを1操作とみなす編集距離（OSA距離）
+
+    max_distance を超えることが確定した時点で打ち切り、max_distance + 1 を返す
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, prev_prev[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, current
+    return prev[len(b)]
+
+
+class StockFuzzyMatcher:
+    """
+    株式マスターインデックスに対する削除インデックス
+
+    Args:
+        index (BaseStockIndex): 株式マスターの検索インデックス
+    """
+
+    def __init__(self, index: BaseStockIndex):
+        self.index = index
+        self.deletes: Dict[str, List[int]] = {}
+
+        for position in range(len(index)):
+            prefix = index.key(position)[:PREFIX_LENGTH]
+            for deleted in _prefix_deletes(prefix, MAX_DISTANCE):
+                self.deletes.setdefault(deleted, []).append(position)
+
+    def search(self, query: str, limit: int = 20, mask: Optional[int] = None) -> List[Dict]:
+        """
+        編集距離が近い企業名を返す
+
+        Args:
+            query (str): 検索クエリ
+            limit (int): 最大件数
+            mask (int): ファセットで絞り込む場合のビットマップ（facet_mask() の戻り値）
+
+        Returns:
+            List[Dict]: 編集距離の小さい順（同距離はマスターの並び順）の検索結果
+        """
+        key = normalize_search_key(query)
+        if len(key) < 2:
+            return []
+
+        max_distance = 1 if len(key) <= SHORT_QUERY_LENGTH else MAX_DISTANCE
+
+        candidates = set()
+        for deleted in _deletes(key[:PREFIX_LENGTH], max_distance):
+            candidates.update(self.deletes.get(deleted, ()))
+
+        matches = []
+        for position in candidates:
+            if mask is not None and not (mask >> position) & 1:
+                continue
+            target = self.index.key(position)
+            # 入力途中のクエリにも対応するため、クエリと同じ長さの先頭部分との距離も見て近い方を採用する
+            distance = min(
+                edit_distance(key, target, max_distance),
+                edit_distance(key, target[:len(key)], max_distance),
+            )
+            if distance <= max_distance:
+                matches.append((distance, position))
+
+        matches.sort()
+        return [self.index.record(position) for _, position in matches[:limit]]
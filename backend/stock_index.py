@@ -0,0 +1,293 @@
+"""
+株式マスターの検索インデックス
+
+証券コード→レコードのハッシュマップと、企業名のn-gram転置インデックスを
+プロセス内に保持し、/api/search の完全一致・部分一致検索をネットワーク往復なしで返す
+
+企業名は全角英数字・全角スペースを含むため、NFKC正規化・大文字小文字の統一・
+ひらがな→カタカナ変換・空白除去を行った検索キーを読み込み時に一度だけ計算し、
+検索はクエリを一度正規化してこのキーと照合する
+"""
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Iterable, Iterator, Sequence
+
+# 企業名の転置インデックスに使うn-gramの長さ（1文字クエリ用にユニグラムも登録する）
+NGRAM_SIZE = 2
+
+# ひらがな（ぁ〜ゖ）をカタカナ（ァ〜ヶ）に変換する対応表
+_KANA_FOLD = {code: code + 0x60 for code in range(0x3041, 0x3097)}
+
+# ファセット検索に使う属性（market: 市場区分, sector: 33業種区分）
+FACETS = ('market', 'sector')
+
+# JPXの市場・商品区分（括弧より前の部分）→ market の値
+MARKET_SEGMENTS = {
+    'プライム': 'Prime',
+    'スタンダード': 'Standard',
+    'グロース': 'Growth',
+    'ETF・ETN': 'ETF',
+    'PRO Market': 'PRO',
+    'REIT・ベンチャーファンド・カントリーファンド・インフラファンド': 'REIT',
+    '出資証券': 'Other',
+}
+
+
+def normalize_search_key(text: str) -> str:
+    """
+    検索用の正規化キーを生成
+
+    NFKC正規化（全角英数字→半角など）、casefold、ひらがな→カタカナ変換、空白除去を行う
+
+    Args:
+        text (str): 企業名または検索クエリ
+
+    Returns:
+        str: 正規化した検索キー
+    """
+    key = unicodedata.normalize('NFKC', text).casefold().translate(_KANA_FOLD)
+    return ''.join(key.split())
+
+
+def market_segment(label: str) -> Optional[str]:
+    """
+    JPXの市場・商品区分から market の値を求める
+
+    Args:
+        label (str): 市場・商品区分（例: "プライム（内国株式）"）または market の値
+
+    Returns:
+        str: market の値（例: "Prime"）。空の場合は None
+    """
+    if not label or label == '-':
+        return None
+    segment = label.split('（')[0].strip()
+    return MARKET_SEGMENTS.get(segment, segment)
+
+
+def key_grams(key: str) -> set:
+    """検索キーからインデックス登録用のユニグラム・バイグラムを生成"""
+    grams = set(key)
+    for i in range(len(key) - NGRAM_SIZE + 1):
+        grams.add(key[i:i + NGRAM_SIZE])
+    return grams
+
+
+def query_grams(query: str) -> set:
+    """検索クエリから転置リストを引くためのn-gramを生成"""
+    if len(query) < NGRAM_SIZE:
+        return {query}
+    return {query[i:i + NGRAM_SIZE] for i in range(len(query) - NGRAM_SIZE + 1)}
+
+
+def iter_bits(mask: int, limit: Optional[int] = None) -> Iterator[int]:
+    """ビットマップの立っているビットの位置を昇順に返す"""
+    count = 0
+    while mask and (limit is None or count < limit):
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+        count += 1
+
+
+class BaseStockIndex:
+    """
+    株式マスター検索インデックスの共通実装
+
+    サブクラスはレコード数・位置→レコード／検索キー・証券コード→位置・
+    n-gram→転置リストの参照方法だけを実装し、検索ロジックはここで共有する
+    """
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def record(self, position: int) -> Dict:
+        """位置からレコードを取得"""
+        raise NotImplementedError
+
+    def name(self, position: int) -> str:
+        """位置から企業名を取得"""
+        return self.record(position)['name']
+
+    def key(self, position: int) -> str:
+        """位置から企業名の検索キー（正規化済み）を取得"""
+        raise NotImplementedError
+
+    def position_of(self, code: str) -> Optional[int]:
+        """証券コードからレコードの位置を取得"""
+        raise NotImplementedError
+
+    def posting(self, gram: str) -> Sequence[int]:
+        """n-gramの転置リスト（昇順の位置リスト）を取得"""
+        raise NotImplementedError
+
+    def derived(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        このインデックスから作る補助構造（サジェスト・あいまい検索など）を初回だけ構築して返す
+
+        インデックスが差し替わると補助構造も新しいインデックスの分が作り直される
+        """
+        cache = self.__dict__.setdefault('_derived', {})
+        if name not in cache:
+            cache[name] = factory()
+        return cache[name]
+
+    def facet_value(self, position: int, facet: str) -> Optional[str]:
+        """位置からファセット属性の値を取得"""
+        return self.record(position).get(facet)
+
+    def facet_bitmaps(self) -> Dict[str, Dict[str, int]]:
+        """
+        ファセットの値ごとのビットマップ（位置をビットとする整数）を取得
+
+        Returns:
+            Dict[str, Dict[str, int]]: ファセット→正規化した値→ビットマップ
+        """
+        return self.derived('facet_bitmaps', self._build_facet_bitmaps)
+
+    def _build_facet_bitmaps(self) -> Dict[str, Dict[str, int]]:
+        positions = {facet: {} for facet in FACETS}
+        for position in range(len(self)):
+            for facet in FACETS:
+                value = self.facet_value(position, facet)
+                if value:
+                    positions[facet].setdefault(normalize_search_key(value), []).append(position)
+
+        bitmaps = {}
+        for facet, values in positions.items():
+            bitmaps[facet] = {}
+            for value, members in values.items():
+                bitmap = bytearray((len(self) + 7) // 8)
+                for position in members:
+                    bitmap[position >> 3] |= 1 << (position & 7)
+                bitmaps[facet][value] = int.from_bytes(bitmap, 'little')
+        return bitmaps
+
+    def facet_mask(self, filters: Dict[str, Optional[str]]) -> Optional[int]:
+        """
+        ファセットの絞り込み条件をビットマップの積に変換
+
+        Args:
+            filters (Dict[str, Optional[str]]): ファセット→値（値が空の条件は無視する）
+
+        Returns:
+            int: 条件を満たす位置のビットマップ。条件がない場合は None
+        """
+        bitmaps = self.facet_bitmaps()
+        mask = None
+        for facet, value in filters.items():
+            if not value:
+                continue
+            if facet == 'market':
+                value = market_segment(value)
+            bitmap = bitmaps.get(facet, {}).get(normalize_search_key(value), 0)
+            mask = bitmap if mask is None else mask & bitmap
+        return mask
+
+    def get(self, code: str) -> Optional[Dict]:
+        """証券コードからレコードを取得（完全一致）"""
+        position = self.position_of(code)
+        if position is None:
+            return None
+        return self.record(position)
+
+    def search_name(self, query: str, limit: int = 20, mask: Optional[int] = None) -> List[Dict]:
+        """
+        企業名の部分一致検索
+
+        クエリを正規化し、その中で最も出現頻度の低いn-gramの転置リストだけを候補として
+        走査して検索キーとの部分一致を確認する。結果はマスターの並び順を保つ
+
+        Args:
+            query (str): 検索クエリ
+            limit (int): 最大件数
+            mask (int): ファセットで絞り込む場合のビットマップ（facet_mask() の戻り値）
+
+        Returns:
+            List[Dict]: 一致したレコードのリスト
+        """
+        query = normalize_search_key(query)
+        if mask is not None and not query:
+            # 絞り込み条件だけの場合は該当する銘柄をマスターの並び順で返す
+            return [self.record(position) for position in iter_bits(mask, limit)]
+        if not query:
+            return []
+
+        candidates = None
+        for gram in query_grams(query):
+            posting = self.posting(gram)
+            if not len(posting):
+                # 1つでも存在しないn-gramがあれば一致するレコードはない
+                return []
+            if candidates is None or len(posting) < len(candidates):
+                candidates = posting
+
+        if mask is not None and mask.bit_count() < len(candidates):
+            # 絞り込み後の銘柄数の方が少なければ、ビットマップ側を候補にする
+            candidates = iter_bits(mask)
+            mask = None
+
+        results = []
+        for position in candidates:
+            if mask is not None and not (mask >> position) & 1:
+                continue
+            if query in self.key(position):
+                results.append(self.record(position))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def search(self, query: str, limit: int = 20, mask: Optional[int] = None) -> List[Dict]:
+        """
+        証券コード（完全一致）→企業名（部分一致）の順で検索
+
+        Args:
+            query (str): 検索クエリ（企業名の一部または証券コード）
+            limit (int): 最大件数
+            mask (int): ファセットで絞り込む場合のビットマップ（facet_mask() の戻り値）
+
+        Returns:
+            List[Dict]: 検索結果のリスト
+        """
+        code = normalize_search_key(query)
+        if code.isdigit():
+            position = self.position_of(code)
+            if position is not None and (mask is None or (mask >> position) & 1):
+                return [self.record(position)]
+        return self.search_name(query, limit, mask)
+
+
+class StockMasterIndex(BaseStockIndex):
+    """
+    株式マスターのインメモリ検索インデックス
+
+    構築はプロセスごとに1回だけ行い、以降の検索はハッシュ参照と
+    転置リストの走査だけで完結する
+    """
+
+    def __init__(self, stocks: Iterable[Dict]):
+        self.stocks: List[Dict] = list(stocks)
+        self.keys: List[str] = []
+        self.by_code: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+
+        for position, stock in enumerate(self.stocks):
+            key = normalize_search_key(stock['name'])
+            self.keys.append(key)
+            self.by_code[stock['code']] = position
+            for gram in key_grams(key):
+                self.postings.setdefault(gram, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.stocks)
+
+    def record(self, position: int) -> Dict:
+        return self.stocks[position]
+
+    def key(self, position: int) -> str:
+        return self.keys[position]
+
+    def position_of(self, code: str) -> Optional[int]:
+        return self.by_code.get(code)
+
+    def posting(self, gram: str) -> Sequence[int]:
+        return self.postings.get(gram, ())
@@ -0,0 +1,349 @@
+"""
+株式マスターのバックグラウンド同期
+
+初回はSupabaseから並列のrange()リクエストで全件を取得し、以降は updated_at が
+前回同期以降に更新された行だけを定期的に取得する。新しいインデックスは構築完了後に
+参照を1回差し替えるだけなので、リクエストスレッドはSupabaseを待たず、
+構築途中のインデックスを見ることもない
+
+Supabaseと同期してスナップショット（SYNCED_SNAPSHOT_PATH）を書き直すのは、ロックファイル
+（スナップショットのパス + '.lock'）を取れた1つのワーカーだけにする。ほかのワーカーは
+スナップショットの差し替えを見て同じファイルをmmapし直すので、同期後も起動時と同じく、
+すべてのワーカーがOSのページキャッシュを共有する。同期していたワーカーが終了すると、
+次にロックを取れたワーカーが同期を引き継ぐ。書き出せない環境ではワーカーごとに同期し、
+メモリ上のインデックスを構築する
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from stock_index import FACETS, BaseStockIndex, StockMasterIndex
+from stock_snapshot import SNAPSHOT_PATH, SYNCED_SNAPSHOT_PATH, open_snapshot, replace_snapshot, snapshot_signature
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# PostgRESTの制限(1000件/リクエスト)
+PAGE_SIZE = 1000
+
+# 初回全件取得時の並列リクエスト数
+MAX_PARALLEL_PAGES = int(os.getenv('STOCK_MASTER_PARALLEL_PAGES', 4))
+
+# 差分同期の間隔（秒）
+REFRESH_INTERVAL = int(os.getenv('STOCK_MASTER_REFRESH_INTERVAL', 600))
+
+# 同期していないワーカーが共有スナップショットの差し替えを確認する間隔（秒）
+SNAPSHOT_CHECK_INTERVAL = int(os.getenv('STOCK_MASTER_SNAPSHOT_CHECK_INTERVAL', 30))
+
+# 何回の差分同期ごとに全件を取り直すか（削除された銘柄を反映するため）
+FULL_RESYNC_EVERY = int(os.getenv('STOCK_MASTER_FULL_RESYNC_EVERY', 36))
+
+# 0 にするとSupabaseとの同期を行わず、スナップショット（またはローカルファイル）だけを使う
+BACKGROUND_SYNC = os.getenv('STOCK_MASTER_BACKGROUND_SYNC', '1') != '0'
+
+# 同期で取得する列（インデックスに載せる属性 + updated_at）
+STOCK_COLUMNS = 'code, name, ' + ', '.join(FACETS) + ', updated_at'
+
+# ファセットの列（20250117_add_stock_master_facets.sql）がないデータベースで取得する列
+BASE_STOCK_COLUMNS = 'code, name, updated_at'
+
+LOCAL_STOCK_MASTER_PATH = os.path.join(os.path.dirname(__file__), 'stock_master.json')
+
+
+def load_local_stock_master(path: str = LOCAL_STOCK_MASTER_PATH) -> List[Dict]:
+    """
+    ローカルJSONファイルから株式マスターを読み込む
+
+    Args:
+        path (str): stock_master.json のパス
+
+    Returns:
+        List[Dict]: 株式マスター（読み込めない場合は空リスト）
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            print(f"✅ Loaded {len(data)} stocks from local file")
+            return data
+    except FileNotFoundError:
+        print(f"❌ ローカルファイルが見つかりません: {path}")
+        return []
+    except Exception as e:
+        print(f"❌ ローカルファイル読み込みエラー: {e}")
+        return []
+
+
+def _to_record(row: Dict) -> Dict:
+    """Supabaseの行からインデックスに載せるレコードを作る（updated_at は含めない）"""
+    record = {'code': row['code'], 'name': row['name']}
+    for facet in FACETS:
+        record[facet] = row.get(facet)
+    return record
+
+
+def _missing_facet_columns(error: Exception) -> bool:
+    """ファセットの列がないことによるエラーか（PostgreSQLの undefined_column）"""
+    message = str(error)
+    return ('42703' in message or 'does not exist' in message) and any(facet in message for facet in FACETS)
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def load_initial_index() -> BaseStockIndex:
+    """
+    起動直後に使うインデックスを読み込む
+
+    以前に同期したスナップショットがビルド済みのものより新しければそちらを、なければビルド済みの
+    スナップショットをmmapし、どちらもなければローカルJSONから構築する
+    """
+    index = None
+    if _mtime(SYNCED_SNAPSHOT_PATH) > _mtime(SNAPSHOT_PATH):
+        index = open_snapshot(SYNCED_SNAPSHOT_PATH)
+    if index is None:
+        index = open_snapshot()
+    if index is not None:
+        return index
+    return StockMasterIndex(load_local_stock_master())
+
+
+class StockMasterRefresher:
+    """
+    株式マスターインデックスを保持し、バックグラウンドでSupabaseと同期する
+
+    Args:
+        client: Supabaseクライアント
+        initial_loader: Supabaseから取得できるまでの間に使うインデックスの読み込み関数
+        interval (int): 差分同期の間隔（秒）
+        background_sync (bool): バックグラウンドでSupabaseと同期するか
+        snapshot_path (str): 同期したインデックスを書き出してmmapするスナップショットのパス
+        check_interval (int): 同期していない場合にスナップショットの差し替えを確認する間隔（秒）
+        lock_path (str): 同期するワーカーを1つに限るロックファイル（省略時はスナップショットのパス + '.lock'）
+    """
+
+    def __init__(self, client, initial_loader: Callable[[], BaseStockIndex] = load_initial_index,
+                 interval: int = REFRESH_INTERVAL, background_sync: bool = BACKGROUND_SYNC,
+                 snapshot_path: str = SYNCED_SNAPSHOT_PATH, check_interval: int = SNAPSHOT_CHECK_INTERVAL,
+                 lock_path: Optional[str] = None):
+        self.client = client
+        self.initial_loader = initial_loader
+        self.interval = interval
+        self.background_sync = background_sync
+        self.snapshot_path = snapshot_path
+        self.check_interval = check_interval
+        self.lock_path = lock_path or snapshot_path + '.lock'
+
+        self._index: Optional[BaseStockIndex] = None
+        # mmapしている共有スナップショット（snapshot_signature の値。読み込んでいなければ None）
+        self._snapshot_signature = None
+        self._lock_file = None
+        self._records: Dict[str, Dict] = {}
+        self._last_synced: Optional[str] = None
+        self._syncs_since_full = 0
+        self._columns = STOCK_COLUMNS
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get_index(self) -> BaseStockIndex:
+        """
+        現在のインデックスを取得
+
+        まだ一度も読み込まれていない場合はスナップショット（またはローカルデータ）を使い、
+        Supabaseとの同期はバックグラウンドスレッドに任せる
+        """
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    # 起動時点の共有スナップショットは initial_loader が選ぶので、以降の差し替えだけを読み直す
+                    self._snapshot_signature = snapshot_signature(self.snapshot_path)
+                    self._index = self.initial_loader()
+                index = self._index
+            if self.background_sync:
+                self.start()
+        return index
+
+    def start(self):
+        """バックグラウンド同期スレッドを起動（起動済みの場合は何もしない）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='stock-master-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """バックグラウンド同期スレッドを停止"""
+        self._stop.set()
+
+    def acquire_writer_lock(self) -> bool:
+        """
+        ロックファイルの排他ロックを取得（ロックはプロセスの終了まで保持する）
+
+        ロックファイルを開けない環境（書き込めないディレクトリなど）ではスナップショットも書き出せないので、
+        ワーカーごとに同期する
+
+        Returns:
+            bool: このワーカーが同期する場合は True（ほかのワーカーが同期中の場合は False）
+        """
+        if self._lock_file is not None or fcntl is None:
+            return True
+        try:
+            lock_file = open(self.lock_path, 'a')
+        except OSError as e:
+            print(f"⚠️  株式マスター同期のロックファイルを開けません（ワーカーごとに同期します）: {e}")
+            return True
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            # ロックを持つワーカーだけがSupabaseと同期し、ほかはスナップショットの差し替えを待つ
+            writer = self.acquire_writer_lock()
+            try:
+                if writer:
+                    self.refresh()
+                else:
+                    self.reload_snapshot()
+            except Exception as e:
+                print(f"❌ 株式マスター同期エラー: {e}")
+            self._stop.wait(self.interval if writer else self.check_interval)
+
+    def reload_snapshot(self) -> bool:
+        """
+        ほかのワーカーが書き直した共有スナップショットをmmapし直す
+
+        Returns:
+            bool: 読み直した場合は True（差し替えられていない・開けない場合は False）
+        """
+        signature = snapshot_signature(self.snapshot_path)
+        if signature is None or signature == self._snapshot_signature:
+            return False
+        index = open_snapshot(self.snapshot_path)
+        if index is None:
+            return False
+        self._snapshot_signature = signature
+        self._index = index
+        return True
+
+    def refresh(self):
+        """前回同期からの差分を取得（初回および定期的には全件取得）してインデックスを差し替える"""
+        if self._last_synced is None or self._syncs_since_full >= FULL_RESYNC_EVERY:
+            self.load_full()
+        else:
+            self.load_incremental()
+
+    def load_full(self):
+        """Supabaseから全件を並列取得してインデックスを差し替える"""
+        response = self.client.table('stock_master').select('code', count='exact').limit(1).execute()
+        total = response.count or 0
+        if not total:
+            print("⚠️  Supabaseからデータが取得できませんでした。現在のインデックスを維持します。")
+            return
+
+        offsets = range(0, total, PAGE_SIZE)
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_PAGES) as executor:
+            pages = list(executor.map(self._fetch_page, offsets))
+
+        rows = [row for page in pages for row in page]
+        records = {}
+        for row in rows:
+            records[row['code']] = _to_record(row)
+
+        self._records = records
+        self._last_synced = max((row['updated_at'] for row in rows if row.get('updated_at')), default=None)
+        self._syncs_since_full = 0
+        self._swap()
+        print(f"✅ Loaded {len(records)} stocks from Supabase")
+
+    def load_incremental(self):
+        """
+        前回同期以降に updated_at が更新された行だけを取得して反映する
+
+        前回の最後の行と同じ updated_at の行を取りこぼさないよう、updated_at が前回の値以上の行を
+        (updated_at, code) の順に取得し、保存済みのレコードと同じ行（前回取得した行）は除く
+        """
+        rows = []
+        offset = 0
+        while True:
+            response = self._select(
+                lambda columns: self.client.table('stock_master')
+                .select(columns)
+                .gte('updated_at', self._last_synced)
+                .order('updated_at')
+                .order('code')
+                .range(offset, offset + PAGE_SIZE - 1)
+            )
+            rows.extend(response.data)
+            if len(response.data) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+
+        self._syncs_since_full += 1
+        if rows:
+            self._last_synced = rows[-1]['updated_at']
+
+        updated = {}
+        for row in rows:
+            record = _to_record(row)
+            if self._records.get(row['code']) != record:
+                updated[row['code']] = record
+        if not updated:
+            return
+
+        records = dict(self._records)
+        records.update(updated)
+
+        self._records = records
+        self._swap()
+        print(f"✅ Synced {len(updated)} updated stocks from Supabase")
+
+    def _fetch_page(self, offset: int) -> List[Dict]:
+        response = self._select(
+            lambda columns: self.client.table('stock_master')
+            .select(columns)
+            .order('code')
+            .range(offset, offset + PAGE_SIZE - 1)
+        )
+        return response.data
+
+    def _select(self, build: Callable):
+        """
+        取得する列を渡して組み立てたクエリを実行
+
+        ファセットの列がないデータベース（マイグレーション未適用）では、以降はファセットなしの列で取得する
+        """
+        columns = self._columns
+        try:
+            return build(columns).execute()
+        except Exception as e:
+            if columns == BASE_STOCK_COLUMNS or not _missing_facet_columns(e):
+                raise
+            if self._columns != BASE_STOCK_COLUMNS:
+                print("⚠️  stock_master に market / sector 列がありません。ファセットなしで同期します。")
+                self._columns = BASE_STOCK_COLUMNS
+            return build(BASE_STOCK_COLUMNS).execute()
+
+    def _swap(self):
+        # 構築が完了してから参照を差し替える（代入はアトミック）
+        records = sorted(self._records.values(), key=lambda stock: stock['code'])
+        try:
+            self._index = replace_snapshot(records, self.snapshot_path)
+            self._snapshot_signature = snapshot_signature(self.snapshot_path)
+        except Exception as e:
+            print(f"⚠️  株式マスターのスナップショットを書き出せませんでした（メモリ上に構築します）: {e}")
+            self._index = StockMasterIndex(records)
@@ -0,0 +1,39 @@
+"""
+Supabase RPC を使ったサーバーサイドの企業検索
+
+stock_master の正規化キーの pg_trgm インデックス（idx_stock_master_name_key）を使う
+search_stock_master 関数を呼び出し、一致した上位の行だけを受け取る。
+クエリはプロセス内インデックスと同じ normalize_search_key で正規化してから渡す
+"""
+import os
+from typing import Dict, List
+
+from stock_index import FACETS, normalize_search_key
+
+# 検索モード: index（プロセス内インデックス）または rpc（Supabase RPC）
+SEARCH_MODE = os.getenv('STOCK_SEARCH_MODE', 'index')
+
+SEARCH_MODES = ('index', 'rpc')
+
+
+def search_via_rpc(client, query: str, limit: int = 20) -> List[Dict]:
+    """
+    Supabase RPC で企業を検索
+
+    Args:
+        client: Supabaseクライアント（rpc() を持つもの）
+        query (str): 検索クエリ（企業名の一部または証券コード）
+        limit (int): 最大件数
+
+    Returns:
+        List[Dict]: 類似度順の検索結果（code, name, market, sector）
+    """
+    params = {'query': normalize_search_key(query), 'max_results': limit}
+    response = client.rpc('search_stock_master', params).execute()
+    results = []
+    for row in response.data or []:
+        stock = {'code': row['code'], 'name': row['name']}
+        for facet in FACETS:
+            stock[facet] = row.get(facet)
+        results.append(stock)
+    return results
@@ -0,0 +1,294 @@
+"""
+株式マスターのコンパクトなバイナリスナップショット
+
+stock_master.json をビルド時に以下の形式へ変換し、アプリ起動時は読み取り専用で
+mmapするだけにする。JSONのデコードやdictの生成が不要になるため起動が速く、
+複数のワーカープロセスがOSのページキャッシュを共有できる
+
+レイアウト（リトルエンディアン）:
+    ヘッダー      : マジック(4B) + バージョン, 件数, n-gram数, 各セクションのオフセット
+    証券コード列  : 件数 × 4B（証券コード昇順、二分探索で引く）
+    企業名オフセット: (件数 + 1) × uint32（企業名テーブル内の開始位置）
+    企業名テーブル : 企業名（表示用）をUTF-8で連結したもの
+    検索キーオフセット: (件数 + 1) × uint32（検索キーテーブル内の開始位置）
+    検索キーテーブル: 正規化済みの検索キーをUTF-8で連結したもの
+    ファセット値辞書: ファセットごとの値のリスト（JSON、UTF-8）
+    ファセット列  : ファセット数 × 件数 × uint16（値辞書内の番号、値なしは 0xFFFF）
+    n-gramテーブル : n-gram数 × (キー8B + 転置リスト開始 uint32 + 件数 uint32)、キー昇順
+    転置リスト    : uint32 の位置配列
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from stock_index import FACETS, BaseStockIndex, key_grams, normalize_search_key
+
+SNAPSHOT_MAGIC = b'IRSM'
+SNAPSHOT_VERSION = 3
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), 'stock_master.snapshot')
+
+
+def default_synced_snapshot_path() -> str:
+    """Supabaseと同期した株式マスターのスナップショットのデフォルトのパス（backend/ に書き込めなければ一時ディレクトリ）"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    if not os.access(directory, os.W_OK):
+        directory = tempfile.gettempdir()
+    return os.path.join(directory, 'stock_master.synced.snapshot')
+
+
+# 同期のたびに書き直すスナップショット（同じマシンのワーカーはこのファイルをmmapしてページキャッシュを共有する）
+SYNCED_SNAPSHOT_PATH = os.getenv('STOCK_MASTER_SYNCED_SNAPSHOT_PATH') or default_synced_snapshot_path()
+
+CODE_WIDTH = 4
+GRAM_KEY_WIDTH = 8  # 2文字 × UTF-8最大4バイト
+
+_HEADER = struct.Struct('<4sIIIIIIIIIIIII')
+
+# ファセット値がないことを表す番号
+_NO_FACET_VALUE = 0xFFFF
+_GRAM_ENTRY = struct.Struct(f'<{GRAM_KEY_WIDTH}sII')
+
+
+def _gram_key(gram: str) -> bytes:
+    return gram.encode('utf-8').ljust(GRAM_KEY_WIDTH, b'\0')
+
+
+def write_snapshot(stocks: Iterable[Dict], path: str = SNAPSHOT_PATH) -> int:
+    """
+    株式マスターをスナップショットファイルに書き出す
+
+    Args:
+        stocks (Iterable[Dict]): 株式マスター（code, name, market, sector）
+        path (str): 出力先のパス
+
+    Returns:
+        int: 書き出した件数
+    """
+    stocks = sorted(stocks, key=lambda stock: stock['code'])
+
+    codes = bytearray()
+    name_offsets = [0]
+    names = bytearray()
+    key_offsets = [0]
+    keys = bytearray()
+    facet_values: Dict[str, List[str]] = {facet: [] for facet in FACETS}
+    facet_ids: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+    facet_columns: Dict[str, List[int]] = {facet: [] for facet in FACETS}
+    postings: Dict[bytes, List[int]] = {}
+
+    for position, stock in enumerate(stocks):
+        for facet in FACETS:
+            value = stock.get(facet)
+            if value is None:
+                facet_columns[facet].append(_NO_FACET_VALUE)
+                continue
+            if value not in facet_ids[facet]:
+                facet_ids[facet][value] = len(facet_values[facet])
+                facet_values[facet].append(value)
+            facet_columns[facet].append(facet_ids[facet][value])
+        code = stock['code'].encode('ascii')
+        if len(code) != CODE_WIDTH:
+            raise ValueError(f"証券コードは{CODE_WIDTH}桁である必要があります: {stock['code']}")
+        codes += code
+        names += stock['name'].encode('utf-8')
+        name_offsets.append(len(names))
+        key = normalize_search_key(stock['name'])
+        keys += key.encode('utf-8')
+        key_offsets.append(len(keys))
+        for gram in key_grams(key):
+            postings.setdefault(_gram_key(gram), []).append(position)
+
+    gram_table = bytearray()
+    posting_data = []
+    for key in sorted(postings):
+        gram_table += _GRAM_ENTRY.pack(key, len(posting_data), len(postings[key]))
+        posting_data.extend(postings[key])
+
+    codes_offset = _HEADER.size
+    name_offsets_offset = codes_offset + len(codes)
+    names_offset = name_offsets_offset + 4 * len(name_offsets)
+    key_offsets_offset = names_offset + len(names)
+    keys_offset = key_offsets_offset + 4 * len(key_offsets)
+    facets_json = json.dumps(facet_values, ensure_ascii=False).encode('utf-8')
+    facets_json_offset = keys_offset + len(keys)
+    facet_columns_offset = facets_json_offset + len(facets_json)
+    grams_offset = facet_columns_offset + 2 * len(FACETS) * len(stocks)
+    postings_offset = grams_offset + len(gram_table)
+    # uint32配列をゼロコピーで参照できるよう4バイト境界に揃える
+    padding = (-postings_offset) % 4
+    postings_offset += padding
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(stocks), len(postings),
+            codes_offset, name_offsets_offset, names_offset, key_offsets_offset, keys_offset,
+            facets_json_offset, len(facets_json), facet_columns_offset, grams_offset, postings_offset
+        ))
+        f.write(codes)
+        f.write(struct.pack(f'<{len(name_offsets)}I', *name_offsets))
+        f.write(names)
+        f.write(struct.pack(f'<{len(key_offsets)}I', *key_offsets))
+        f.write(keys)
+        f.write(facets_json)
+        for facet in FACETS:
+            f.write(struct.pack(f'<{len(stocks)}H', *facet_columns[facet]))
+        f.write(gram_table)
+        f.write(b'\0' * padding)
+        f.write(struct.pack(f'<{len(posting_data)}I', *posting_data))
+
+    return len(stocks)
+
+
+class MappedStockIndex(BaseStockIndex):
+    """
+    mmapしたスナップショット上で動く読み取り専用の検索インデックス
+
+    レコードのdictは検索結果として返すときにだけ生成する
+    """
+
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        if sys.byteorder != 'little':
+            raise ValueError("スナップショットはリトルエンディアン環境でのみ使用できます")
+
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        (magic, version, self._count, self._gram_count, self._codes_offset,
+         name_offsets_offset, self._names_offset, key_offsets_offset, self._keys_offset,
+         facets_json_offset, facets_json_length, self._facet_columns_offset,
+         self._grams_offset, postings_offset) = _HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"未対応のスナップショット形式です: {path}")
+
+        self._name_offsets = self._view[name_offsets_offset:name_offsets_offset + 4 * (self._count + 1)].cast('I')
+        self._key_offsets = self._view[key_offsets_offset:key_offsets_offset + 4 * (self._count + 1)].cast('I')
+        self._postings = self._view[postings_offset:].cast('I')
+        self._facet_values = json.loads(self._mm[facets_json_offset:facets_json_offset + facets_json_length])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _code(self, position: int) -> bytes:
+        start = self._codes_offset + position * CODE_WIDTH
+        return self._mm[start:start + CODE_WIDTH]
+
+    def name(self, position: int) -> str:
+        start = self._names_offset + self._name_offsets[position]
+        end = self._names_offset + self._name_offsets[position + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def key(self, position: int) -> str:
+        start = self._keys_offset + self._key_offsets[position]
+        end = self._keys_offset + self._key_offsets[position + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def facet_value(self, position: int, facet: str) -> Optional[str]:
+        column = self._facet_columns_offset + 2 * (FACETS.index(facet) * self._count + position)
+        value_id = self._mm[column] | (self._mm[column + 1] << 8)
+        if value_id == _NO_FACET_VALUE:
+            return None
+        return self._facet_values[facet][value_id]
+
+    def record(self, position: int) -> Dict:
+        stock = {'code': self._code(position).decode('ascii'), 'name': self.name(position)}
+        for facet in FACETS:
+            stock[facet] = self.facet_value(position, facet)
+        return stock
+
+    def position_of(self, code: str) -> Optional[int]:
+        key = code.encode('ascii', 'ignore')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._code(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._code(lo) == key:
+            return lo
+        return None
+
+    def posting(self, gram: str) -> Sequence[int]:
+        key = _gram_key(gram)
+        if len(key) != GRAM_KEY_WIDTH:
+            return ()
+        lo, hi = 0, self._gram_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._grams_offset + mid * _GRAM_ENTRY.size
+            if self._mm[entry:entry + GRAM_KEY_WIDTH] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._gram_count:
+            return ()
+        entry_key, start, length = _GRAM_ENTRY.unpack_from(self._mm, self._grams_offset + lo * _GRAM_ENTRY.size)
+        if entry_key != key:
+            return ()
+        return self._postings[start:start + length]
+
+
+def open_snapshot(path: str = SNAPSHOT_PATH) -> Optional[MappedStockIndex]:
+    """
+    スナップショットを開く
+
+    Returns:
+        MappedStockIndex: 開けなかった場合は None
+    """
+    try:
+        index = MappedStockIndex(path)
+        print(f"✅ Mapped {len(index)} stocks from snapshot")
+        return index
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"❌ スナップショット読み込みエラー: {e}")
+        return None
+
+
+def snapshot_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    スナップショットの差し替えを見分ける値
+
+    Returns:
+        Optional[Tuple[int, int, int]]: (inode, サイズ, 更新時刻ns)（ファイルがない場合は None）
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def replace_snapshot(stocks: Iterable[Dict], path: str = SYNCED_SNAPSHOT_PATH) -> MappedStockIndex:
+    """
+    スナップショットを書き直して path をmmapする
+
+    一時ファイルに書き出してから path に rename するので、古いファイルをmmapしたままのワーカーや
+    書き直しの途中で開いたワーカーが壊れたファイルを読むことはない。書き直すのは1プロセスだけにし
+    （StockMasterRefresher のロックを持つワーカー）、ほかのワーカーは snapshot_signature(path) の
+    変化を見て同じファイルをmmapし直すので、すべてのワーカーがOSのページキャッシュを共有する
+
+    Args:
+        stocks (Iterable[Dict]): 株式マスター（code, name, market, sector）
+        path (str): 書き直すスナップショットのパス
+
+    Returns:
+        MappedStockIndex: 書き直した path のインデックス
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write_snapshot(stocks, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return MappedStockIndex(path)
@@ -0,0 +1,171 @@
+"""
+企業名・証券コードの前方一致サジェスト
+
+正規化済みの検索キーと証券コードをそれぞれソート済み配列に並べ、前方一致する範囲を
+二分探索で求める。範囲内の上位k件は人気度の順位に対するスパーステーブル（区間最大値）
+から取り出すため、1回のサジェストは O(プレフィックス長 × log n + k log k) で済む
+"""
+import heapq
+import json
+import os
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from stock_index import BaseStockIndex, normalize_search_key
+
+POPULARITY_PATH = os.path.join(os.path.dirname(__file__), 'stock_popularity.json')
+
+# 前方一致の範囲の上端を求めるための番兵（どの文字よりも大きい）
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def load_popularity(path: str = POPULARITY_PATH) -> Dict[str, float]:
+    """
+    証券コードごとの人気度の重みを読み込む
+
+    Returns:
+        Dict[str, float]: 証券コード→重み（ファイルがない場合は空）
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {code: float(weight) for code, weight in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"❌ 人気度ファイル読み込みエラー: {e}")
+        return {}
+
+
+class _PrefixTable:
+    """ソート済みの文字列配列と、順位の区間最大値を引くスパーステーブル"""
+
+    def __init__(self, entries: List[Tuple[str, int]], rank_of: List[int]):
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.positions = [position for _, position in entries]
+        self._ranks = [rank_of[position] for position in self.positions]
+
+        ranks = self._ranks
+        self._table = [list(range(len(entries)))]
+        width = 1
+        while width * 2 <= len(entries):
+            prev = self._table[-1]
+            self._table.append([
+                a if ranks[a] >= ranks[b] else b
+                for a, b in zip(prev, prev[width:])
+            ])
+            width *= 2
+
+    def _argmax(self, lo: int, hi: int) -> int:
+        level = (hi - lo).bit_length() - 1
+        a = self._table[level][lo]
+        b = self._table[level][hi - (1 << level)]
+        return a if self._ranks[a] >= self._ranks[b] else b
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """前方一致するキーの範囲 [lo, hi) を返す"""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _MAX_CHAR, lo)
+        return lo, hi
+
+    def top_k(self, lo: int, hi: int, k: int, mask: Optional[int] = None) -> List[int]:
+        """範囲 [lo, hi) から順位の高い順にk件の位置を返す（mask があればそのビットが立つ位置だけ）"""
+        results = []
+        heap = []
+        if lo < hi:
+            best = self._argmax(lo, hi)
+            heap.append((-self._ranks[best], best, lo, hi))
+        while heap and len(results) < k:
+            _, best, lo, hi = heapq.heappop(heap)
+            position = self.positions[best]
+            if mask is None or (mask >> position) & 1:
+                results.append(position)
+            for sub_lo, sub_hi in ((lo, best), (best + 1, hi)):
+                if sub_lo < sub_hi:
+                    sub_best = self._argmax(sub_lo, sub_hi)
+                    heapq.heappush(heap, (-self._ranks[sub_best], sub_best, sub_lo, sub_hi))
+        return results
+
+
+class StockSuggester:
+    """
+    株式マスターインデックスに対する前方一致サジェスト
+
+    順位は 人気度の重み → 検索キーの短さ（完全一致に近いもの） → マスターの並び順 で決める
+
+    Args:
+        index (BaseStockIndex): 株式マスターの検索インデックス
+        popularity (Dict[str, float]): 証券コード→人気度の重み
+    """
+
+    def __init__(self, index: BaseStockIndex, popularity: Optional[Dict[str, float]] = None):
+        self.index = index
+        popularity = popularity or {}
+
+        keys = [index.key(position) for position in range(len(index))]
+        codes = [index.record(position)['code'] for position in range(len(index))]
+
+        order = sorted(
+            range(len(index)),
+            key=lambda position: (popularity.get(codes[position], 0.0), -len(keys[position]), -position)
+        )
+        rank_of = [0] * len(index)
+        for rank, position in enumerate(order):
+            rank_of[position] = rank
+
+        self._names = _PrefixTable([(key, position) for position, key in enumerate(keys)], rank_of)
+        self._codes = _PrefixTable([(code, position) for position, code in enumerate(codes)], rank_of)
+
+    def suggest(self, query: str, limit: int = 10, mask: Optional[int] = None) -> List[Dict]:
+        """
+        クエリに前方一致する銘柄を順位順に返す
+
+        証券コードの前方一致 → 企業名の完全一致 → 企業名の前方一致 の順に並べ、
+        件数が足りない場合は企業名の部分一致で補う
+
+        Args:
+            query (str): 入力中の文字列
+            limit (int): 最大件数
+            mask (int): ファセットで絞り込む場合のビットマップ（facet_mask() の戻り値）
+
+        Returns:
+            List[Dict]: サジェスト結果のリスト
+        """
+        key = normalize_search_key(query)
+        if limit <= 0:
+            return []
+        if not key:
+            return self.index.search_name(key, limit, mask) if mask is not None else []
+
+        positions = []
+        if key.isdigit():
+            lo, hi = self._codes.prefix_range(key)
+            positions.extend(self._codes.top_k(lo, hi, limit, mask))
+
+        if len(positions) < limit:
+            lo, hi = self._names.prefix_range(key)
+            if lo < hi and self._names.keys[lo] == key:
+                # 完全一致はソート済み範囲の先頭にある
+                position = self._names.positions[lo]
+                if mask is None or (mask >> position) & 1:
+                    positions.append(position)
+                lo += 1
+            positions.extend(self._names.top_k(lo, hi, limit, mask))
+
+        seen = set()
+        results = []
+        for position in positions:
+            if position not in seen:
+                seen.add(position)
+                results.append(self.index.record(position))
+                if len(results) >= limit:
+                    return results
+
+        for stock in self.index.search_name(key, limit + len(seen), mask):
+            position = self.index.position_of(stock['code'])
+            if position not in seen:
+                seen.add(position)
+                results.append(stock)
+                if len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,125 @@
+"""
+Supabaseの earnings_materials テーブルを使った決算資料の共有キャッシュ
+
+サーバーレス環境ではローカルディスクのストアがインスタンス間で共有されないため、
+スクレイピング結果をSupabaseにも書き戻し、ほかのインスタンスはスクレイピングの前にここを引く
+
+鮮度は行の fetched_at で判断する。1回の取得結果はすべて同じ fetched_at で書き込み、
+その取得に含まれなかった古い行は書き込み後に削除する
+
+テーブルの書き込み・削除は service_role だけに許可している（anon キーは公開されているため）。
+書き込みには SUPABASE_SERVICE_KEY で作ったクライアントを渡し、ない場合は読み込みだけ行う
+"""
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from materials_store import MATERIAL_COLUMNS, MATERIALS_STORE_TTL
+
+TABLE_NAME = 'earnings_materials'
+
+# テーブルの決算資料をスクレイピングせずに使う秒数（デフォルト: ローカルストアと同じ）
+SUPABASE_MATERIALS_TTL = float(os.getenv('SUPABASE_MATERIALS_TTL', MATERIALS_STORE_TTL))
+
+# 0 にするとSupabaseのテーブルを使わない
+SUPABASE_MATERIALS_ENABLED = os.getenv('SUPABASE_MATERIALS_ENABLED', '1') != '0'
+
+
+def _parse_timestamp(value: str) -> float:
+    """PostgRESTの timestamptz（ISO 8601）をUNIX時刻に変換"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+class SupabaseMaterialsStore:
+    """
+    earnings_materials テーブルへの読み書き
+
+    Args:
+        client: 読み込みに使うSupabaseクライアント
+        write_client: 書き込み・削除に使うService RoleキーのSupabaseクライアント（None の場合は読み込み専用）
+        ttl (float): 取得からこの秒数を過ぎた結果は使わない
+    """
+
+    def __init__(self, client, write_client=None, ttl: float = SUPABASE_MATERIALS_TTL):
+        self.client = client
+        self.write_client = write_client
+        self.ttl = ttl
+        self.available = True
+
+    def _handle_error(self, action: str, stock_code: str, error: Exception):
+        # テーブルがない場合は以降の問い合わせをやめる
+        if 'PGRST205' in str(error) or 'does not exist' in str(error):
+            print(f"⚠️  {TABLE_NAME}テーブルが見つかりません。Supabaseの共有キャッシュを無効にします。")
+            self.available = False
+        else:
+            print(f"❌ Supabase決算資料{action}エラー ({stock_code}): {error}")
+
+    def load_materials(self, stock_code: str) -> Optional[Tuple[List[Dict], float]]:
+        """
+        鮮度内の決算資料を取得
+
+        Args:
+            stock_code (str): 証券コード
+
+        Returns:
+            Optional[Tuple[List[Dict], float]]: (新しい順の決算資料リスト, 取得時刻のUNIX時刻)。
+            行がない・TTL を過ぎている・エラーの場合は None
+        """
+        if not self.available:
+            return None
+        try:
+            response = (
+                self.client.table(TABLE_NAME)
+                .select(', '.join(MATERIAL_COLUMNS) + ', fetched_at')
+                .eq('stock_code', stock_code)
+                .order('announcement_date', desc=True)
+                .execute()
+            )
+        except Exception as e:
+            self._handle_error('読み込み', stock_code, e)
+            return None
+
+        if not response.data:
+            return None
+
+        fetched_at = min(_parse_timestamp(row['fetched_at']) for row in response.data)
+        if datetime.now(timezone.utc).timestamp() - fetched_at > self.ttl:
+            return None
+
+        materials = [{column: row.get(column) for column in MATERIAL_COLUMNS} for row in response.data]
+        return materials, fetched_at
+
+    def save_materials(self, stock_code: str, materials: List[Dict]):
+        """取得結果をupsertし、今回の取得に含まれなかった行を削除する（0件の場合は何もしない）"""
+        rows = [material for material in materials if material.get('pdf_url')]
+        if not self.available or self.write_client is None or not rows:
+            return
+
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        try:
+            self.write_client.table(TABLE_NAME).upsert(
+                [
+                    dict({column: material.get(column) for column in MATERIAL_COLUMNS},
+                         stock_code=stock_code, fetched_at=fetched_at)
+                    for material in rows
+                ],
+                on_conflict='stock_code,pdf_url',
+            ).execute()
+            (
+                self.write_client.table(TABLE_NAME)
+                .delete()
+                .eq('stock_code', stock_code)
+                .lt('fetched_at', fetched_at)
+                .execute()
+            )
+        except Exception as e:
+            self._handle_error('書き込み', stock_code, e)
+
+    def invalidate_materials(self, stock_code: str):
+        """証券コードの行を削除し、どのインスタンスも次回はスクレイピングし直すようにする"""
+        if not self.available or self.write_client is None:
+            return
+        try:
+            self.write_client.table(TABLE_NAME).delete().eq('stock_code', stock_code).execute()
+        except Exception as e:
+            self._handle_error('削除', stock_code, e)
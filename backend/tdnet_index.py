@@ -0,0 +1,392 @@
+"""
+TDnetの適時開示の共有インデックス
+
+TDnetの日次一覧（I_list_NNN_YYYYMMDD.html）には、その日のすべての企業の開示が載っている。
+各日の一覧は1回だけ取得して全行をパースし、証券コード→開示の転置インデックス
+（SQLiteの (stock_code, disclosure_date) インデックス）に保存する。
+企業ごとのTDnet検索はインデックスを読むだけになり、一覧の取得は企業数に比例しなくなる
+
+過去の日の一覧は、その日が終わった後（日本時間）に取り込んでいれば変わらないので取り直さない。
+その日のうちに取り込んだ日は、日付が変わった後に1回だけ取り直す。当日分は TDNET_TODAY_TTL ごとに
+取り直す。TDnetの公開サイトに載っているのは直近 TDNET_SYNC_DAYS 日分だけなので、
+それより古い日は取得せず、これまでに取り込んだ分を検索対象にする（日が経つごとに期間が伸びる）
+
+取り込み済みの日を取り直して新しい行が見つかった場合は、add_listener() で登録した関数に
+新しい行だけを渡す（決算資料のキャッシュの破棄に使う）。当日（日本時間）の一覧を初めて取り込んだ
+場合は、それまでに作られたキャッシュに載っていない可能性があるので、全行を新しい行として渡す
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urljoin
+
+import html_links
+import http_client
+from material_sources import JST
+from materials_store import MATERIALS_DB_PATH, SQLiteStore
+
+TDNET_BASE_URL = "https://www.release.tdnet.info"
+
+# TDnetの公開サイトで日次一覧を取得できる日数
+TDNET_SYNC_DAYS = int(os.getenv('TDNET_SYNC_DAYS', 31))
+
+# 当日の一覧を取り直す間隔（秒）
+TDNET_TODAY_TTL = float(os.getenv('TDNET_TODAY_TTL', 10 * 60))
+
+# 日次一覧をまとめて取り込むときの並列数（ホストごとの上限は http_client 側で制限）
+TDNET_SYNC_WORKERS = int(os.getenv('TDNET_SYNC_WORKERS', 4))
+
+# インデックスが使えない環境で、リクエストごとに直接読む直近の日数（各日の1ページ目だけ）
+TDNET_FALLBACK_DAYS = int(os.getenv('TDNET_FALLBACK_DAYS', 7))
+
+# 開示の列（tdnet_disclosures テーブルの列とパース結果の辞書のキーが対応する）
+DISCLOSURE_COLUMNS = ('disclosure_date', 'disclosure_time', 'stock_code', 'company_name', 'title', 'pdf_url')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tdnet_days (
+    disclosure_date TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    row_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tdnet_disclosures (
+    pdf_url TEXT PRIMARY KEY,
+    disclosure_date TEXT NOT NULL,
+    disclosure_time TEXT,
+    stock_code TEXT NOT NULL,
+    company_name TEXT,
+    title TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tdnet_disclosures_stock_code_date
+    ON tdnet_disclosures (stock_code, disclosure_date DESC);
+"""
+
+
+def today_jst() -> datetime:
+    """日本時間の今日の0時（タイムゾーンなしの datetime。一覧の日付と比べる）"""
+    return datetime.now(JST).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def end_of_day(date: datetime) -> float:
+    """一覧の日付が終わる時刻（翌日0時・日本時間）のUNIX時刻"""
+    return (datetime(date.year, date.month, date.day, tzinfo=JST) + timedelta(days=1)).timestamp()
+
+
+def tdnet_list_url(date: datetime, page: int = 1) -> str:
+    """TDnetの日次一覧ページのURL"""
+    return f"{TDNET_BASE_URL}/inbs/I_list_{page:03d}_{date.strftime('%Y%m%d')}.html"
+
+
+def parse_tdnet_day(content: bytes, date: datetime, page_url: Optional[str] = None) -> List[Dict]:
+    """
+    TDnetの日次一覧ページの全行をパース
+
+    列は kjTime / kjCode / kjName / kjTitle のクラスで判別し、クラスがない場合は
+    先頭列を証券コード、3列目を表題とみなす
+
+    Args:
+        content (bytes): ページのHTML
+        date (datetime): 一覧の日付
+        page_url (str): ページのURL（PDFの相対リンクの解決に使う）
+
+    Returns:
+        List[Dict]: 開示のリスト（証券コードは先頭4桁）
+    """
+    page_url = page_url or tdnet_list_url(date)
+    disclosure_date = date.strftime('%Y-%m-%d')
+
+    disclosures = []
+    for row in html_links.iter_elements(content, 'tr'):
+        cells = html_links.row_cells(row)
+        if len(cells) < 4:
+            continue
+
+        by_class = {}
+        for cell in cells:
+            for class_name in html_links.cell_classes(cell):
+                by_class.setdefault(class_name, cell)
+
+        code_cell = by_class.get('kjCode', cells[0])
+        title_cell = by_class.get('kjTitle', cells[2])
+        time_cell = by_class.get('kjTime')
+        name_cell = by_class.get('kjName')
+
+        stock_code = html_links.element_text(code_cell)[:4]
+        link = title_cell.find('.//a[@href]')
+        if not stock_code or link is None:
+            continue
+
+        disclosures.append({
+            'disclosure_date': disclosure_date,
+            'disclosure_time': html_links.element_text(time_cell) if time_cell is not None else None,
+            'stock_code': stock_code,
+            'company_name': html_links.element_text(name_cell) if name_cell is not None else None,
+            'title': html_links.element_text(title_cell),
+            'pdf_url': urljoin(page_url, link.get('href')),
+        })
+    return disclosures
+
+
+def parse_tdnet_page_count(content: bytes, date: datetime) -> int:
+    """日次一覧のページ数（ページ送りのリンク I_list_NNN_YYYYMMDD.html の最大番号）"""
+    pattern = re.compile(rf"I_list_(\d{{3}})_{date.strftime('%Y%m%d')}\.html")
+    pages = [int(page) for page in pattern.findall(content.decode('utf-8', errors='ignore'))]
+    return max(pages + [1])
+
+
+class TdnetIndex(SQLiteStore):
+    """TDnetの開示の証券コード別インデックス（SQLite）"""
+
+    schema = SCHEMA
+    label = 'TDnetインデックス'
+
+    def __init__(self, path: str = MATERIALS_DB_PATH):
+        super().__init__(path)
+        # 同じ日の一覧を複数のスレッドが同時に取り込まないようにするためのロック
+        self._day_locks: Dict[str, threading.Lock] = {}
+        self._day_locks_lock = threading.Lock()
+
+    def day_lock(self, date: datetime) -> threading.Lock:
+        key = date.strftime('%Y-%m-%d')
+        with self._day_locks_lock:
+            return self._day_locks.setdefault(key, threading.Lock())
+
+    def needs_sync(self, date: datetime, today: Optional[datetime] = None) -> bool:
+        """日次一覧を（取り直す必要も含めて）取得する必要があるか"""
+        today = (today or today_jst()).date()
+        if date.date() > today or date.date() <= today - timedelta(days=TDNET_SYNC_DAYS):
+            return False
+
+        row = self._connect().execute(
+            'SELECT fetched_at FROM tdnet_days WHERE disclosure_date = ?', (date.strftime('%Y-%m-%d'),)
+        ).fetchone()
+        if row is None:
+            return True
+        # 当日分は一定間隔で取り直す
+        if date.date() == today:
+            return time.time() - row['fetched_at'] > TDNET_TODAY_TTL
+        # 過去の日は、その日が終わる前に取り込んだ場合だけ（後から載った開示を拾うため）1回取り直す
+        return row['fetched_at'] < end_of_day(date)
+
+    def ingested_dates(self, dates: List[datetime]) -> Set[str]:
+        """日付のうち、日次一覧を取り込み済みのもの（YYYY-MM-DD）"""
+        keys = [date.strftime('%Y-%m-%d') for date in dates]
+        if not keys:
+            return set()
+        rows = self._connect().execute(
+            f"SELECT disclosure_date FROM tdnet_days WHERE disclosure_date IN ({', '.join('?' for _ in keys)})", keys
+        ).fetchall()
+        return {row['disclosure_date'] for row in rows}
+
+    def known_pdf_urls(self, date: datetime) -> Set[str]:
+        """取り込み済みの開示のPDFのURL（新しい行の検出に使う）"""
+        rows = self._connect().execute(
+            'SELECT pdf_url FROM tdnet_disclosures WHERE disclosure_date = ?', (date.strftime('%Y-%m-%d'),)
+        ).fetchall()
+        return {row['pdf_url'] for row in rows}
+
+    def ingest_day(self, date: datetime, disclosures: List[Dict]) -> List[Dict]:
+        """
+        日次一覧の行のうち未登録のものだけを追加し、取り込み済みとして記録
+
+        Returns:
+            List[Dict]: 前回の取り込み以降に増えた行（過去の日を初めて取り込んだ場合は空。
+                当日（日本時間）を初めて取り込んだ場合は全行）
+        """
+        conn = self._connect()
+        with self._transaction():
+            ingested = conn.execute(
+                'SELECT 1 FROM tdnet_days WHERE disclosure_date = ?', (date.strftime('%Y-%m-%d'),)
+            ).fetchone() is not None
+            known = self.known_pdf_urls(date)
+            new_disclosures = [disclosure for disclosure in disclosures if disclosure['pdf_url'] not in known]
+
+            conn.executemany(
+                f"INSERT OR REPLACE INTO tdnet_disclosures ({', '.join(DISCLOSURE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in DISCLOSURE_COLUMNS)})",
+                [tuple(disclosure.get(column) for column in DISCLOSURE_COLUMNS) for disclosure in new_disclosures]
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO tdnet_days (disclosure_date, fetched_at, row_count) VALUES (?, ?, '
+                '(SELECT COUNT(*) FROM tdnet_disclosures WHERE disclosure_date = ?))',
+                (date.strftime('%Y-%m-%d'), time.time(), date.strftime('%Y-%m-%d'))
+            )
+        if not ingested and date.date() != today_jst().date():
+            return []
+        return new_disclosures
+
+    def lookup(self, stock_code: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """証券コードの開示を期間内で新しい順に取得"""
+        rows = self._connect().execute(
+            f"SELECT {', '.join(DISCLOSURE_COLUMNS)} FROM tdnet_disclosures "
+            "WHERE stock_code = ? AND disclosure_date BETWEEN ? AND ? "
+            "ORDER BY disclosure_date DESC, disclosure_time DESC",
+            (stock_code, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+# 新しい開示を受け取る関数（引数は新しい行のリスト）
+_listeners: List[Callable[[List[Dict]], None]] = []
+
+
+def add_listener(listener: Callable[[List[Dict]], None]):
+    """取り込み済みの日に新しい開示が見つかったときに呼ぶ関数を登録"""
+    _listeners.append(listener)
+
+
+def _notify(new_disclosures: List[Dict]):
+    for listener in _listeners:
+        try:
+            listener(new_disclosures)
+        except Exception as e:
+            print(f"❌ TDnet新着開示の通知エラー: {e}")
+
+
+def get_tdnet_index() -> Optional[TdnetIndex]:
+    """共有インデックスを取得（開けない環境では None）"""
+    return TdnetIndex.get_shared()
+
+
+def fetch_day(date: datetime, max_pages: Optional[int] = None) -> Optional[List[Dict]]:
+    """
+    日次一覧を全ページ（max_pages を指定した場合は先頭の max_pages ページまで）取得してパース
+
+    Returns:
+        Optional[List[Dict]]: その日の全開示（一覧がない日は空リスト、取得に失敗した場合は None）
+    """
+    response = http_client.get(tdnet_list_url(date))
+    if response.status_code == 404:
+        return []
+    if response.status_code != 200:
+        return None
+
+    disclosures = parse_tdnet_day(response.content, date)
+    page_count = parse_tdnet_page_count(response.content, date)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    for page in range(2, page_count + 1):
+        page_url = tdnet_list_url(date, page)
+        page_response = http_client.get(page_url)
+        if page_response.status_code != 200:
+            return None
+        disclosures.extend(parse_tdnet_day(page_response.content, date, page_url))
+    return disclosures
+
+
+def recent_dates(start_date: datetime, end_date: datetime, max_days: int) -> List[datetime]:
+    """
+    期間の終わりから新しい順に最大 max_days 日分の日付（日本時間の今日より先の日は含めない）
+    """
+    end = min(end_date.replace(hour=0, minute=0, second=0, microsecond=0), today_jst())
+    days = (end.date() - start_date.date()).days
+    return [end - timedelta(days=i) for i in range(min(days + 1, max_days))]
+
+
+def sync_day(index: TdnetIndex, date: datetime, force: bool = False) -> bool:
+    """
+    日次一覧を取得してインデックスに取り込む（同じ日を同時に取り込むのは1スレッドだけ）
+
+    Args:
+        index (TdnetIndex): 取り込み先のインデックス
+        date (datetime): 一覧の日付
+        force (bool): 取り込み済み・TTL 内でも取り直す
+
+    Returns:
+        bool: 取り込めた（または取り込み済みだった）場合は True
+    """
+    with index.day_lock(date):
+        try:
+            if not force and not index.needs_sync(date):
+                return True
+            disclosures = fetch_day(date)
+            if disclosures is None:
+                return False
+            new_disclosures = index.ingest_day(date, disclosures)
+        except Exception as e:
+            print(f"Error fetching TDnet data for {date.strftime('%Y%m%d')}: {e}")
+            return False
+
+    if new_disclosures:
+        _notify(new_disclosures)
+    return True
+
+
+def sync_range(index: TdnetIndex, start_date: datetime, end_date: datetime):
+    """期間内で取得が必要な日の一覧をまとめて取り込む（公開サイトにある直近の日だけ）"""
+    dates = recent_dates(start_date, end_date, TDNET_SYNC_DAYS)
+    try:
+        dates = [date for date in dates if index.needs_sync(date)]
+    except sqlite3.Error as e:
+        print(f"❌ TDnetインデックス読み込みエラー: {e}")
+        return
+    http_client.map_bounded(lambda date: sync_day(index, date), dates, max_workers=TDNET_SYNC_WORKERS)
+
+
+def lookup_disclosures(index: Optional[TdnetIndex], stock_code: str,
+                       start_date: datetime, end_date: datetime) -> List[Dict]:
+    """
+    証券コードの開示を期間内で新しい順に取得（リクエストから呼ぶ。日次一覧の取り込みはしない）
+
+    取り込みはポーラー（tdnet_poller）がバックグラウンドで行う。インデックスがまだ取り込んでいない
+    直近 TDNET_FALLBACK_DAYS 日の分だけ fetch_recent と同じく1ページ目を直接読み、インデックスが
+    開けない環境では fetch_recent だけを使う
+
+    Args:
+        index (TdnetIndex): 共有インデックス（開けない環境では None）
+        stock_code (str): 証券コード
+        start_date (datetime): 開始日
+        end_date (datetime): 終了日
+
+    Returns:
+        List[Dict]: 開示のリスト（新しい順）
+    """
+    if index is None:
+        return fetch_recent(stock_code, start_date, end_date)
+
+    dates = recent_dates(start_date, end_date, TDNET_FALLBACK_DAYS)
+    ingested = index.ingested_dates(dates)
+    disclosures = index.lookup(stock_code, start_date, end_date)
+    missing = [date for date in dates if date.strftime('%Y-%m-%d') not in ingested]
+    if not missing:
+        return disclosures
+
+    known = {disclosure['pdf_url'] for disclosure in disclosures}
+    disclosures.extend(
+        disclosure for disclosure in fetch_recent_days(stock_code, missing) if disclosure['pdf_url'] not in known
+    )
+    disclosures.sort(key=lambda disclosure: (disclosure['disclosure_date'], disclosure.get('disclosure_time') or ''),
+                     reverse=True)
+    return disclosures
+
+
+def fetch_recent(stock_code: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+    """
+    インデックスを使わずに直近の日次一覧を直接読んで証券コードの開示を探す
+
+    インデックスが開けない環境（読み取り専用のファイルシステムなど）ではリクエストごとに呼ばれるので、
+    直近 TDNET_FALLBACK_DAYS 日分の1ページ目だけを並列に取得する
+    """
+    return fetch_recent_days(stock_code, recent_dates(start_date, end_date, TDNET_FALLBACK_DAYS))
+
+
+def fetch_recent_days(stock_code: str, dates: List[datetime]) -> List[Dict]:
+    """指定した日の日次一覧の1ページ目だけを並列に取得して証券コードの開示を探す"""
+
+    def fetch_first_page(date: datetime) -> List[Dict]:
+        try:
+            return fetch_day(date, max_pages=1) or []
+        except Exception as e:
+            print(f"Error fetching TDnet data for {date.strftime('%Y%m%d')}: {e}")
+            return []
+
+    return [
+        disclosure
+        for day in http_client.map_bounded(fetch_first_page, dates, max_workers=TDNET_SYNC_WORKERS)
+        for disclosure in day
+        if disclosure['stock_code'] == stock_code
+    ]
@@ -0,0 +1,143 @@
+"""
+TDnetの日次一覧のバックグラウンドポーリング
+
+一定間隔で当日の日次一覧を取り直し、インデックスにない行だけを追加する。
+新しい開示があった銘柄は tdnet_index の通知で決算資料のキャッシュが破棄されるので、
+次のリクエストでは新しい資料を含めて取り直される
+
+あわせて、公開サイトにある直近 TDNET_SYNC_DAYS 日のうち取り込みが必要な日（未取り込みの日と、
+その日のうちに取り込んだ過去の日）を取り込む。日付が変わった直後は前日の一覧が1回だけ取り直されるので、
+前日の夜に出た開示を取りこぼさない。リクエストはインデックスを読むだけで、取り込みはここでだけ行う
+
+Webサーバーは複数のワーカープロセスで動くことがあるが、ロックファイル（TDNET_POLLER_LOCK_PATH）を
+取れた1プロセスだけがポーリングする。TDNET_POLLER=0 にするとWebサーバーのプロセスではポーリングしない
+（その場合は単体で動かす）
+
+単体で動かす場合（cron やワーカープロセス）:
+    python tdnet_poller.py
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import materials_store
+import tdnet_index
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 当日の一覧を取り直す間隔（秒）
+TDNET_POLL_INTERVAL = int(os.getenv('TDNET_POLL_INTERVAL', 5 * 60))
+
+# 0 にするとWebサーバーのプロセスではポーリングしない（単体のポーラーを別に動かす場合）
+TDNET_POLLER_ENABLED = os.getenv('TDNET_POLLER', '1') != '0'
+
+# ポーリングするプロセスを1つに限るためのロックファイル
+TDNET_POLLER_LOCK_PATH = os.getenv('TDNET_POLLER_LOCK_PATH', materials_store.MATERIALS_DB_PATH + '.poller.lock')
+
+
+class TdnetPoller:
+    """
+    当日の日次一覧をバックグラウンドで取り直す
+
+    Args:
+        interval (int): ポーリングの間隔（秒）
+    """
+
+    def __init__(self, interval: int = TDNET_POLL_INTERVAL, lock_path: str = TDNET_POLLER_LOCK_PATH):
+        self.interval = interval
+        self.lock_path = lock_path
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def acquire_lock(self) -> bool:
+        """
+        ロックファイルの排他ロックを取得（ロックはプロセスの終了まで保持する）
+
+        Returns:
+            bool: 取得できた場合は True（ほかのプロセスがポーリング中の場合は False）
+        """
+        if self._lock_file is not None or fcntl is None:
+            return True
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+            lock_file = open(self.lock_path, 'a')
+        except OSError as e:
+            print(f"❌ TDnetポーリングのロックファイルを開けません: {e}")
+            return False
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def start(self) -> bool:
+        """
+        ポーリングスレッドを起動（起動済みの場合は何もしない）
+
+        Returns:
+            bool: このプロセスでポーリングしている場合は True（ほかのプロセスがロックを持っている場合は False）
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return True
+            if not self.acquire_lock():
+                print("⚠️  TDnetポーリングはほかのプロセスで実行中のため、このプロセスでは開始しません。")
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='tdnet-poller', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """ポーリングスレッドを停止"""
+        self._stop.set()
+
+    def run_forever(self):
+        """stop() が呼ばれるまで、呼び出したスレッドで interval 秒ごとにポーリングする"""
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"❌ TDnetポーリングエラー: {e}")
+            self._stop.wait(self.interval)
+
+    def poll_once(self, now: Optional[datetime] = None) -> bool:
+        """
+        当日の一覧を取り直し、直近の日のうち取り込みが必要な日（日付が変わった直後の前日を含む）を取り込む
+
+        Returns:
+            bool: 当日の一覧を取り込めた場合は True（インデックスが使えない・取得に失敗した場合は False）
+        """
+        index = tdnet_index.get_tdnet_index()
+        if index is None:
+            return False
+
+        today = (now or tdnet_index.today_jst()).replace(hour=0, minute=0, second=0, microsecond=0)
+        synced = tdnet_index.sync_day(index, today, force=True)
+        tdnet_index.sync_range(index, today - timedelta(days=tdnet_index.TDNET_SYNC_DAYS), today)
+        return synced
+
+
+def invalidate_stored_materials(disclosures):
+    """新しい開示があった銘柄の保存済みの決算資料を破棄（tdnet_index.add_listener に渡す）"""
+    for stock_code in {disclosure['stock_code'] for disclosure in disclosures}:
+        materials_store.invalidate_materials(stock_code)
+
+
+if __name__ == '__main__':
+    # 別プロセスで動かす場合はSQLiteストアの決算資料だけを破棄する（Webサーバーのメモリキャッシュは TTL で入れ替わる）
+    tdnet_index.add_listener(invalidate_stored_materials)
+    poller = TdnetPoller()
+    if not poller.acquire_lock():
+        print(f"❌ TDnetポーリングはほかのプロセスで実行中です（{poller.lock_path}）")
+        raise SystemExit(1)
+    print(f"✅ TDnetポーリングを開始します（{poller.interval}秒ごと）")
+    poller.run_forever()
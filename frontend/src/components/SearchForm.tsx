@@ -28,7 +28,7 @@ export const SearchForm = ({ onSearch, loading }: SearchFormProps) => {
 
     const timer = setTimeout(async () => {
       try {
-        const response = await fetch(`${API_BASE_URL}/search?query=${encodeURIComponent(query)}`)
+        const response = await fetch(`${API_BASE_URL}/suggest?query=${encodeURIComponent(query)}`)
         const data = await response.json()
         setSearchResults(data.results || [])
         setShowSuggestions(true)
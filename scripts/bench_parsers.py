@@ -0,0 +1,189 @@
+"""
+スクレイピングのパース・抽出処理をオフラインで計測するスクリプト
+
+使用方法:
+    python scripts/bench_parsers.py [ベンチマーク名 ...]
+
+scripts/fixtures/ の匿名化したHTML（企業のIRライブラリ、IR BANKの一覧・詳細ページ、
+TDnetの日次一覧）を使い、ネットワークには接続しない。ページはサーバーから読むときと同じ
+大きさ（STREAM_CHUNK_SIZE）に分けてインクリメンタルパーサーに渡す
+
+ベンチマークごとに1回あたりの時間（中央値）、スループット（件/秒・MB/秒）、
+tracemalloc で測ったメモリ確保（1回の実行中のピークと、戻り値を含めて実行後も残った量）を表示する。
+繰り返し回数は BENCH_REPEAT（デフォルト20回）で変更できる
+"""
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# backendのモジュールを読み込めるようにする
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+import earnings_scraper
+import material_metadata
+import page_cache
+import tdnet_index
+from http_client import STREAM_CHUNK_SIZE
+from material_sources import MaterialQuery
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# 1つのベンチマークを繰り返す回数
+REPEAT = int(os.getenv('BENCH_REPEAT', 20))
+
+# フィクスチャの架空の企業
+STOCK_CODE = '9999'
+COMPANY_NAME = 'サンプル'
+IR_URL = 'https://www.example.co.jp/ir/library/'
+IRBANK_DETAIL_URL = 'https://irbank.net/9999/ir/140120250510500001'
+TDNET_DATE = datetime(2025, 5, 10)
+
+# IR BANKの一覧の取得条件（fetch_from_irbank の既定の「過去3年」をフィクスチャの最新の日付から数える）
+IRBANK_QUERY = MaterialQuery(datetime(2022, 5, 10), datetime(2025, 5, 10))
+IRBANK_NEXT_DAY_QUERY = MaterialQuery(datetime(2022, 5, 11), datetime(2025, 5, 11))
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_PATH, name), 'rb') as f:
+        return f.read()
+
+
+def chunks(content: bytes):
+    """レスポンスの本文と同じ大きさに分けたページ"""
+    return [content[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(content), STREAM_CHUNK_SIZE)]
+
+
+def build_benchmarks():
+    """
+    ベンチマークの一覧を作成
+
+    Returns:
+        list: (名前, 処理する件数, 処理するバイト数, 1回分の処理) のリスト
+    """
+    ir_library = load_fixture('company_ir_library.html')
+    irbank_listing = load_fixture('irbank_listing.html')
+    irbank_detail = load_fixture('irbank_detail.html')
+    tdnet_list = load_fixture('tdnet_list.html')
+
+    ir_materials = earnings_scraper.parse_ir_page(ir_library, IR_URL, STOCK_CODE, COMPANY_NAME)
+    # fetch_from_irbank は候補の上限・開始日に達したところで一覧を読むのをやめる（読んだ分の本文だけを保存する）
+    listing_head, listing_read = page_cache.parse_chunks(
+        lambda: earnings_scraper.irbank_listing_parser(earnings_scraper.IRBANK_LISTING_LIMIT, IRBANK_QUERY),
+        chunks(irbank_listing))
+    candidates = earnings_scraper.parse_irbank_listing(irbank_listing)
+    pdf_url = earnings_scraper.parse_irbank_detail(irbank_detail, IRBANK_DETAIL_URL)
+    disclosures = tdnet_index.parse_tdnet_day(tdnet_list, TDNET_DATE)
+
+    # 抽出処理の入力（各フィクスチャのリンクテキスト・表題とPDFのURL）
+    texts = (
+        [material['title'] for material in ir_materials]
+        + [material['pdf_url'] for material in ir_materials]
+        + [text for text, _ in candidates]
+        + [disclosure['title'] for disclosure in disclosures]
+    )
+    texts_size = sum(len(text.encode('utf-8')) for text in texts)
+
+    def uncached(extract):
+        # メモ化の効かない初回の抽出を計測する
+        def run():
+            material_metadata.clear_metadata_cache()
+            return [extract(text) for text in texts]
+        return run
+
+    def cached(extract):
+        return lambda: [extract(text) for text in texts]
+
+    def batch():
+        material_metadata.clear_metadata_cache()
+        return material_metadata.extract_metadata_batch(texts)
+
+    return [
+        # scrape_ir_page が取得したページに行う処理
+        ('scrape_ir_page', len(ir_materials), len(ir_library), lambda: page_cache.parse_chunks(
+            lambda: earnings_scraper.ir_page_parser(IR_URL, STOCK_CODE, COMPANY_NAME), chunks(ir_library))),
+        # fetch_from_irbank の一覧・詳細ページのパースと決算資料の作成
+        ('irbank_listing', len(listing_head), len(listing_read), lambda: page_cache.parse_chunks(
+            lambda: earnings_scraper.irbank_listing_parser(earnings_scraper.IRBANK_LISTING_LIMIT, IRBANK_QUERY),
+            chunks(irbank_listing))),
+        # 日付が変わった後の 304 で、保存済みの本文を翌日の条件でパースし直す処理（page_cache.cached_result）
+        ('irbank_listing_next_day', len(listing_head), len(listing_read), lambda: earnings_scraper.irbank_listing_parser(
+            earnings_scraper.IRBANK_LISTING_LIMIT, IRBANK_NEXT_DAY_QUERY).feed(listing_read)),
+        ('irbank_listing_full', len(candidates), len(irbank_listing),
+         lambda: earnings_scraper.parse_irbank_listing(irbank_listing)),
+        ('irbank_detail', 1, len(irbank_detail), lambda: page_cache.parse_chunks(
+            lambda: earnings_scraper.irbank_detail_parser(IRBANK_DETAIL_URL), chunks(irbank_detail))),
+        ('irbank_materials', len(candidates), 0, lambda: [
+            earnings_scraper.build_irbank_material(text, pdf_url, STOCK_CODE, COMPANY_NAME, IRBANK_QUERY)
+            for text, _ in candidates
+        ]),
+        # TDnetの日次一覧のパースと決算資料への変換
+        ('parse_tdnet_day', len(disclosures), len(tdnet_list),
+         lambda: tdnet_index.parse_tdnet_day(tdnet_list, TDNET_DATE)),
+        ('build_tdnet_materials', len(disclosures), 0,
+         lambda: earnings_scraper.build_tdnet_materials(disclosures, COMPANY_NAME)),
+        # テキストからのメタデータ抽出
+        ('extract_fiscal_year', len(texts), texts_size, uncached(earnings_scraper.extract_fiscal_year)),
+        ('extract_period', len(texts), texts_size, uncached(earnings_scraper.extract_period)),
+        ('extract_date_from_text', len(texts), texts_size, uncached(earnings_scraper.extract_date_from_text)),
+        ('classify_document_type', len(texts), texts_size, uncached(earnings_scraper.classify_document_type)),
+        ('extract_metadata', len(texts), texts_size, uncached(material_metadata.extract_metadata)),
+        ('extract_metadata_cached', len(texts), texts_size, cached(material_metadata.extract_metadata)),
+        ('extract_metadata_batch', len(texts), texts_size, batch),
+    ]
+
+
+def measure(run, repeat: int):
+    """
+    処理の時間とメモリ確保を計測
+
+    Returns:
+        tuple: (1回あたりの秒数の中央値, 確保のピークのバイト数, 実行後に残ったバイト数（戻り値を含む）)
+    """
+    # ウォームアップ（モジュールの遅延初期化などを計測に含めない）
+    run()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(timings), peak, current
+
+
+def bench_parsers(names):
+    """ベンチマークを実行して結果を表示（names を指定した場合はその名前のものだけ）"""
+    benchmarks = build_benchmarks()
+    if names:
+        unknown = set(names) - {name for name, *_ in benchmarks}
+        if unknown:
+            print(f"❌ 不明なベンチマークです: {', '.join(sorted(unknown))}")
+            print(f"   指定できる名前: {', '.join(name for name, *_ in benchmarks)}")
+            return 1
+        benchmarks = [benchmark for benchmark in benchmarks if benchmark[0] in names]
+
+    print(f"{'ベンチマーク':<26}{'件数':>6}{'ms/回':>10}{'件/秒':>12}{'MB/秒':>9}{'ピークKB':>10}{'残存KB':>9}")
+    for name, items, size, run in benchmarks:
+        seconds, peak, retained = measure(run, REPEAT)
+        throughput = f"{size / seconds / 1e6:.1f}" if size else '-'
+        print(
+            f"{name:<26}{items:>6}{seconds * 1000:>10.3f}{items / seconds:>12,.0f}"
+            f"{throughput:>9}{peak / 1024:>10.1f}{retained / 1024:>9.1f}"
+        )
+
+    print(f"✅ {len(benchmarks)}件のベンチマークを{REPEAT}回ずつ実行しました")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(bench_parsers(sys.argv[1:]))
@@ -0,0 +1,86 @@
+"""
+JPXの上場銘柄一覧の規模区分からサジェストの人気度の重みを生成するスクリプト
+
+使用方法:
+    python scripts/build_stock_popularity.py
+
+backend/jpx_stock_list.xls（JPX「東証上場銘柄一覧」）の規模区分（TOPIXニューインデックスシリーズ。
+時価総額と流動性で決まる）を重みに変換し、backend/stock_popularity.json に書き出す。
+規模区分のない銘柄（ETF・REIT・TOPIX対象外など）と、株式マスター（backend/stock_master.json）に
+ない証券コード（上場廃止など）は含めない。上場銘柄一覧や株式マスターを更新したら再生成すること
+
+必要なパッケージ:
+    xlrd（.xls の読み込み。scripts/requirements.txt からインストール）
+"""
+import json
+import os
+import sys
+
+import xlrd
+
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+
+# 東証上場銘柄一覧の列名
+CODE_COLUMN = 'コード'
+SIZE_COLUMN = '規模区分'
+
+# 規模区分 → 人気度の重み（大型株ほど検索されやすいとみなす）
+SIZE_WEIGHTS = {
+    'TOPIX Core30': 1.0,
+    'TOPIX Large70': 0.8,
+    'TOPIX Mid400': 0.5,
+    'TOPIX Small 1': 0.2,
+    'TOPIX Small 2': 0.1,
+}
+
+
+def load_size_weights(xls_path):
+    """上場銘柄一覧から証券コード→規模区分の重みを読み込む（規模区分のない銘柄は含めない）"""
+    sheet = xlrd.open_workbook(xls_path).sheet_by_index(0)
+    header = sheet.row_values(0)
+    code_col = header.index(CODE_COLUMN)
+    size_col = header.index(SIZE_COLUMN)
+
+    weights = {}
+    for row in range(1, sheet.nrows):
+        values = sheet.row_values(row)
+        weight = SIZE_WEIGHTS.get(str(values[size_col]).strip())
+        if weight is None:
+            continue
+        code = values[code_col]
+        # 数字のみの証券コードは数値として読み込まれる
+        code = str(int(code)) if isinstance(code, float) else str(code).strip()
+        weights[code] = weight
+    return weights
+
+
+def build_stock_popularity():
+    """人気度の重みを生成して書き出す"""
+    xls_path = os.path.join(backend_path, 'jpx_stock_list.xls')
+    master_path = os.path.join(backend_path, 'stock_master.json')
+    popularity_path = os.path.join(backend_path, 'stock_popularity.json')
+
+    print(f"Loading JPX stock list from: {xls_path}")
+    weights = load_size_weights(xls_path)
+
+    with open(master_path, 'r', encoding='utf-8') as f:
+        codes = {stock['code'] for stock in json.load(f)}
+
+    popularity = {code: weight for code, weight in weights.items() if code in codes}
+    dropped = len(weights) - len(popularity)
+
+    # 重みの大きい順（同じ重みは証券コード順）に並べて差分を読みやすくする
+    ordered = dict(sorted(popularity.items(), key=lambda item: (-item[1], item[0])))
+    with open(popularity_path, 'w', encoding='utf-8') as f:
+        json.dump(ordered, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+    print(f"✅ Wrote {len(popularity)} weights to {popularity_path}")
+    if dropped:
+        print(f"⚠️  {dropped} codes were not found in the stock master")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(build_stock_popularity())
@@ -0,0 +1,37 @@
+"""
+株式マスターのバイナリスナップショットを生成するスクリプト
+
+使用方法:
+    python scripts/build_stock_snapshot.py
+
+backend/stock_master.json から backend/stock_master.snapshot を生成する。
+stock_master.json を更新したら必ず再生成すること
+"""
+import json
+import os
+import sys
+
+# backendのモジュールを読み込めるようにする
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from stock_snapshot import SNAPSHOT_PATH, write_snapshot
+
+def build_snapshot():
+    """スナップショットを生成"""
+    json_path = os.path.join(backend_path, 'stock_master.json')
+
+    print(f"Loading stock master data from: {json_path}")
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        stock_data = json.load(f)
+
+    count = write_snapshot(stock_data, SNAPSHOT_PATH)
+    size = os.path.getsize(SNAPSHOT_PATH)
+
+    print(f"✅ Wrote {count} stocks to {SNAPSHOT_PATH} ({size:,} bytes)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(build_snapshot())
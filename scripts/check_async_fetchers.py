@@ -0,0 +1,123 @@
+"""
+登録済みの非同期版の取得関数をオフラインで呼び出して確認するスクリプト
+
+使用方法:
+    python scripts/check_async_fetchers.py [ソース名 ...]
+
+material_sources に登録したすべてのソースの async_fetcher を、fetch_all_sources_async と
+同じ引数（証券コード, 企業名, MaterialQuery）で呼び出し、呼び出しの失敗（引数の不一致など）や
+リスト以外の戻り値がないかを確認する
+
+ネットワークには接続しない。HTTPリクエストは scripts/fixtures/ のIR BANKの一覧・詳細ページを返し、
+それ以外のURLは 404 を返すスタンドインに置き換える。ストアは一時ディレクトリのSQLiteファイルを使う
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+# ストア・ページキャッシュは一時ファイルに書き込む（backendのモジュールを読み込む前に設定する）
+os.environ['MATERIALS_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'earnings_materials.db')
+os.environ['SUPABASE_MATERIALS_ENABLED'] = '0'
+
+# backendのモジュールを読み込めるようにする
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+import async_http_client
+import async_scraper  # noqa: F401  読み込むと earnings_scraper のソースに非同期版が登録される
+import earnings_scraper
+import http_client
+from material_sources import MaterialQuery, get_sources
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# フィクスチャの架空の企業
+STOCK_CODE = '9999'
+COMPANY_NAME = 'サンプル'
+
+# フィクスチャの日付を含む取得条件
+QUERY = MaterialQuery(datetime(2020, 5, 10), datetime(2025, 5, 10))
+
+# URL → フィクスチャ（前から順に前方一致で探す。ほかのURLは 404）
+FIXTURE_URLS = [
+    (f"https://irbank.net/{STOCK_CODE}/ir/", 'irbank_detail.html'),
+    (earnings_scraper.irbank_ir_url(STOCK_CODE), 'irbank_listing.html'),
+]
+
+
+class FixtureResponse:
+    """requests / httpx のレスポンスのうち、スクレイパーが使う属性だけを持つスタンドイン"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.headers = {}
+        self.content = b''
+        self.status_code = 404
+        for prefix, name in FIXTURE_URLS:
+            if url.startswith(prefix):
+                with open(os.path.join(FIXTURES_PATH, name), 'rb') as f:
+                    self.content = f.read()
+                self.status_code = 200
+                break
+
+
+@asynccontextmanager
+async def fixture_stream(url: str, **kwargs):
+    yield FixtureResponse(url)
+
+
+async def fixture_aiter_body(response: FixtureResponse, max_bytes: int = async_http_client.MAX_BODY_BYTES):
+    content = response.content[:max_bytes]
+    for i in range(0, len(content), http_client.STREAM_CHUNK_SIZE):
+        yield content[i:i + http_client.STREAM_CHUNK_SIZE]
+
+
+async def fixture_get(url: str, **kwargs) -> FixtureResponse:
+    return FixtureResponse(url)
+
+
+def use_fixtures():
+    """HTTPクライアントをフィクスチャを返すスタンドインに置き換える"""
+    async_http_client.stream = fixture_stream
+    async_http_client.aiter_body = fixture_aiter_body
+    async_http_client.get = fixture_get
+    http_client.get = lambda url, **kwargs: FixtureResponse(url)
+
+
+async def check_async_fetchers(names) -> int:
+    """ソースの非同期版の取得関数を呼び出して結果を表示"""
+    sources = get_sources(names or None)
+    failures = 0
+
+    for source in sources:
+        if source.async_fetcher is None:
+            print(f"⚠️  {source.name}: 非同期版の取得関数が登録されていません（スレッドで同期版を実行）")
+            continue
+        try:
+            materials = await source.async_fetcher(STOCK_CODE, COMPANY_NAME, QUERY)
+        except Exception as e:
+            print(f"❌ {source.name}: {type(e).__name__}: {e}")
+            failures += 1
+            continue
+        if not isinstance(materials, list):
+            print(f"❌ {source.name}: リストではない値を返しました ({type(materials).__name__})")
+            failures += 1
+            continue
+        outside = [material for material in materials if not QUERY.matches(material)]
+        if outside:
+            print(f"❌ {source.name}: 条件に合わない資料を {len(outside)} 件返しました")
+            failures += 1
+            continue
+        print(f"✅ {source.name}: {len(materials)} 件")
+
+    await async_http_client.aclose()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    use_fixtures()
+    sys.exit(asyncio.run(check_async_fetchers(sys.argv[1:])))
@@ -0,0 +1,167 @@
+"""
+検索RPCモードを実際のPostgreSQLで確認するスクリプト
+
+使用方法:
+    DATABASE_URL=postgresql://postgres@localhost:5432/postgres python scripts/check_search_rpc.py [検索キーワード ...]
+
+pg_trgm が使えるPostgreSQL（ローカルやCIのもの）に接続し、supabase/migrations の
+stock_master 関連のマイグレーションを適用して stock_master.json を読み込んだうえで、
+search_stock_master 関数を search_via_rpc 経由で呼び出し、プロセス内インデックス
+（StockMasterIndex）の結果と比較する。すべて1つのトランザクション内で行い、最後にロールバックする
+
+必要なパッケージ:
+    psycopg2（scripts/requirements.txt からインストール）
+"""
+import glob
+import json
+import os
+import sys
+
+import psycopg2
+import psycopg2.extras
+
+# backendのモジュールを読み込めるようにする
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from stock_index import FACETS, StockMasterIndex
+from stock_search import search_via_rpc
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'supabase', 'migrations')
+
+DEFAULT_QUERIES = ['7203', 'トヨタ', 'とよた', '銀行', 'ソフトバンク', 'ＴＯＰＩＸ', 'topix', 'ﾄﾖﾀ']
+
+LIMIT = 20
+
+# Supabaseにあらかじめ用意されているロールと auth.role()（素のPostgreSQLでマイグレーションを通すため）
+SUPABASE_BUILTINS_SQL = """
+DO $$ BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN CREATE ROLE anon; END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN CREATE ROLE authenticated; END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN CREATE ROLE service_role; END IF;
+END $$;
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE OR REPLACE FUNCTION auth.role() RETURNS TEXT LANGUAGE sql STABLE AS $$ SELECT current_user::TEXT $$;
+"""
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _RPCCall:
+    def __init__(self, cursor, name, params):
+        self.cursor = cursor
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.cursor.execute(
+            f"SELECT * FROM {self.name}(%(query)s, %(max_results)s)", self.params
+        )
+        return _Response([dict(row) for row in self.cursor.fetchall()])
+
+
+class PostgresRPCClient:
+    """PostgreSQLの関数をSupabaseクライアントの rpc() と同じ形で呼び出す"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def rpc(self, name, params):
+        return _RPCCall(self.cursor, name, params)
+
+
+def stock_master_migrations():
+    """stock_master 関連のマイグレーションファイル（適用順）"""
+    return sorted(glob.glob(os.path.join(MIGRATIONS_DIR, '*stock_master*.sql')))
+
+
+def load_stock_master(cursor, stocks):
+    """stock_master テーブルに株式マスターを読み込む"""
+    psycopg2.extras.execute_values(
+        cursor,
+        f"INSERT INTO stock_master (code, name, {', '.join(FACETS)}) VALUES %s",
+        [(stock['code'], stock['name'], *(stock.get(facet) for facet in FACETS)) for stock in stocks],
+    )
+
+
+def compare(query, rpc_results, index):
+    """
+    RPCの結果をインデックスの結果と比較
+
+    Returns:
+        List[str]: 食い違いの説明（なければ空）
+    """
+    problems = []
+    index_results = index.search(query, limit=LIMIT)
+    rpc_codes = {stock['code'] for stock in rpc_results}
+
+    # インデックスの一致（証券コード・正規化キーの部分一致）はRPCでも必ず返る（件数上限内で）
+    missing = [stock['code'] for stock in index_results if stock['code'] not in rpc_codes]
+    if missing and len(rpc_results) < LIMIT:
+        problems.append(f"インデックスの結果がRPCにありません: {missing}")
+
+    # ファセットの値はインデックスと同じ
+    for stock in rpc_results:
+        record = index.get(stock['code'])
+        if record is None:
+            problems.append(f"インデックスにない証券コードです: {stock['code']}")
+            continue
+        for facet in FACETS:
+            if stock.get(facet) != record.get(facet):
+                problems.append(f"{stock['code']} の {facet} が一致しません: {stock.get(facet)} != {record.get(facet)}")
+    return problems
+
+
+def check_search_rpc(queries):
+    """マイグレーションを適用したPostgreSQLでRPCモードの検索結果を確認"""
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        print("❌ DATABASE_URL を設定してください（pg_trgm が使えるPostgreSQL）")
+        return 2
+
+    json_path = os.path.join(backend_path, 'stock_master.json')
+    with open(json_path, 'r', encoding='utf-8') as f:
+        stock_data = json.load(f)
+    index = StockMasterIndex(stock_data)
+
+    conn = psycopg2.connect(database_url)
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        # 既存のテーブルに触れないよう、一時的なスキーマにマイグレーションを適用する
+        cursor.execute('CREATE SCHEMA check_search_rpc')
+        cursor.execute('SET LOCAL search_path TO check_search_rpc, public')
+        cursor.execute(SUPABASE_BUILTINS_SQL)
+        for path in stock_master_migrations():
+            print(f"Applying {os.path.basename(path)}")
+            with open(path, 'r', encoding='utf-8') as f:
+                cursor.execute(f.read())
+        load_stock_master(cursor, stock_data)
+
+        client = PostgresRPCClient(cursor)
+        failures = 0
+        for query in queries:
+            rpc_results = search_via_rpc(client, query, limit=LIMIT)
+            problems = compare(query, rpc_results, index)
+            if problems:
+                failures += 1
+                print(f"❌ {query}: rpc={len(rpc_results)}")
+                for problem in problems:
+                    print(f"    {problem}")
+            else:
+                print(f"✅ {query}: rpc={len(rpc_results)} index={len(index.search(query, limit=LIMIT))}")
+
+            for stock in rpc_results[:5]:
+                print(f"    {stock['code']} {stock['name']} ({stock.get('market')} / {stock.get('sector')})")
+    finally:
+        conn.rollback()
+        conn.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(check_search_rpc(sys.argv[1:] or DEFAULT_QUERIES))
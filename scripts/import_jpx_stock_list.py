@@ -0,0 +1,90 @@
+"""
+JPXの上場銘柄一覧から市場区分・33業種区分を株式マスターに取り込むスクリプト
+
+使用方法:
+    python scripts/import_jpx_stock_list.py
+
+backend/jpx_stock_list.xls（JPX「東証上場銘柄一覧」）を読み込み、
+backend/stock_master.json の各銘柄に market（市場区分）と sector（33業種区分）を追加する
+（api/stock_master.json にも同じ内容を書き出す）。
+取り込み後は scripts/build_stock_snapshot.py でスナップショットを再生成し、
+必要に応じて scripts/import_stock_master.py でSupabaseに反映すること
+
+必要なパッケージ:
+    xlrd（.xls の読み込み。scripts/requirements.txt からインストール）
+"""
+import json
+import os
+import sys
+
+import xlrd
+
+# backendのモジュールを読み込めるようにする
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from stock_index import market_segment
+
+# 東証上場銘柄一覧の列名
+CODE_COLUMN = 'コード'
+MARKET_COLUMN = '市場・商品区分'
+SECTOR_COLUMN = '33業種区分'
+
+API_STOCK_MASTER_PATH = os.path.join(os.path.dirname(__file__), '..', 'api', 'stock_master.json')
+
+def load_jpx_attributes(xls_path):
+    """上場銘柄一覧から証券コード→(market, sector)を読み込む"""
+    sheet = xlrd.open_workbook(xls_path).sheet_by_index(0)
+    header = sheet.row_values(0)
+    code_col = header.index(CODE_COLUMN)
+    market_col = header.index(MARKET_COLUMN)
+    sector_col = header.index(SECTOR_COLUMN)
+
+    attributes = {}
+    for row in range(1, sheet.nrows):
+        values = sheet.row_values(row)
+        code = values[code_col]
+        # 数字のみの証券コードは数値として読み込まれる
+        code = str(int(code)) if isinstance(code, float) else str(code).strip()
+        sector = str(values[sector_col]).strip()
+        attributes[code] = {
+            'market': market_segment(str(values[market_col])),
+            'sector': sector if sector and sector != '-' else None,
+        }
+    return attributes
+
+def import_jpx_stock_list():
+    """株式マスターに市場区分・業種を取り込む"""
+    xls_path = os.path.join(backend_path, 'jpx_stock_list.xls')
+    json_path = os.path.join(backend_path, 'stock_master.json')
+
+    print(f"Loading JPX stock list from: {xls_path}")
+    attributes = load_jpx_attributes(xls_path)
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        stock_data = json.load(f)
+
+    matched = 0
+    for stock in stock_data:
+        attribute = attributes.get(stock['code'], {'market': None, 'sector': None})
+        if stock['code'] in attributes:
+            matched += 1
+        stock['market'] = attribute['market']
+        stock['sector'] = attribute['sector']
+
+    # api/ の複製も backend/ と同じ内容に保つ
+    for path in (json_path, API_STOCK_MASTER_PATH):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(stock_data, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Updated {matched}/{len(stock_data)} stocks with market/sector")
+
+    missing = len(stock_data) - matched
+    if missing:
+        print(f"⚠️  {missing} stocks were not found in the JPX stock list")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(import_jpx_stock_list())
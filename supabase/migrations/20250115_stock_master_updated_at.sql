@@ -0,0 +1,17 @@
+-- Keep stock_master.updated_at current so the app can sync only changed rows
+CREATE OR REPLACE FUNCTION set_stock_master_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_master_updated_at ON stock_master;
+CREATE TRIGGER trg_stock_master_updated_at
+    BEFORE UPDATE ON stock_master
+    FOR EACH ROW
+    EXECUTE FUNCTION set_stock_master_updated_at();
+
+-- Create index on updated_at for incremental sync queries
+CREATE INDEX IF NOT EXISTS idx_stock_master_updated_at ON stock_master(updated_at);
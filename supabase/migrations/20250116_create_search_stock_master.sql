@@ -0,0 +1,27 @@
+-- Server-side company search backed by idx_stock_master_name (gin_trgm_ops)
+-- Only the top matches cross the wire instead of the whole stock_master table
+CREATE OR REPLACE FUNCTION search_stock_master(query TEXT, max_results INTEGER DEFAULT 20)
+RETURNS TABLE (code VARCHAR, name VARCHAR, similarity REAL)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        -- Escape LIKE wildcards so user input is matched literally
+        SELECT query AS raw,
+               replace(replace(replace(query, '\', '\\'), '%', '\%'), '_', '\_') AS escaped
+    )
+    SELECT s.code, s.name, similarity(s.name, q.raw) AS similarity
+    FROM stock_master s, q
+    WHERE s.code = q.raw
+       OR s.name ILIKE '%' || q.escaped || '%'
+       OR s.name % q.raw
+    ORDER BY (s.code = q.raw) DESC,
+             (s.name ILIKE q.escaped || '%') DESC,
+             (s.name ILIKE '%' || q.escaped || '%') DESC,
+             similarity(s.name, q.raw) DESC,
+             s.code
+    LIMIT LEAST(GREATEST(max_results, 1), 100);
+$$;
+
+-- Allow the anon/authenticated roles to call the function via PostgREST RPC
+GRANT EXECUTE ON FUNCTION search_stock_master(TEXT, INTEGER) TO anon, authenticated;
@@ -0,0 +1,7 @@
+-- Add JPX market segment and 33-industry sector to stock_master for faceted search
+ALTER TABLE stock_master ADD COLUMN IF NOT EXISTS market VARCHAR(32);
+ALTER TABLE stock_master ADD COLUMN IF NOT EXISTS sector VARCHAR(64);
+
+-- Create indexes on facet columns for filtered lookups
+CREATE INDEX IF NOT EXISTS idx_stock_master_market ON stock_master(market);
+CREATE INDEX IF NOT EXISTS idx_stock_master_sector ON stock_master(sector);
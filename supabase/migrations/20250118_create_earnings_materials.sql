@@ -0,0 +1,38 @@
+-- Create earnings_materials table (scraped earnings materials shared across instances)
+CREATE TABLE IF NOT EXISTS earnings_materials (
+    id BIGSERIAL PRIMARY KEY,
+    stock_code VARCHAR(4) NOT NULL,
+    pdf_url TEXT NOT NULL,
+    title TEXT,
+    company_name VARCHAR(255),
+    fiscal_year VARCHAR(32),
+    period VARCHAR(32),
+    announcement_date VARCHAR(10),
+    type VARCHAR(32),
+    source VARCHAR(32),
+    fetched_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    UNIQUE(stock_code, pdf_url)
+);
+
+-- Create index on stock_code for read-through lookups (newest materials first)
+CREATE INDEX IF NOT EXISTS idx_earnings_materials_stock_code ON earnings_materials(stock_code, announcement_date DESC);
+
+-- Create index on fetched_at for freshness checks and cleanup of stale rows
+CREATE INDEX IF NOT EXISTS idx_earnings_materials_fetched_at ON earnings_materials(fetched_at);
+
+-- Enable Row Level Security (RLS)
+ALTER TABLE earnings_materials ENABLE ROW LEVEL SECURITY;
+
+-- Create policy to allow all operations (replaced by 20250119_restrict_earnings_materials_writes.sql)
+DO $$ BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'earnings_materials'
+        AND policyname = 'Allow all operations on earnings_materials'
+    ) THEN
+        CREATE POLICY "Allow all operations on earnings_materials" ON earnings_materials
+            FOR ALL
+            USING (true)
+            WITH CHECK (true);
+    END IF;
+END $$;
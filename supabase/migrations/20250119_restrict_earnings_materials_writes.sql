@@ -0,0 +1,58 @@
+-- Restrict writes on earnings_materials to the service role
+-- (the anon key is public, so it must not be able to rewrite or delete the shared cache)
+DROP POLICY IF EXISTS "Allow all operations on earnings_materials" ON earnings_materials;
+
+-- Create policy to allow read access for all (scraped public documents)
+DO $$ BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'earnings_materials'
+        AND policyname = 'Allow read access on earnings_materials'
+    ) THEN
+        CREATE POLICY "Allow read access on earnings_materials" ON earnings_materials
+            FOR SELECT
+            TO anon, authenticated
+            USING (true);
+    END IF;
+END $$;
+
+-- Create policies to allow insert/update/delete for service role only
+DO $$ BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'earnings_materials'
+        AND policyname = 'Allow insert for service role on earnings_materials'
+    ) THEN
+        CREATE POLICY "Allow insert for service role on earnings_materials" ON earnings_materials
+            FOR INSERT
+            TO service_role
+            WITH CHECK (true);
+    END IF;
+END $$;
+
+DO $$ BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'earnings_materials'
+        AND policyname = 'Allow update for service role on earnings_materials'
+    ) THEN
+        CREATE POLICY "Allow update for service role on earnings_materials" ON earnings_materials
+            FOR UPDATE
+            TO service_role
+            USING (true)
+            WITH CHECK (true);
+    END IF;
+END $$;
+
+DO $$ BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'earnings_materials'
+        AND policyname = 'Allow delete for service role on earnings_materials'
+    ) THEN
+        CREATE POLICY "Allow delete for service role on earnings_materials" ON earnings_materials
+            FOR DELETE
+            TO service_role
+            USING (true);
+    END IF;
+END $$;
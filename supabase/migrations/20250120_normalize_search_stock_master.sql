@@ -0,0 +1,53 @@
+-- Match search_stock_master against the same normalized key as the in-process index
+-- (stock_index.normalize_search_key: NFKC, lower case, hiragana -> katakana, no whitespace)
+-- and return the market/sector facet columns with each row
+CREATE OR REPLACE FUNCTION stock_search_key(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT regexp_replace(
+        translate(
+            lower(normalize(value, NFKC)),
+            'ぁあぃいぅうぇえぉおかがきぎくぐけげこごさざしじすずせぜそぞただちぢっつづてでとどなにぬねのはばぱひびぴふぶぷへべぺほぼぽまみむめもゃやゅゆょよらりるれろゎわゐゑをんゔゕゖ',
+            'ァアィイゥウェエォオカガキギクグケゲコゴサザシジスズセゼソゾタダチヂッツヅテデトドナニヌネノハバパヒビピフブプヘベペホボポマミムメモャヤュユョヨラリルレロヮワヰヱヲンヴヵヶ'
+        ),
+        '\s', '', 'g'
+    );
+$$;
+
+-- Trigram index on the normalized key (used by LIKE and % in search_stock_master)
+CREATE INDEX IF NOT EXISTS idx_stock_master_name_key ON stock_master USING gin(stock_search_key(name) gin_trgm_ops);
+
+-- The result columns change, so the function has to be dropped and recreated
+DROP FUNCTION IF EXISTS search_stock_master(TEXT, INTEGER);
+
+CREATE FUNCTION search_stock_master(query TEXT, max_results INTEGER DEFAULT 20)
+RETURNS TABLE (code VARCHAR, name VARCHAR, market VARCHAR, sector VARCHAR, similarity REAL)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        -- Escape LIKE wildcards so user input is matched literally
+        SELECT k.key,
+               replace(replace(replace(k.key, '\', '\\'), '%', '\%'), '_', '\_') AS escaped
+        FROM (SELECT stock_search_key(query) AS key) k
+    )
+    SELECT s.code, s.name, s.market, s.sector, similarity(stock_search_key(s.name), q.key) AS similarity
+    FROM stock_master s, q
+    WHERE q.key <> ''
+      AND (s.code = q.key
+           OR stock_search_key(s.name) LIKE '%' || q.escaped || '%'
+           OR stock_search_key(s.name) % q.key)
+    ORDER BY (s.code = q.key) DESC,
+             (stock_search_key(s.name) LIKE q.escaped || '%') DESC,
+             (stock_search_key(s.name) LIKE '%' || q.escaped || '%') DESC,
+             similarity(stock_search_key(s.name), q.key) DESC,
+             s.code
+    LIMIT LEAST(GREATEST(max_results, 1), 100);
+$$;
+
+-- Allow the anon/authenticated roles to call the functions via PostgREST RPC
+GRANT EXECUTE ON FUNCTION stock_search_key(TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION search_stock_master(TEXT, INTEGER) TO anon, authenticated;
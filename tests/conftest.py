@@ -0,0 +1,104 @@
+"""
+テスト共通の設定
+
+backend のモジュールを読み込めるようにし、ストア・ページキャッシュなどのSQLiteファイルは
+一時ディレクトリに書き込む（backendのモジュールを読み込む前に設定する）。ネットワークには接続しない
+"""
+import os
+import sys
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix='ir-note-tests-')
+os.environ['MATERIALS_DB_PATH'] = os.path.join(_tmp_dir, 'earnings_materials.db')
+os.environ['STOCK_MASTER_SYNCED_SNAPSHOT_PATH'] = os.path.join(_tmp_dir, 'stock_master.synced.snapshot')
+os.environ['SUPABASE_MATERIALS_ENABLED'] = '0'
+
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from contextlib import contextmanager
+from typing import Optional
+
+import pytest
+
+import http_client
+import page_cache
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'fixtures')
+
+
+def load_fixture(name: str) -> bytes:
+    """scripts/fixtures/ の匿名化したHTML"""
+    with open(os.path.join(FIXTURES_PATH, name), 'rb') as f:
+        return f.read()
+
+
+class FakeResponse:
+    """http_client.stream() のレスポンスのうち、ページキャッシュが使う属性だけを持つスタンドイン"""
+
+    def __init__(self, status_code: int, headers=None, content: bytes = b''):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+
+class FakeWeb:
+    """
+    ETag 付きのページを返し、If-None-Match が一致すれば 304 を返すスタンドイン
+
+    Attributes:
+        pages (dict): URL → (本文, ETag)
+        requests (list): (URL, リクエストヘッダー, ステータスコード) のリスト
+        bytes_read (int): 呼び出し側が読んだ本文のバイト数の合計
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.requests = []
+        self.bytes_read = 0
+
+    def serve(self, url: str, content: bytes, etag: Optional[str] = '"v1"'):
+        self.pages[url] = (content, etag)
+
+    @contextmanager
+    def stream(self, url: str, headers=None, **kwargs):
+        headers = headers or {}
+        if url not in self.pages:
+            response = FakeResponse(404)
+        else:
+            content, etag = self.pages[url]
+            validators = {'ETag': etag} if etag else {}
+            if etag and headers.get('If-None-Match') == etag:
+                response = FakeResponse(304, validators)
+            else:
+                response = FakeResponse(200, validators, content)
+        self.requests.append((url, dict(headers), response.status_code))
+        yield response
+
+    def iter_body(self, response: FakeResponse, max_bytes: int = http_client.MAX_BODY_BYTES):
+        content = response.content[:max_bytes]
+        for i in range(0, len(content), http_client.STREAM_CHUNK_SIZE):
+            chunk = content[i:i + http_client.STREAM_CHUNK_SIZE]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+    def statuses(self, url: str):
+        return [status for requested, _, status in self.requests if requested == url]
+
+
+@pytest.fixture
+def pages(tmp_path, monkeypatch):
+    """テストごとに空のページキャッシュを使う"""
+    cache = page_cache.PageCache(str(tmp_path / 'pages.db'))
+    monkeypatch.setattr(page_cache.PageCache, '_shared', cache, raising=False)
+    return cache
+
+
+@pytest.fixture
+def web(monkeypatch, pages):
+    """http_client を FakeWeb に置き換える（ページキャッシュも空にする）"""
+    fake = FakeWeb()
+    monkeypatch.setattr(http_client, 'stream', fake.stream)
+    monkeypatch.setattr(http_client, 'iter_body', fake.iter_body)
+    return fake
@@ -0,0 +1,38 @@
+"""非同期版のスクレイパーのテスト"""
+import asyncio
+import threading
+
+import async_http_client
+import async_scraper
+import materials_store
+from conftest import FakeResponse
+
+STOCK_CODE = '9999'
+
+
+def test_company_name_store_runs_off_the_event_loop(monkeypatch):
+    calls = []
+
+    def lookup(stock_code):
+        calls.append(('lookup', threading.current_thread()))
+        return None
+
+    def save(stock_code, name):
+        calls.append(('save', threading.current_thread()))
+
+    async def get(url, **kwargs):
+        return FakeResponse(200, content='<h1>サンプル株式会社</h1>'.encode('utf-8'))
+
+    monkeypatch.setattr(async_scraper, 'lookup_company_name', lookup)
+    monkeypatch.setattr(materials_store, 'save_company_name', save)
+    monkeypatch.setattr(async_http_client, 'get', get)
+    monkeypatch.setattr(async_scraper, 'parse_irbank_company_name', lambda content: 'サンプル')
+
+    async def run():
+        return await async_scraper.get_company_name_async(STOCK_CODE), threading.current_thread()
+
+    name, loop_thread = asyncio.run(run())
+
+    assert name == 'サンプル'
+    assert [call for call, _ in calls] == ['lookup', 'save']
+    assert all(thread is not loop_thread for _, thread in calls)
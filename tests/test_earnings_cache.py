@@ -0,0 +1,214 @@
+"""決算資料のメモリキャッシュ（TTL・stale-while-revalidate・同時取得のまとめ）のテスト"""
+import asyncio
+import threading
+
+import pytest
+
+import earnings_cache
+from earnings_cache import EarningsCache
+from material_sources import SourceResults
+
+STOCK_CODE = '9999'
+
+
+class Clock:
+    """time.monotonic() の代わりに進める時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(earnings_cache.time, 'monotonic', clock)
+    return clock
+
+
+class Fetcher:
+    """呼び出し回数を数え、呼び出しごとに別の結果を返す取得関数"""
+
+    def __init__(self, complete: bool = True):
+        self.calls = 0
+        self.complete = complete
+
+    def results(self, stock_code):
+        self.calls += 1
+        failed = () if self.complete else ('irbank',)
+        return SourceResults([{'stock_code': stock_code, 'call': self.calls}], failed=failed)
+
+    def __call__(self, stock_code):
+        return self.results(stock_code)
+
+    async def fetch_async(self, stock_code):
+        await asyncio.sleep(0)
+        return self.results(stock_code)
+
+
+def call_of(materials):
+    return materials[0]['call']
+
+
+def wait_refreshed(cache):
+    for future in list(cache._refreshing.values()):
+        future.result(timeout=5)
+
+
+def test_ttl_and_stale_while_revalidate(clock):
+    fetch = Fetcher()
+    cache = EarningsCache(fetch, ttl=60, stale=600)
+
+    assert call_of(cache.get(STOCK_CODE)) == 1
+    clock.now += 59
+    assert call_of(cache.get(STOCK_CODE)) == 1
+    assert fetch.calls == 1
+
+    # TTL を過ぎたら古い結果を返しつつ、バックグラウンドで取り直す
+    clock.now += 2
+    assert call_of(cache.get(STOCK_CODE)) == 1
+    wait_refreshed(cache)
+    assert fetch.calls == 2
+    assert call_of(cache.get(STOCK_CODE)) == 2
+
+    # stale 期間も過ぎたらその場で取得する
+    clock.now += 60 + 600
+    assert call_of(cache.get(STOCK_CODE)) == 3
+    assert cache.peek(STOCK_CODE) is not None
+
+
+def test_peek_and_invalidate(clock):
+    cache = EarningsCache(Fetcher(), ttl=60, stale=600)
+    assert cache.peek(STOCK_CODE) is None
+
+    cache.get(STOCK_CODE)
+    clock.now += 60 + 599
+    assert cache.peek(STOCK_CODE) is not None
+    clock.now += 1
+    assert cache.peek(STOCK_CODE) is None
+
+    cache.get(STOCK_CODE)
+    cache.invalidate(STOCK_CODE)
+    assert cache.peek(STOCK_CODE) is None
+
+
+def test_incomplete_results_expire_after_incomplete_ttl(clock):
+    fetch = Fetcher(complete=False)
+    cache = EarningsCache(fetch, ttl=60, stale=600, incomplete_ttl=5)
+
+    assert call_of(cache.get(STOCK_CODE)) == 1
+    clock.now += 4
+    assert call_of(cache.get(STOCK_CODE)) == 1
+
+    clock.now += 2
+    assert call_of(cache.get(STOCK_CODE)) == 1
+    wait_refreshed(cache)
+    assert fetch.calls == 2
+
+    # 欠けのない結果に置き換わったら通常の TTL に戻る
+    fetch.complete = True
+    clock.now += 6
+    cache.get(STOCK_CODE)
+    wait_refreshed(cache)
+    assert fetch.calls == 3
+    clock.now += 59
+    assert call_of(cache.get(STOCK_CODE)) == 3
+
+
+def test_empty_results_are_not_cached(clock):
+    calls = []
+    cache = EarningsCache(lambda stock_code: calls.append(stock_code) or [], ttl=60, stale=600)
+
+    assert cache.get(STOCK_CODE) == []
+    assert cache.get(STOCK_CODE) == []
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_lru_limit(clock):
+    cache = EarningsCache(Fetcher(), ttl=60, stale=600, max_entries=2)
+    cache.get('1111')
+    cache.get('2222')
+    cache.get('1111')
+    cache.get('3333')
+
+    assert cache.peek('1111') is not None
+    assert cache.peek('2222') is None
+    assert len(cache) == 2
+
+
+def test_concurrent_gets_share_one_fetch(clock):
+    release = threading.Event()
+    calls = []
+
+    def fetch(stock_code):
+        calls.append(stock_code)
+        release.wait(timeout=5)
+        return [{'stock_code': stock_code}]
+
+    cache = EarningsCache(fetch, ttl=60, stale=600)
+    lookup = cache._lookup
+    missed = threading.Semaphore(0)
+
+    def counting_lookup(stock_code):
+        result = lookup(stock_code)
+        missed.release()
+        return result
+
+    cache._lookup = counting_lookup
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(STOCK_CODE))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # すべてのスレッドがキャッシュを引き終えてから（取得中の Future を待たせてから）取得を終わらせる
+    for _ in threads:
+        assert missed.acquire(timeout=5)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert calls == [STOCK_CODE]
+    assert len(results) == 4
+    assert all(result is results[0] for result in results)
+
+
+def test_concurrent_gets_share_one_refresh(clock):
+    fetch = Fetcher()
+    release = threading.Event()
+
+    def refresh(stock_code):
+        release.wait(timeout=5)
+        return fetch(stock_code)
+
+    cache = EarningsCache(fetch, ttl=60, stale=600, refresh=refresh)
+    cache.get(STOCK_CODE)
+    clock.now += 61
+    for _ in range(4):
+        assert call_of(cache.get(STOCK_CODE)) == 1
+    release.set()
+    wait_refreshed(cache)
+
+    assert fetch.calls == 2
+
+
+def test_get_async_shares_one_fetch(clock):
+    fetch = Fetcher()
+    cache = EarningsCache(fetch, fetch_async=fetch.fetch_async, ttl=60, stale=600)
+
+    async def main():
+        first = await asyncio.gather(*(cache.get_async(STOCK_CODE) for _ in range(4)))
+        clock.now += 61
+        stale = await asyncio.gather(*(cache.get_async(STOCK_CODE) for _ in range(4)))
+        # バックグラウンドの取り直しを完了させる
+        while cache._refreshing_async:
+            await asyncio.sleep(0)
+        return first, stale, await cache.get_async(STOCK_CODE)
+
+    first, stale, refreshed = asyncio.run(main())
+
+    assert [call_of(materials) for materials in first] == [1] * 4
+    assert [call_of(materials) for materials in stale] == [1] * 4
+    assert call_of(refreshed) == 2
+    assert fetch.calls == 2
@@ -0,0 +1,69 @@
+"""IR BANKの一覧の取得（候補の上限・開始日での打ち切りと、条件ごとのページキャッシュ）のテスト"""
+from datetime import datetime
+
+import pytest
+
+import earnings_scraper
+import http_client
+from conftest import load_fixture
+from material_sources import MaterialQuery
+
+STOCK_CODE = '9999'
+COMPANY_NAME = 'サンプル'
+LISTING_URL = earnings_scraper.irbank_ir_url(STOCK_CODE)
+
+# フィクスチャの最新の日付から数えた「過去3年」と、その翌日の条件
+QUERY = MaterialQuery(datetime(2022, 5, 10), datetime(2025, 5, 10))
+NEXT_DAY_QUERY = MaterialQuery(datetime(2022, 5, 11), datetime(2025, 5, 11))
+
+
+@pytest.fixture
+def listing(web, monkeypatch):
+    """一覧ページを小さなチャンクで返し、詳細ページは解決済みとみなす"""
+    content = load_fixture('irbank_listing.html')
+    web.serve(LISTING_URL, content)
+    monkeypatch.setattr(http_client, 'STREAM_CHUNK_SIZE', 1024)
+    monkeypatch.setattr(earnings_scraper, 'IRBANK_MAX_MATERIALS', 1000)
+    monkeypatch.setattr(earnings_scraper, 'resolve_irbank_pdf_urls',
+                        lambda detail_urls: [f"{detail_url}.pdf" for detail_url in detail_urls])
+    return content
+
+
+def detail_urls(materials):
+    return [material['pdf_url'][:-len('.pdf')] for material in materials]
+
+
+def expected_detail_urls(content, query):
+    return [url for _, url in earnings_scraper.parse_irbank_listing(content, earnings_scraper.IRBANK_LISTING_LIMIT, query)]
+
+
+def test_listing_stops_at_cutoff(web, listing):
+    materials = earnings_scraper.fetch_from_irbank(STOCK_CODE, COMPANY_NAME, QUERY)
+
+    assert materials
+    assert detail_urls(materials) == expected_detail_urls(listing, QUERY)
+    # 開始日より前のリンクに達したところで本文を読むのをやめる
+    assert 0 < web.bytes_read < len(listing)
+
+
+def test_listing_next_day_reparses_stored_body(web, listing):
+    earnings_scraper.fetch_from_irbank(STOCK_CODE, COMPANY_NAME, QUERY)
+    bytes_read = web.bytes_read
+
+    materials = earnings_scraper.fetch_from_irbank(STOCK_CODE, COMPANY_NAME, NEXT_DAY_QUERY)
+
+    assert detail_urls(materials) == expected_detail_urls(listing, NEXT_DAY_QUERY)
+    # 条件が変わっても、304 なら保存済みの（途中までの）本文をパースし直すだけでダウンロードしない
+    assert web.statuses(LISTING_URL) == [200, 304]
+    assert web.bytes_read == bytes_read
+
+
+def test_listing_parser_name_depends_on_conditions():
+    name = earnings_scraper.irbank_listing_parser_name(30, QUERY)
+
+    assert name == earnings_scraper.irbank_listing_parser_name(
+        30, MaterialQuery(datetime(2022, 5, 10, 18), datetime(2025, 5, 10, 18)))
+    assert name != earnings_scraper.irbank_listing_parser_name(30, NEXT_DAY_QUERY)
+    assert name != earnings_scraper.irbank_listing_parser_name(10, QUERY)
+    assert name != earnings_scraper.irbank_listing_parser_name(
+        30, MaterialQuery(QUERY.start_date, QUERY.end_date, frozenset({'決算説明資料'})))
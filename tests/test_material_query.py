@@ -0,0 +1,135 @@
+"""決算資料の取得条件（MaterialQuery）による絞り込みのテスト"""
+from datetime import datetime, timezone
+
+import pytest
+
+import earnings_scraper
+import material_sources
+import materials_store
+from material_sources import MaterialQuery, MaterialSource
+
+STOCK_CODE = '9999'
+COMPANY_NAME = 'サンプル'
+
+QUERY = MaterialQuery(datetime(2023, 5, 10, 18, 30), datetime(2024, 5, 10, 9, 0))
+
+
+def material(date, doc_type='決算説明資料'):
+    return {
+        'title': f"{date} {doc_type}",
+        'stock_code': STOCK_CODE,
+        'pdf_url': f"https://example.com/{date}/{doc_type}.pdf",
+        'announcement_date': date,
+        'type': doc_type,
+    }
+
+
+STORED = [
+    material('2024-05-11'),
+    material('2024-05-10', '決算短信'),
+    material('2024-05-10'),
+    material('2023-11-10'),
+    material('2023-05-10'),
+    material('2023-05-09'),
+]
+
+
+def test_date_bounds_are_whole_days():
+    # 開始日・終了日の時刻によらず、その日の資料は含む
+    assert QUERY.accepts('2023-05-10')
+    assert QUERY.accepts('2024-05-10')
+    assert QUERY.accepts('2024-05-10T23:59:59')
+    assert not QUERY.accepts('2023-05-09')
+    assert not QUERY.accepts('2024-05-11')
+
+
+def test_doc_types():
+    query = MaterialQuery(QUERY.start_date, QUERY.end_date, frozenset({'決算説明資料'}))
+
+    assert query.accepts('2024-01-01', '決算説明資料')
+    assert not query.accepts('2024-01-01', '決算短信')
+    assert not query.accepts('2024-05-11', '決算説明資料')
+    assert QUERY.accepts('2024-01-01', '決算短信')
+
+
+def test_unknown_date_or_type_is_accepted():
+    query = MaterialQuery(QUERY.start_date, QUERY.end_date, frozenset({'決算説明資料'}))
+
+    assert query.accepts(None, '決算説明資料')
+    assert query.accepts('', '決算説明資料')
+    assert query.accepts('2024-01-01', None)
+    assert query.matches({'title': '日付・種類の分からない資料'})
+
+
+def test_filter_returns_new_list():
+    materials = list(STORED)
+
+    filtered = QUERY.filter(materials)
+
+    assert [item['announcement_date'] for item in filtered] == ['2024-05-10', '2024-05-10', '2023-11-10', '2023-05-10']
+    assert materials == STORED
+
+
+def test_for_years_ends_today_in_jst(monkeypatch):
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            # UTCでは5月10日の夜だが、日本時間では5月11日
+            return datetime(2025, 5, 10, 20, 0, tzinfo=timezone.utc).astimezone(tz)
+
+    monkeypatch.setattr(material_sources, 'datetime', FixedDatetime)
+
+    query = MaterialQuery.for_years(3)
+
+    assert query.end_date.tzinfo is None
+    assert query.end_date.date().isoformat() == '2025-05-11'
+    assert query.accepts('2025-05-11')
+    assert (query.end_date - query.start_date).days == 3 * 365
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """ストアに全件の結果があるものとし、各ソースへの問い合わせ・ストアへの保存を記録する"""
+    calls = {'fetched': [], 'saved': [], 'stored': list(STORED)}
+
+    def fetcher(stock_code, company_name, query):
+        calls['fetched'].append(query)
+        return list(STORED)
+
+    monkeypatch.setattr(material_sources, '_registry', {'only': MaterialSource('only', fetcher, timeout=5, priority=10)})
+    monkeypatch.setattr(material_sources, 'ENABLED_SOURCES', None)
+    monkeypatch.setattr(earnings_scraper, 'get_company_name', lambda stock_code: COMPANY_NAME)
+    monkeypatch.setattr(materials_store, 'load_materials', lambda stock_code: calls['stored'])
+    monkeypatch.setattr(materials_store, 'save_materials',
+                        lambda stock_code, materials: calls['saved'].append(list(materials)))
+    return calls
+
+
+def test_query_narrows_stored_results(store):
+    query = MaterialQuery(QUERY.start_date, QUERY.end_date, frozenset({'決算説明資料'}))
+
+    materials = earnings_scraper.fetch_earnings_materials(STOCK_CODE, query=query)
+
+    assert [item['announcement_date'] for item in materials] == ['2024-05-10', '2023-11-10', '2023-05-10']
+    # ストアの全件の結果はそのまま（絞り込んだ結果で上書きしない）
+    assert store['stored'] == STORED
+    assert store['fetched'] == []
+    assert store['saved'] == []
+
+
+def test_query_is_passed_to_sources_and_not_saved(store):
+    store['stored'] = None
+
+    materials = earnings_scraper.fetch_earnings_materials(STOCK_CODE, query=QUERY)
+
+    assert len(materials) == 4
+    assert store['fetched'] == [QUERY]
+    assert store['saved'] == []
+
+
+def test_full_results_are_saved_before_filtering(store):
+    store['stored'] = None
+
+    earnings_scraper.fetch_earnings_materials(STOCK_CODE, years=100)
+
+    assert store['saved'] == [STORED]
@@ -0,0 +1,112 @@
+"""決算資料ソースの並列取得エンジンと、失敗したソースがある結果の扱いのテスト"""
+import asyncio
+
+import pytest
+
+import async_scraper
+import earnings_scraper
+import material_sources
+import materials_store
+import page_cache
+from material_sources import MaterialQuery, MaterialSource, fetch_all_sources
+
+STOCK_CODE = '9999'
+COMPANY_NAME = 'サンプル'
+
+
+def material(pdf_url, date='2024-05-10'):
+    return {
+        'title': '決算説明会資料',
+        'stock_code': STOCK_CODE,
+        'pdf_url': pdf_url,
+        'announcement_date': date,
+        'fiscal_year': '2024',
+        'type': '決算説明資料',
+    }
+
+
+def ok_fetcher(stock_code, company_name, query):
+    return [material('https://example.com/a.pdf')]
+
+
+def failing_fetcher(stock_code, company_name, query):
+    raise ConnectionError('connection reset')
+
+
+async def ok_async_fetcher(stock_code, company_name, query):
+    return ok_fetcher(stock_code, company_name, query)
+
+
+async def failing_async_fetcher(stock_code, company_name, query):
+    return failing_fetcher(stock_code, company_name, query)
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    """正常なソースと例外を送出するソースだけを登録し、ストアへの保存を記録する"""
+    registry = {
+        'ok': MaterialSource('ok', ok_fetcher, timeout=5, priority=10, async_fetcher=ok_async_fetcher),
+        'broken': MaterialSource('broken', failing_fetcher, timeout=5, priority=20,
+                                 async_fetcher=failing_async_fetcher),
+    }
+    saved = []
+    monkeypatch.setattr(material_sources, '_registry', registry)
+    monkeypatch.setattr(material_sources, 'ENABLED_SOURCES', None)
+    monkeypatch.setattr(earnings_scraper, 'get_company_name', lambda stock_code: COMPANY_NAME)
+    monkeypatch.setattr(materials_store, 'load_materials', lambda stock_code: None)
+    monkeypatch.setattr(materials_store, 'save_materials', lambda stock_code, materials: saved.append(stock_code))
+
+    async def company_name_async(stock_code):
+        return COMPANY_NAME
+
+    monkeypatch.setattr(async_scraper, 'get_company_name_async', company_name_async)
+    return saved
+
+
+def test_failing_source_is_recorded(sources):
+    results = fetch_all_sources(STOCK_CODE, COMPANY_NAME, MaterialQuery.for_years(100))
+
+    assert results.failed == ['broken']
+    assert not results.complete
+    assert [item['pdf_url'] for item in results] == ['https://example.com/a.pdf']
+
+
+def test_incomplete_results_are_not_saved(sources):
+    materials = earnings_scraper.fetch_earnings_materials(STOCK_CODE, years=100)
+
+    assert len(materials) == 1
+    assert materials.complete is False
+    assert materials.failed == ['broken']
+    assert sources == []
+
+
+def test_incomplete_results_are_not_saved_async(sources):
+    materials = asyncio.run(async_scraper.fetch_earnings_materials_async(STOCK_CODE, years=100))
+
+    assert len(materials) == 1
+    assert materials.complete is False
+    assert sources == []
+
+
+def test_complete_results_are_saved(sources):
+    del material_sources._registry['broken']
+
+    materials = earnings_scraper.fetch_earnings_materials(STOCK_CODE, years=100)
+
+    assert len(materials) == 1
+    assert getattr(materials, 'complete', True)
+    assert sources == [STOCK_CODE]
+
+
+@pytest.mark.parametrize('fetch', [
+    lambda: earnings_scraper.fetch_from_buffettcode(STOCK_CODE, COMPANY_NAME),
+    lambda: earnings_scraper.fetch_from_irbank(STOCK_CODE, COMPANY_NAME),
+    lambda: earnings_scraper.scrape_ir_page('https://example.com/ir/', STOCK_CODE, COMPANY_NAME),
+])
+def test_fetchers_propagate_errors(monkeypatch, fetch):
+    def unreachable(*args, **kwargs):
+        raise ConnectionError('connection reset')
+
+    monkeypatch.setattr(page_cache, 'fetch_parsed', unreachable)
+    with pytest.raises(ConnectionError):
+        fetch()
@@ -0,0 +1,98 @@
+"""条件付きGETのページキャッシュ（304 の扱い）のテスト"""
+import http_client
+import page_cache
+from html_links import LinkParser
+
+URL = 'https://example.com/ir/'
+
+# 1チャンクに収まらない大きさのリンク一覧
+CONTENT = ''.join(f'<a href="/ir/{i}">資料{i}</a>\n' for i in range(200)).encode('utf-8')
+
+
+def links(limit):
+    """先頭から limit 件のリンクを集めるパーサー"""
+    return f"links:{limit}", lambda: LinkParser(lambda href, text: href, limit=limit)
+
+
+def expected(limit):
+    return [f"/ir/{i}" for i in range(limit)]
+
+
+def fetch(limit):
+    name, make_parser = links(limit)
+    return page_cache.fetch_parsed(URL, name, make_parser)
+
+
+def test_200_with_validator_is_stored(web, pages, monkeypatch):
+    monkeypatch.setattr(http_client, 'STREAM_CHUNK_SIZE', 256)
+    web.serve(URL, CONTENT)
+
+    assert fetch(3) == expected(3)
+
+    entry = pages.lookup(URL)
+    assert entry['etag'] == '"v1"'
+    assert entry['parser'] == 'links:3'
+    # パーサーが完了した時点で読むのをやめ、読んだ部分だけを保存する
+    assert web.bytes_read < len(CONTENT)
+
+
+def test_304_returns_stored_result_without_reading_body(web, pages):
+    web.serve(URL, CONTENT)
+    fetch(3)
+    bytes_read = web.bytes_read
+
+    assert fetch(3) == expected(3)
+    assert web.statuses(URL) == [200, 304]
+    assert web.requests[-1][1] == {'If-None-Match': '"v1"'}
+    assert web.bytes_read == bytes_read
+
+
+def test_304_with_other_parser_reparses_stored_body(web, pages):
+    web.serve(URL, CONTENT)
+    fetch(50)
+    bytes_read = web.bytes_read
+
+    # 保存済みの本文の中で完了するパーサーなら、ダウンロードせずにパースし直す
+    assert fetch(10) == expected(10)
+    assert web.statuses(URL) == [200, 304]
+    assert web.bytes_read == bytes_read
+    assert pages.lookup(URL)['parser'] == 'links:10'
+
+
+def test_304_with_incomplete_reparse_refetches(web, pages, monkeypatch):
+    monkeypatch.setattr(http_client, 'STREAM_CHUNK_SIZE', 256)
+    web.serve(URL, CONTENT)
+    fetch(3)
+
+    # 保存済みの本文は途中までなので、より多くを読むパーサーでは本文を取り直す
+    assert fetch(150) == expected(150)
+    assert web.statuses(URL) == [200, 304, 200]
+    assert 'If-None-Match' not in web.requests[-1][1]
+    assert pages.lookup(URL)['parser'] == 'links:150'
+
+
+def test_changed_page_is_downloaded_again(web, pages):
+    web.serve(URL, CONTENT)
+    fetch(3)
+
+    web.serve(URL, CONTENT.replace(b'/ir/0"', b'/ir/new"'), etag='"v2"')
+
+    assert fetch(3) == ['/ir/new', '/ir/1', '/ir/2']
+    assert web.statuses(URL) == [200, 200]
+    assert pages.lookup(URL)['etag'] == '"v2"'
+
+
+def test_page_without_validators_is_not_stored(web, pages):
+    web.serve(URL, CONTENT, etag=None)
+
+    assert fetch(3) == expected(3)
+    assert fetch(3) == expected(3)
+    assert pages.lookup(URL) is None
+    assert web.statuses(URL) == [200, 200]
+    assert web.requests[-1][1] == {}
+
+
+def test_error_status_returns_none(web, pages):
+    assert fetch(3) is None
+    assert web.statuses(URL) == [404]
+    assert pages.lookup(URL) is None
@@ -0,0 +1,111 @@
+"""
+検索RPCの正規化キー（20250120 のマイグレーションの stock_search_key）と
+プロセス内インデックスの normalize_search_key が一致することのテスト
+
+DATABASE_URL（pg_trgm が使えるPostgreSQL）が設定されていれば、マイグレーションを適用した
+データベースの stock_search_key も同じ文字で確認する（未設定の場合はスキップ）
+"""
+import json
+import os
+import re
+import sys
+import unicodedata
+
+import pytest
+
+from stock_index import normalize_search_key
+
+MIGRATION_PATH = os.path.join(os.path.dirname(__file__), '..', 'supabase', 'migrations',
+                              '20250120_normalize_search_stock_master.sql')
+STOCK_MASTER_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'stock_master.json')
+
+
+def migration_translate_table():
+    """マイグレーションの translate() に渡している (変換前, 変換後) の文字列"""
+    with open(MIGRATION_PATH, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    match = re.search(r"translate\(\s*lower\(normalize\(value, NFKC\)\),\s*'([^']*)',\s*'([^']*)'\s*\)", sql)
+    assert match, 'stock_search_key の translate() が見つかりません'
+    return match.group(1), match.group(2)
+
+
+def sql_search_key(value, table):
+    """stock_search_key と同じ処理（NFKC → lower → translate → 空白除去）"""
+    source, target = table
+    key = unicodedata.normalize('NFKC', value).lower().translate(str.maketrans(source, target))
+    return re.sub(r'\s', '', key)
+
+
+def characters():
+    """かな・半角カナ・全角英数記号・全角空白を1文字ずつ"""
+    ranges = [
+        (0x3041, 0x3096),  # ひらがな
+        (0x309D, 0x309E),  # ひらがなの繰り返し記号
+        (0x30A1, 0x30FE),  # カタカナ
+        (0xFF01, 0xFF5E),  # 全角英数記号
+        (0xFF61, 0xFF9F),  # 半角カナ
+    ]
+    return [chr(code) for start, end in ranges for code in range(start, end + 1)] + ['　']
+
+
+def samples():
+    """1文字ずつの入力と、濁点付きの半角カナ・混在した検索語・株式マスターの企業名"""
+    with open(STOCK_MASTER_PATH, 'r', encoding='utf-8') as f:
+        names = [stock['name'] for stock in json.load(f)]
+    words = ['ﾄﾖﾀ', 'ｶﾞｽ', 'ﾊﾟﾅｿﾆｯｸ', 'ＴＯＰＩＸ', 'とよた　じどうしゃ', 'ソフトバンク', 'Ｓｏｎｙ　Ｇｒｏｕｐ']
+    return characters() + words + names
+
+
+def test_translate_table_is_hiragana_to_katakana():
+    source, target = migration_translate_table()
+
+    assert len(source) == len(target)
+    # normalize_search_key と同じく、ぁ(U+3041)〜ゖ(U+3096) をすべて対応するカタカナにする
+    assert source == ''.join(chr(code) for code in range(0x3041, 0x3097))
+    assert target == ''.join(chr(ord(char) + 0x60) for char in source)
+
+
+def test_sql_key_matches_normalize_search_key():
+    table = migration_translate_table()
+
+    mismatches = [
+        (value, sql_search_key(value, table), normalize_search_key(value))
+        for value in samples()
+        if sql_search_key(value, table) != normalize_search_key(value)
+    ]
+    assert mismatches == []
+
+
+def test_database_key_matches_normalize_search_key():
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        pytest.skip('DATABASE_URL が未設定です')
+    psycopg2 = pytest.importorskip('psycopg2')
+
+    scripts_path = os.path.join(os.path.dirname(__file__), '..', 'scripts')
+    if scripts_path not in sys.path:
+        sys.path.insert(0, scripts_path)
+    from check_search_rpc import SUPABASE_BUILTINS_SQL, stock_master_migrations
+
+    values = samples()
+    conn = psycopg2.connect(database_url)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('CREATE SCHEMA test_search_key')
+        cursor.execute('SET LOCAL search_path TO test_search_key, public')
+        cursor.execute(SUPABASE_BUILTINS_SQL)
+        for path in stock_master_migrations():
+            with open(path, 'r', encoding='utf-8') as f:
+                cursor.execute(f.read())
+
+        cursor.execute('SELECT value, stock_search_key(value) FROM unnest(%s::text[]) AS value', (values,))
+        mismatches = [
+            (value, key, normalize_search_key(value))
+            for value, key in cursor.fetchall()
+            if key != normalize_search_key(value)
+        ]
+    finally:
+        conn.rollback()
+        conn.close()
+
+    assert mismatches == []
@@ -0,0 +1,84 @@
+"""企業名のあいまい検索（入力ミス対策）のテスト"""
+import json
+import os
+
+import pytest
+
+from stock_fuzzy import MAX_DISTANCE, StockFuzzyMatcher, edit_distance
+from stock_index import StockMasterIndex, normalize_search_key
+
+STOCK_MASTER_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'stock_master.json')
+
+STOCKS = [
+    {'code': '3116', 'name': 'トヨタ紡織', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '7203', 'name': 'トヨタ自動車', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '7205', 'name': '日野自動車', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '7267', 'name': '本田技研工業', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '9001', 'name': 'トヨダ', 'market': 'Standard', 'sector': 'サービス業'},
+    {'code': '9984', 'name': 'ソフトバンクグループ', 'market': 'Prime', 'sector': '情報・通信業'},
+]
+
+
+@pytest.fixture
+def matcher():
+    return StockFuzzyMatcher(StockMasterIndex(STOCKS))
+
+
+def found(results):
+    return [stock['code'] for stock in results]
+
+
+def test_edit_distance():
+    assert edit_distance('トヨタ', 'トヨタ', 2) == 0
+    assert edit_distance('トヨタ', 'トヨダ', 2) == 1
+    assert edit_distance('トヨタ', 'トタ', 2) == 1
+    # 隣接文字の入れ替えは1操作
+    assert edit_distance('ヨトタ', 'トヨタ', 2) == 1
+    # max_distance を超える場合は max_distance + 1 で打ち切る
+    assert edit_distance('トヨタ自動車', 'ホンダ', 2) == 3
+    assert edit_distance('ソフトバンク', 'ソニー', 1) == 2
+
+
+def test_typos_rank_by_distance(matcher):
+    # 同じ距離はマスターの並び順
+    assert found(matcher.search('トヨタ自動社')) == ['7203']
+    assert found(matcher.search('トヨタ')) == ['3116', '7203', '9001']
+    assert found(matcher.search('とよだ')) == ['9001', '3116', '7203']
+    assert found(matcher.search('ソフトバンクグルプ')) == ['9984']
+    assert found(matcher.search('ソフトバングループ')) == ['9984']
+    # 入力途中のクエリは企業名の先頭部分との距離で判定する
+    assert found(matcher.search('ソフトバソ')) == ['9984']
+
+
+def test_short_queries_allow_one_edit(matcher):
+    # 4文字以下のクエリは編集距離1まで
+    assert found(matcher.search('トヨ')) == ['3116', '7203', '9001']
+    assert found(matcher.search('トタ')) == ['3116', '7203', '9001']
+    assert matcher.search('ホダ') == []
+    assert matcher.search('ト') == []
+
+
+def test_mask_and_limit(matcher):
+    standard = matcher.index.facet_mask({'market': 'Standard'})
+
+    assert found(matcher.search('トヨタ', mask=standard)) == ['9001']
+    assert found(matcher.search('トヨタ', limit=2)) == ['3116', '7203']
+
+
+def test_matches_full_scan_on_stock_master():
+    with open(STOCK_MASTER_PATH, 'r', encoding='utf-8') as f:
+        stocks = json.load(f)
+    index = StockMasterIndex(stocks)
+    matcher = StockFuzzyMatcher(index)
+
+    for query in ['トヨタ自動社', 'ソフトバンクグルプ', 'みつびし商事', 'ニトリホールデングス', 'キーエンス', 'ﾔﾏﾄ']:
+        key = normalize_search_key(query)
+        max_distance = 1 if len(key) <= 4 else MAX_DISTANCE
+        # 全銘柄との編集距離を直接求めた結果と同じになる
+        expected = sorted(
+            (min(edit_distance(key, index.key(p), max_distance),
+                 edit_distance(key, index.key(p)[:len(key)], max_distance)), p)
+            for p in range(len(index))
+        )
+        expected = [index.record(p)['code'] for distance, p in expected if distance <= max_distance][:20]
+        assert found(matcher.search(query)) == expected, query
@@ -0,0 +1,68 @@
+"""株式マスターの検索インデックス（ファセットのビットマップ）のテスト"""
+import pytest
+
+from stock_index import StockMasterIndex, iter_bits
+
+STOCKS = [
+    {'code': '1301', 'name': '極洋', 'market': 'Prime', 'sector': '水産・農林業'},
+    {'code': '1332', 'name': 'ニッスイ', 'market': 'Prime', 'sector': '水産・農林業'},
+    {'code': '1333', 'name': 'マルハニチロ', 'market': 'Prime', 'sector': '水産・農林業'},
+    {'code': '1376', 'name': 'カネコ種苗', 'market': 'Standard', 'sector': '水産・農林業'},
+    {'code': '8306', 'name': '三菱ＵＦＪフィナンシャル・グループ', 'market': 'Prime', 'sector': '銀行業'},
+    {'code': '8377', 'name': 'ほくほくフィナンシャルグループ', 'market': 'Prime', 'sector': '銀行業'},
+    {'code': '7163', 'name': '住信ＳＢＩネット銀行', 'market': 'Standard', 'sector': '銀行業'},
+    {'code': '4385', 'name': 'メルカリ', 'market': 'Prime', 'sector': '情報・通信業'},
+    {'code': '9999', 'name': 'サンプル', 'market': None, 'sector': None},
+]
+
+
+@pytest.fixture
+def index():
+    return StockMasterIndex(STOCKS)
+
+
+def codes(mask):
+    return [STOCKS[position]['code'] for position in iter_bits(mask)]
+
+
+def test_facet_mask_selects_matching_positions(index):
+    assert codes(index.facet_mask({'market': 'Prime'})) == ['1301', '1332', '1333', '8306', '8377', '4385']
+    assert codes(index.facet_mask({'sector': '銀行業'})) == ['8306', '8377', '7163']
+
+
+def test_facet_mask_intersects_filters(index):
+    assert codes(index.facet_mask({'market': 'Standard', 'sector': '銀行業'})) == ['7163']
+    assert index.facet_mask({'market': 'Growth', 'sector': '銀行業'}) == 0
+
+
+def test_facet_mask_normalizes_values(index):
+    prime = index.facet_mask({'market': 'Prime'})
+
+    # JPXの市場・商品区分の表記・大文字小文字・全角の違いは同じ値として扱う
+    assert index.facet_mask({'market': 'プライム（内国株式）'}) == prime
+    assert index.facet_mask({'market': 'prime'}) == prime
+    assert index.facet_mask({'market': 'ＰＲＩＭＥ'}) == prime
+
+
+def test_facet_mask_without_filters(index):
+    assert index.facet_mask({}) is None
+    assert index.facet_mask({'market': '', 'sector': None}) is None
+    assert index.facet_mask({'market': '存在しない区分'}) == 0
+
+
+def test_search_with_mask(index):
+    banks = index.facet_mask({'sector': '銀行業'})
+
+    assert [stock['code'] for stock in index.search('フィナンシャル', mask=banks)] == ['8306', '8377']
+    assert [stock['code'] for stock in index.search('フィナンシャル', mask=index.facet_mask({'market': 'Standard'}))] == []
+    # 証券コードの完全一致も絞り込みの対象にする
+    assert index.search('1301', mask=banks) == []
+    assert [stock['code'] for stock in index.search('8306', mask=banks)] == ['8306']
+
+
+def test_search_with_mask_only(index):
+    banks = index.facet_mask({'sector': '銀行業'})
+
+    assert [stock['code'] for stock in index.search('', mask=banks)] == ['8306', '8377', '7163']
+    assert [stock['code'] for stock in index.search('', limit=2, mask=banks)] == ['8306', '8377']
+    assert index.search('') == []
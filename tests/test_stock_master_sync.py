@@ -0,0 +1,146 @@
+"""株式マスターのバックグラウンド同期（Supabaseとの同期と共有スナップショット）のテスト"""
+import pytest
+
+import stock_master_sync
+from stock_index import StockMasterIndex
+from stock_master_sync import StockMasterRefresher
+from stock_snapshot import MappedStockIndex
+
+INITIAL_STOCKS = [
+    {'code': '1301', 'name': '極洋', 'market': 'プライム', 'sector': '水産・農林業'},
+    {'code': '7203', 'name': 'トヨタ自動車', 'market': 'プライム', 'sector': '輸送用機器'},
+]
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Supabaseクライアントのクエリビルダーのうち、同期で使うメソッドだけを持つスタンドイン"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+        self.orders = []
+        self.bounds = None
+        self.count = None
+
+    def select(self, columns, count=None):
+        self.count = count
+        return self
+
+    def limit(self, n):
+        self.bounds = (0, n - 1)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def order(self, column):
+        self.orders.append(column)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        rows = [row for row in self.rows if all(check(row) for check in self.filters)]
+        rows.sort(key=lambda row: tuple(row[column] for column in self.orders))
+        total = len(rows)
+        if self.bounds is not None:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        return FakeResponse([dict(row) for row in rows], total if self.count else None)
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        assert name == 'stock_master'
+        return FakeQuery(self.rows)
+
+
+def row(code, name, updated_at, market='プライム', sector='水産・農林業'):
+    return {'code': code, 'name': name, 'market': market, 'sector': sector, 'updated_at': updated_at}
+
+
+@pytest.fixture
+def supabase():
+    return FakeSupabase([
+        row('1301', '極洋', '2025-01-01T00:00:00'),
+        row('7203', 'トヨタ自動車', '2025-01-01T00:00:00', sector='輸送用機器'),
+    ])
+
+
+def refresher(client, tmp_path):
+    return StockMasterRefresher(
+        client,
+        initial_loader=lambda: StockMasterIndex(INITIAL_STOCKS),
+        background_sync=False,
+        snapshot_path=str(tmp_path / 'stock_master.synced.snapshot'),
+    )
+
+
+def test_only_one_worker_writes_the_snapshot(supabase, tmp_path):
+    writer = refresher(supabase, tmp_path)
+    reader = refresher(supabase, tmp_path)
+    writer.get_index()
+    reader.get_index()
+
+    assert writer.acquire_writer_lock()
+    assert not reader.acquire_writer_lock()
+
+
+def test_reader_maps_the_shared_snapshot(supabase, tmp_path):
+    writer = refresher(supabase, tmp_path)
+    reader = refresher(supabase, tmp_path)
+    writer.get_index()
+    reader.get_index()
+    assert not reader.reload_snapshot()
+
+    supabase.rows[0]['name'] = '極洋（新）'
+    writer.refresh()
+
+    assert isinstance(writer.get_index(), MappedStockIndex)
+    assert reader.reload_snapshot()
+    assert isinstance(reader.get_index(), MappedStockIndex)
+    assert reader.get_index().get('1301')['name'] == '極洋（新）'
+    # 差し替えられていなければ読み直さない
+    assert not reader.reload_snapshot()
+
+    supabase.rows[1].update(name='トヨタ', updated_at='2025-01-02T00:00:00')
+    writer.refresh()
+
+    assert reader.reload_snapshot()
+    assert reader.get_index().get('7203')['name'] == 'トヨタ'
+
+
+def test_incremental_sync_keeps_rows_sharing_the_last_timestamp(supabase, tmp_path, monkeypatch):
+    monkeypatch.setattr(stock_master_sync, 'PAGE_SIZE', 2)
+    sync = refresher(supabase, tmp_path)
+    sync.refresh()
+    index = sync.get_index()
+
+    # 前回の最後の行と同じ updated_at で追加・更新された行
+    supabase.rows.append(row('8306', '三菱ＵＦＪフィナンシャル・グループ', '2025-01-01T00:00:00', sector='銀行業'))
+    supabase.rows.append(row('9984', 'ソフトバンクグループ', '2025-01-01T00:00:00', sector='情報・通信業'))
+    sync.refresh()
+
+    assert sync.get_index().get('8306')['name'] == '三菱ＵＦＪフィナンシャル・グループ'
+    assert sync.get_index().get('9984')['name'] == 'ソフトバンクグループ'
+    assert sync.get_index() is not index
+
+    # 前回取得した行しかなければインデックスを作り直さない
+    index = sync.get_index()
+    sync.refresh()
+    assert sync.get_index() is index
@@ -0,0 +1,63 @@
+"""mmapしたスナップショット（MappedStockIndex）がインメモリのインデックスと同じ結果を返すことのテスト"""
+import json
+import os
+
+import pytest
+
+from stock_index import FACETS, StockMasterIndex
+from stock_snapshot import SNAPSHOT_PATH, MappedStockIndex, write_snapshot
+
+STOCK_MASTER_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'stock_master.json')
+
+QUERIES = ['7203', '１３０１', 'トヨタ', 'とよた', 'ﾄﾖﾀ', '銀行', 'ホールディングス', 'ＴＯＰＩＸ', 'topix',
+           '日本 郵船', 'ソフトバンク', 'ー', 'x', '', '存在しない企業名']
+
+
+@pytest.fixture(scope='module')
+def stocks():
+    with open(STOCK_MASTER_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def indexes(stocks, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('snapshot') / 'stock_master.snapshot')
+    write_snapshot(stocks, path)
+    return StockMasterIndex(sorted(stocks, key=lambda stock: stock['code'])), MappedStockIndex(path)
+
+
+def sample_queries(stocks):
+    """固定の検索語と、企業名の先頭・途中の2〜3文字"""
+    names = [stock['name'] for stock in stocks[::97]]
+    return QUERIES + [name[:2] for name in names] + [name[1:4] for name in names]
+
+
+def test_bundled_snapshot_matches_stock_master(stocks):
+    snapshot = MappedStockIndex(SNAPSHOT_PATH)
+
+    assert len(snapshot) == len(stocks)
+    assert [snapshot.record(position) for position in range(len(snapshot))] == \
+        [{'code': stock['code'], 'name': stock['name'], **{facet: stock.get(facet) for facet in FACETS}}
+         for stock in sorted(stocks, key=lambda stock: stock['code'])]
+
+
+def test_get_matches(indexes, stocks):
+    memory, mapped = indexes
+    for stock in stocks:
+        assert mapped.get(stock['code']) == memory.get(stock['code'])
+    assert mapped.get('0000') is None
+
+
+def test_search_matches(indexes, stocks):
+    memory, mapped = indexes
+    for query in sample_queries(stocks):
+        assert mapped.search(query, limit=50) == memory.search(query, limit=50), query
+
+
+def test_facet_search_matches(indexes):
+    memory, mapped = indexes
+    for filters in ({'market': 'プライム'}, {'sector': '銀行業'}, {'market': 'Growth', 'sector': '情報・通信業'}):
+        mask = memory.facet_mask(filters)
+        assert mapped.facet_mask(filters) == mask
+        for query in ('', 'ホールディングス', '銀行'):
+            assert mapped.search(query, limit=50, mask=mask) == memory.search(query, limit=50, mask=mask)
@@ -0,0 +1,109 @@
+"""企業名・証券コードの前方一致サジェストのテスト"""
+import json
+import os
+
+import pytest
+
+from stock_index import StockMasterIndex, normalize_search_key
+from stock_suggest import POPULARITY_PATH, StockSuggester, load_popularity
+
+STOCK_MASTER_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'stock_master.json')
+
+STOCKS = [
+    {'code': '1301', 'name': '極洋', 'market': 'Prime', 'sector': '水産・農林業'},
+    {'code': '3116', 'name': 'トヨタ紡織', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '6201', 'name': '豊田自動織機', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '7203', 'name': 'トヨタ自動車', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '7205', 'name': '日野自動車', 'market': 'Prime', 'sector': '輸送用機器'},
+    {'code': '8015', 'name': '豊田通商', 'market': 'Prime', 'sector': '卸売業'},
+    {'code': '9001', 'name': 'トヨタ', 'market': 'Standard', 'sector': 'サービス業'},
+    {'code': '9002', 'name': 'トヨタホーム東京', 'market': 'Standard', 'sector': '不動産業'},
+]
+
+POPULARITY = {'7203': 1.0, '3116': 0.2, '6201': 0.5}
+
+
+@pytest.fixture
+def suggester():
+    return StockSuggester(StockMasterIndex(STOCKS), POPULARITY)
+
+
+def suggested(results):
+    return [stock['code'] for stock in results]
+
+
+def test_exact_name_then_popularity(suggester):
+    # 完全一致 → 人気度 → 検索キーの短さ の順
+    assert suggested(suggester.suggest('とよた')) == ['9001', '7203', '3116', '9002']
+    assert suggested(suggester.suggest('ﾄﾖﾀ', limit=2)) == ['9001', '7203']
+
+
+def test_code_prefix_comes_first(suggester):
+    assert suggested(suggester.suggest('72')) == ['7203', '7205']
+    assert suggested(suggester.suggest('９００')) == ['9001', '9002']
+
+
+def test_substring_matches_fill_the_rest(suggester):
+    # 前方一致が足りない分は部分一致（マスターの並び順）で補う
+    assert suggested(suggester.suggest('自動')) == ['6201', '7203', '7205']
+
+
+def test_mask_and_limits(suggester):
+    index = suggester.index
+    standard = index.facet_mask({'market': 'Standard'})
+
+    assert suggested(suggester.suggest('トヨタ', mask=standard)) == ['9001', '9002']
+    assert suggested(suggester.suggest('', mask=standard)) == ['9001', '9002']
+    assert suggester.suggest('') == []
+    assert suggester.suggest('トヨタ', limit=0) == []
+
+
+def reference_suggest(index, popularity, query, limit):
+    """StockSuggester.suggest と同じ順位を全件の走査で求める"""
+    key = normalize_search_key(query)
+    codes = [index.record(position)['code'] for position in range(len(index))]
+
+    def rank(position):
+        return -popularity.get(codes[position], 0.0), len(index.key(position)), position
+
+    positions = []
+    if key.isdigit():
+        positions.extend(sorted((p for p in range(len(index)) if codes[p].startswith(key)), key=rank)[:limit])
+    if len(positions) < limit:
+        prefixed = [p for p in range(len(index)) if index.key(p).startswith(key)]
+        exact = [p for p in prefixed if index.key(p) == key][:1]
+        positions.extend(exact)
+        positions.extend(sorted((p for p in prefixed if p not in exact), key=rank)[:limit])
+
+    results = []
+    for position in positions:
+        if position not in results:
+            results.append(position)
+    for position in range(len(index)):
+        if key in index.key(position) and position not in results:
+            results.append(position)
+    return [codes[position] for position in results[:limit]]
+
+
+def test_matches_full_scan_on_stock_master():
+    with open(STOCK_MASTER_PATH, 'r', encoding='utf-8') as f:
+        stocks = json.load(f)
+    index = StockMasterIndex(stocks)
+    popularity = load_popularity(POPULARITY_PATH)
+    suggester = StockSuggester(index, popularity)
+
+    queries = ['1', '13', '72', '9', 'ト', 'とよ', 'ニッ', '日本', '三菱', 'ソフト', 'ホールディングス', 'ａ']
+    queries += [stock['name'][:2] for stock in stocks[::211]]
+    for query in queries:
+        assert suggested(suggester.suggest(query, limit=10)) == reference_suggest(index, popularity, query, 10), query
+
+
+def test_popularity_codes_are_in_stock_master():
+    with open(STOCK_MASTER_PATH, 'r', encoding='utf-8') as f:
+        codes = {stock['code'] for stock in json.load(f)}
+
+    popularity = load_popularity(POPULARITY_PATH)
+
+    assert popularity
+    assert set(popularity) <= codes
+    assert all(0.0 < weight <= 1.0 for weight in popularity.values())
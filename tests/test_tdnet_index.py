@@ -0,0 +1,83 @@
+"""TDnetの共有インデックス（リクエストでの参照とポーラーでの取り込み）のテスト"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import earnings_scraper
+import tdnet_index
+from tdnet_poller import TdnetPoller
+
+TODAY = datetime(2025, 5, 12)
+STOCK_CODE = '9999'
+
+
+def disclosure(date, stock_code=STOCK_CODE, title='2025年3月期 決算説明会資料'):
+    key = date.strftime('%Y%m%d')
+    return {
+        'disclosure_date': date.strftime('%Y-%m-%d'),
+        'disclosure_time': '15:00',
+        'stock_code': stock_code,
+        'company_name': 'サンプル',
+        'title': title,
+        'pdf_url': f"https://www.release.tdnet.info/inbs/{stock_code}{key}.pdf",
+    }
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """空の共有インデックスと、日付ごとに1件の開示を返す日次一覧のスタンドイン"""
+    shared = tdnet_index.TdnetIndex(str(tmp_path / 'tdnet.db'))
+    monkeypatch.setattr(tdnet_index.TdnetIndex, '_shared', shared, raising=False)
+    monkeypatch.setattr(tdnet_index, 'today_jst', lambda: TODAY)
+    fetched = []
+
+    def fetch_day(date, max_pages=None):
+        fetched.append((date, max_pages))
+        return [disclosure(date), disclosure(date, stock_code='1301')]
+
+    monkeypatch.setattr(tdnet_index, 'fetch_day', fetch_day)
+    shared.fetched = fetched
+    return shared
+
+
+def test_request_reads_index_without_ingesting(index, monkeypatch):
+    for days in range(tdnet_index.TDNET_FALLBACK_DAYS):
+        date = TODAY - timedelta(days=days)
+        index.ingest_day(date, [disclosure(date)])
+    monkeypatch.setattr(tdnet_index, 'sync_day', pytest.fail)
+    monkeypatch.setattr(tdnet_index, 'sync_range', pytest.fail)
+
+    materials = earnings_scraper.fetch_from_tdnet(STOCK_CODE, TODAY - timedelta(days=365), TODAY, 'サンプル')
+
+    assert len(materials) == tdnet_index.TDNET_FALLBACK_DAYS
+    assert index.fetched == []
+
+
+def test_request_reads_days_not_yet_ingested(index, monkeypatch):
+    ingested = TODAY - timedelta(days=3)
+    index.ingest_day(ingested, [disclosure(ingested)])
+    monkeypatch.setattr(tdnet_index, 'sync_range', pytest.fail)
+
+    disclosures = tdnet_index.lookup_disclosures(index, STOCK_CODE, TODAY - timedelta(days=365), TODAY)
+
+    # 取り込み済みの日はインデックスから、それ以外の直近の日は1ページ目だけを直接読む
+    assert len(disclosures) == tdnet_index.TDNET_FALLBACK_DAYS
+    assert all(max_pages == 1 for _, max_pages in index.fetched)
+    assert ingested not in [date for date, _ in index.fetched]
+    assert [item['disclosure_date'] for item in disclosures] == sorted(
+        (item['disclosure_date'] for item in disclosures), reverse=True)
+    # リクエストでは取り込まない
+    assert index.ingested_dates([TODAY]) == set()
+
+
+def test_poller_backfills_recent_days(index):
+    assert TdnetPoller(lock_path='').poll_once(TODAY)
+
+    dates = tdnet_index.recent_dates(TODAY - timedelta(days=365), TODAY, tdnet_index.TDNET_SYNC_DAYS)
+    assert index.ingested_dates(dates) == {date.strftime('%Y-%m-%d') for date in dates}
+    assert len(index.lookup(STOCK_CODE, TODAY - timedelta(days=365), TODAY)) == tdnet_index.TDNET_SYNC_DAYS
+
+    # 取り込み済みの過去の日は取り直さない（当日だけを取り直す）
+    index.fetched.clear()
+    assert TdnetPoller(lock_path='').poll_once(TODAY)
+    assert [date for date, _ in index.fetched] == [TODAY]